@@ -0,0 +1,48 @@
+"""reject overlapping appointments
+
+Revision ID: add_appointment_overlap
+Revises: add_token_revocation
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_appointment_overlap'
+down_revision = 'add_token_revocation'
+branch_labels = None
+depends_on = None
+
+# the slot length every appointment before this revision was booked for
+SLOT_MINUTES = 60
+
+
+def upgrade():
+    # Each appointment records when it ends, so the slot length can change without
+    # reinterpreting the appointments already booked.
+    op.add_column('appointments', sa.Column('ends_at', sa.DateTime(), nullable=True))
+    op.execute(sa.text("UPDATE appointments SET ends_at = scheduled_time + make_interval(mins => :minutes)")
+               .bindparams(minutes=SLOT_MINUTES))
+    op.alter_column('appointments', 'ends_at', nullable=False)
+
+    # No two live appointments of a therapist may overlap, whatever their start times.
+    # therapist_id is compared as a one-element range so plain gist can index it without
+    # the btree_gist extension. Fails if existing data already holds overlapping
+    # bookings; cancel them first. The index also serves the free-slots range query.
+    op.execute(
+        "ALTER TABLE appointments ADD CONSTRAINT ex_appointments_therapist_id_period "
+        "EXCLUDE USING gist (int4range(therapist_id, therapist_id, '[]') WITH &&, "
+        "tsrange(scheduled_time, ends_at) WITH &&) WHERE (status <> 'cancelled')"
+    )
+    op.drop_index('uq_appointments_therapist_id_scheduled_time', table_name='appointments')
+
+
+def downgrade():
+    op.create_index(
+        'uq_appointments_therapist_id_scheduled_time', 'appointments', ['therapist_id', 'scheduled_time'],
+        unique=True, postgresql_where=sa.text("status <> 'cancelled'")
+    )
+    op.drop_constraint('ex_appointments_therapist_id_period', 'appointments')
+    op.drop_column('appointments', 'ends_at')
@@ -0,0 +1,35 @@
+"""add community id indexes
+
+Revision ID: add_community_id_indexes
+Revises: add_forum_search
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_community_id_indexes'
+down_revision = 'add_forum_search'
+branch_labels = None
+depends_on = None
+
+# Declared with index=True on the models but only ever created by create_all at startup.
+INDEXES = [
+    ('ix_forum_topics_id', 'forum_topics'),
+    ('ix_comments_id', 'comments'),
+    ('ix_topic_tags_id', 'topic_tags'),
+    ('ix_events_id', 'events'),
+    ('ix_event_attendees_id', 'event_attendees'),
+]
+
+
+def upgrade():
+    for name, table in INDEXES:
+        op.create_index(name, table, ['id'], if_not_exists=True)
+
+
+def downgrade():
+    for name, table in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -1,7 +1,7 @@
 """add community tables
 
 Revision ID: add_community_tables
-Revises: 
+Revises: create_core_tables
 Create Date: 2024-03-19 10:00:00.000000
 
 """
@@ -11,7 +11,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision = 'add_community_tables'
-down_revision = None
+down_revision = 'create_core_tables'
 branch_labels = None
 depends_on = None
 
@@ -0,0 +1,32 @@
+"""add event capacity
+
+Revision ID: add_event_capacity
+Revises: add_outbox
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_event_capacity'
+down_revision = 'add_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # capacity NULL = unlimited; attendee_count is kept up to date by join_event from here on
+    op.add_column('events', sa.Column('capacity', sa.Integer(), nullable=True))
+    op.add_column('events', sa.Column('attendee_count', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    op.execute("""
+        UPDATE events e SET attendee_count = a.n
+        FROM (SELECT event_id, count(*) AS n FROM event_attendees GROUP BY event_id) a
+        WHERE a.event_id = e.id
+    """)
+
+
+def downgrade():
+    op.drop_column('events', 'attendee_count')
+    op.drop_column('events', 'capacity')
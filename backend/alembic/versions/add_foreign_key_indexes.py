@@ -0,0 +1,38 @@
+"""add foreign key indexes
+
+Revision ID: add_foreign_key_indexes
+Revises: add_tag_dictionary
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_foreign_key_indexes'
+down_revision = 'add_tag_dictionary'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # comments.topic_id and forum_topics.category are already the leading columns of the
+    # keyset pagination indexes, so they need nothing extra here
+    op.create_index('ix_appointments_therapist_id_status', 'appointments', ['therapist_id', 'status'])
+    op.create_index('ix_appointments_user_id_status', 'appointments', ['user_id', 'status'])
+    op.create_index('ix_therapists_user_id', 'therapists', ['user_id'])
+
+    # Drop duplicate attendances left by the old check-then-insert join before enforcing uniqueness
+    op.execute("""
+        DELETE FROM event_attendees a USING event_attendees b
+        WHERE a.event_id = b.event_id AND a.user_id = b.user_id AND a.id > b.id
+    """)
+    op.create_unique_constraint('uq_event_attendees_event_id_user_id', 'event_attendees', ['event_id', 'user_id'])
+
+
+def downgrade():
+    op.drop_constraint('uq_event_attendees_event_id_user_id', 'event_attendees', type_='unique')
+    op.drop_index('ix_therapists_user_id', table_name='therapists')
+    op.drop_index('ix_appointments_user_id_status', table_name='appointments')
+    op.drop_index('ix_appointments_therapist_id_status', table_name='appointments')
@@ -0,0 +1,44 @@
+"""add forum search
+
+Revision ID: add_forum_search
+Revises: add_therapist_search_indexes
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_forum_search'
+down_revision = 'add_therapist_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Topics: weighted title/content/tags vector, written by create_topic from now on
+    op.add_column('forum_topics', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute("""
+        UPDATE forum_topics t SET search_vector =
+            setweight(to_tsvector('english', coalesce(t.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(t.content, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(
+                (SELECT string_agg(tt.name, ' ') FROM topic_tags tt WHERE tt.topic_id = t.id), '')), 'C')
+    """)
+    op.create_index('ix_forum_topics_search_vector', 'forum_topics', ['search_vector'], postgresql_using='gin')
+
+    # Comments: maintained by Postgres as a generated column
+    op.add_column('comments', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('english', content)", persisted=True)
+    ))
+    op.create_index('ix_comments_search_vector', 'comments', ['search_vector'], postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_comments_search_vector', table_name='comments')
+    op.drop_column('comments', 'search_vector')
+    op.drop_index('ix_forum_topics_search_vector', table_name='forum_topics')
+    op.drop_column('forum_topics', 'search_vector')
@@ -0,0 +1,31 @@
+"""add keyset pagination indexes
+
+Revision ID: add_keyset_pagination_indexes
+Revises: add_community_tables
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_keyset_pagination_indexes'
+down_revision = 'add_community_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GET /community/topics pages on (created_at, id), optionally within a category
+    op.create_index('ix_forum_topics_created_at_id', 'forum_topics', ['created_at', 'id'])
+    op.create_index('ix_forum_topics_category_created_at_id', 'forum_topics', ['category', 'created_at', 'id'])
+
+    # GET /community/topics/{id}/comments pages on (created_at, id) within a topic
+    op.create_index('ix_comments_topic_id_created_at_id', 'comments', ['topic_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_comments_topic_id_created_at_id', table_name='comments')
+    op.drop_index('ix_forum_topics_category_created_at_id', table_name='forum_topics')
+    op.drop_index('ix_forum_topics_created_at_id', table_name='forum_topics')
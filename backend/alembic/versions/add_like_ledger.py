@@ -0,0 +1,52 @@
+"""add like ledger
+
+Revision ID: add_like_ledger
+Revises: add_keyset_pagination_indexes
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_like_ledger'
+down_revision = 'add_keyset_pagination_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One like per user per topic / comment; the unique constraints do the deduplication
+    op.create_table(
+        'topic_likes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('topic_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['topic_id'], ['forum_topics.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'topic_id', name='uq_topic_likes_user_id_topic_id')
+    )
+    op.create_index('ix_topic_likes_id', 'topic_likes', ['id'])
+
+    op.create_table(
+        'comment_likes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('comment_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['comment_id'], ['comments.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'comment_id', name='uq_comment_likes_user_id_comment_id')
+    )
+    op.create_index('ix_comment_likes_id', 'comment_likes', ['id'])
+
+
+def downgrade():
+    op.drop_index('ix_comment_likes_id', table_name='comment_likes')
+    op.drop_table('comment_likes')
+    op.drop_index('ix_topic_likes_id', table_name='topic_likes')
+    op.drop_table('topic_likes')
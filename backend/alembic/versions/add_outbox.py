@@ -0,0 +1,43 @@
+"""add outbox
+
+Revision ID: add_outbox
+Revises: add_foreign_key_indexes
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_outbox'
+down_revision = 'add_foreign_key_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Notifications written with the appointment change, drained by the background worker
+    op.create_table(
+        'outbox_messages',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(), nullable=False),
+        sa.Column('payload', postgresql.JSONB(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('available_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('attempts', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('delivered_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_messages_id', 'outbox_messages', ['id'])
+    # only undelivered messages are indexed, so the index stays small as the table grows
+    op.create_index('ix_outbox_messages_available_at_id', 'outbox_messages', ['available_at', 'id'],
+                    postgresql_where=sa.text('available_at IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_outbox_messages_available_at_id', table_name='outbox_messages')
+    op.drop_index('ix_outbox_messages_id', table_name='outbox_messages')
+    op.drop_table('outbox_messages')
@@ -0,0 +1,77 @@
+"""add tag dictionary
+
+Revision ID: add_tag_dictionary
+Revises: add_community_id_indexes
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_tag_dictionary'
+down_revision = 'add_community_id_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One row per distinct tag name with a maintained topic count
+    op.create_table(
+        'tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('topic_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_index('ix_tags_id', 'tags', ['id'])
+    op.create_index('ix_tags_topic_count_id', 'tags', ['topic_count', 'id'])
+
+    # topic_tags becomes a pure (topic_id, tag_id) association; duplicate names on a topic collapse
+    op.rename_table('topic_tags', 'topic_tags_old')
+    op.execute("ALTER INDEX ix_topic_tags_id RENAME TO ix_topic_tags_old_id")
+    op.create_table(
+        'topic_tags',
+        sa.Column('topic_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['topic_id'], ['forum_topics.id'], ),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ),
+        sa.PrimaryKeyConstraint('topic_id', 'tag_id')
+    )
+    op.create_index('ix_topic_tags_tag_id_topic_id', 'topic_tags', ['tag_id', 'topic_id'])
+
+    op.execute("""
+        INSERT INTO tags (name, topic_count)
+        SELECT btrim(name), count(DISTINCT topic_id) FROM topic_tags_old
+        WHERE btrim(name) <> ''
+        GROUP BY btrim(name)
+    """)
+    op.execute("""
+        INSERT INTO topic_tags (topic_id, tag_id)
+        SELECT DISTINCT o.topic_id, t.id FROM topic_tags_old o JOIN tags t ON t.name = btrim(o.name)
+    """)
+    op.drop_table('topic_tags_old')
+
+
+def downgrade():
+    op.rename_table('topic_tags', 'topic_tags_new')
+    op.create_table(
+        'topic_tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('topic_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['topic_id'], ['forum_topics.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_topic_tags_id', 'topic_tags', ['id'])
+    op.execute("""
+        INSERT INTO topic_tags (name, topic_id)
+        SELECT t.name, n.topic_id FROM topic_tags_new n JOIN tags t ON t.id = n.tag_id
+        ORDER BY n.topic_id, t.name
+    """)
+    op.drop_table('topic_tags_new')
+    op.drop_index('ix_tags_topic_count_id', table_name='tags')
+    op.drop_index('ix_tags_id', table_name='tags')
+    op.drop_table('tags')
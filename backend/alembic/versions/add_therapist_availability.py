@@ -0,0 +1,45 @@
+"""add therapist availability
+
+Revision ID: add_therapist_availability
+Revises: add_like_ledger
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_therapist_availability'
+down_revision = 'add_like_ledger'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'therapist_availability',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('therapist_id', sa.Integer(), nullable=False),
+        sa.Column('weekday', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.Time(), nullable=False),
+        sa.Column('end_time', sa.Time(), nullable=False),
+        sa.ForeignKeyConstraint(['therapist_id'], ['therapists.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_therapist_availability_id', 'therapist_availability', ['id'])
+    op.create_index('ix_therapist_availability_therapist_id_weekday', 'therapist_availability', ['therapist_id', 'weekday'])
+
+    # One live appointment per therapist and start time. Fails if existing data
+    # already holds double bookings; cancel the duplicates first.
+    op.create_index(
+        'uq_appointments_therapist_id_scheduled_time', 'appointments', ['therapist_id', 'scheduled_time'],
+        unique=True, postgresql_where=sa.text("status <> 'cancelled'")
+    )
+
+
+def downgrade():
+    op.drop_index('uq_appointments_therapist_id_scheduled_time', table_name='appointments')
+    op.drop_index('ix_therapist_availability_therapist_id_weekday', table_name='therapist_availability')
+    op.drop_index('ix_therapist_availability_id', table_name='therapist_availability')
+    op.drop_table('therapist_availability')
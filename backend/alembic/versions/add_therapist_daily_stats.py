@@ -0,0 +1,77 @@
+"""add therapist daily stats
+
+Revision ID: add_therapist_daily_stats
+Revises: add_topic_rankings
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_therapist_daily_stats'
+down_revision = 'add_topic_rankings'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # added without a default so existing appointments keep an unknown (NULL) booking time
+    op.add_column('appointments', sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=True))
+    op.alter_column('appointments', 'created_at', server_default=sa.text('now()'))
+    op.add_column('appointments', sa.Column('confirmed_at', sa.TIMESTAMP(timezone=True), nullable=True))
+
+    op.create_table(
+        'therapist_daily_stats',
+        sa.Column('therapist_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('booked', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('pending', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('confirmed', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('cancelled', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('confirmations', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('confirmation_lead_seconds', sa.Double(), server_default=sa.text('0'), nullable=False),
+        sa.Column('new_clients', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('repeat_clients', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.ForeignKeyConstraint(['therapist_id'], ['therapists.id']),
+        sa.PrimaryKeyConstraint('therapist_id', 'day'),
+    )
+    op.create_table(
+        'therapist_clients',
+        sa.Column('therapist_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('appointments', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['therapist_id'], ['therapists.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('therapist_id', 'user_id'),
+    )
+
+    # Backfill as therapist_stats.backfill does. No lead times yet: no appointment has
+    # a booking time before this migration.
+    op.execute("""
+        INSERT INTO therapist_clients (therapist_id, user_id, appointments)
+        SELECT therapist_id, user_id, count(*) FROM appointments GROUP BY therapist_id, user_id
+    """)
+    op.execute("""
+        INSERT INTO therapist_daily_stats (therapist_id, day, booked, pending, confirmed, cancelled, new_clients, repeat_clients)
+        SELECT therapist_id, scheduled_time::date, count(*),
+               count(*) FILTER (WHERE status = 'pending'),
+               count(*) FILTER (WHERE status = 'confirmed'),
+               count(*) FILTER (WHERE status = 'cancelled'),
+               count(*) FILTER (WHERE nth = 1),
+               count(*) FILTER (WHERE nth = 2)
+        FROM (
+            SELECT therapist_id, scheduled_time, status,
+                   row_number() OVER (PARTITION BY therapist_id, user_id ORDER BY id) AS nth
+            FROM appointments
+        ) a
+        GROUP BY therapist_id, scheduled_time::date
+    """)
+
+
+def downgrade():
+    op.drop_table('therapist_clients')
+    op.drop_table('therapist_daily_stats')
+    op.drop_column('appointments', 'confirmed_at')
+    op.drop_column('appointments', 'created_at')
@@ -0,0 +1,38 @@
+"""add therapist search indexes
+
+Revision ID: add_therapist_search_indexes
+Revises: add_therapist_availability
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_therapist_search_indexes'
+down_revision = 'add_therapist_availability'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filters and keyset sorts on GET /therapists
+    op.create_index('ix_therapists_specialization_id', 'therapists', ['specialization', 'id'])
+    op.create_index('ix_therapists_experience_id', 'therapists', ['experience', 'id'])
+    op.create_index('ix_therapists_name_id', 'therapists', ['name', 'id'])
+
+    # ILIKE '%q%' over name and bio
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_therapists_name_trgm', 'therapists', ['name'],
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_therapists_bio_trgm', 'therapists', ['bio'],
+                    postgresql_using='gin', postgresql_ops={'bio': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_therapists_bio_trgm', table_name='therapists')
+    op.drop_index('ix_therapists_name_trgm', table_name='therapists')
+    op.drop_index('ix_therapists_name_id', table_name='therapists')
+    op.drop_index('ix_therapists_experience_id', table_name='therapists')
+    op.drop_index('ix_therapists_specialization_id', table_name='therapists')
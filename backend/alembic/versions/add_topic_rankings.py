@@ -0,0 +1,57 @@
+"""add topic rankings
+
+Revision ID: add_topic_rankings
+Revises: add_event_capacity
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_topic_rankings'
+down_revision = 'add_event_capacity'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'topic_rankings',
+        sa.Column('topic_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(), nullable=False),
+        sa.Column('score', sa.Double(), nullable=False),
+        sa.ForeignKeyConstraint(['topic_id'], ['forum_topics.id']),
+        sa.PrimaryKeyConstraint('topic_id'),
+    )
+    op.create_index('ix_topic_rankings_score_topic_id', 'topic_rankings', ['score', 'topic_id'])
+    op.create_index('ix_topic_rankings_category_score_topic_id', 'topic_rankings', ['category', 'score', 'topic_id'])
+
+    # Backfill with trending.rebuild's formula at the default 24h half-life:
+    # score = ln(sum(weight * exp((at - 2025-01-01) / tau))), tau = 24h / ln 2 in seconds.
+    # Topics, comments and likes from the like ledger weigh 3, 2 and 1.
+    op.execute("""
+        WITH events AS (
+            SELECT id AS topic_id, ln(3) + extract(epoch FROM created_at - timestamptz '2025-01-01 00:00+00')::float8 / (86400 / ln(2)) AS x
+            FROM forum_topics
+            UNION ALL
+            SELECT topic_id, ln(2) + extract(epoch FROM created_at - timestamptz '2025-01-01 00:00+00')::float8 / (86400 / ln(2))
+            FROM comments
+            UNION ALL
+            SELECT topic_id, ln(1) + extract(epoch FROM created_at - timestamptz '2025-01-01 00:00+00')::float8 / (86400 / ln(2))
+            FROM topic_likes
+        ), shifted AS (
+            SELECT topic_id, x, max(x) OVER (PARTITION BY topic_id) AS m FROM events
+        )
+        INSERT INTO topic_rankings (topic_id, category, score)
+        SELECT s.topic_id, t.category, s.m + ln(sum(exp(greatest(s.x - s.m, -700))))
+        FROM shifted s JOIN forum_topics t ON t.id = s.topic_id
+        GROUP BY s.topic_id, s.m, t.category
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_topic_rankings_category_score_topic_id', table_name='topic_rankings')
+    op.drop_index('ix_topic_rankings_score_topic_id', table_name='topic_rankings')
+    op.drop_table('topic_rankings')
@@ -0,0 +1,71 @@
+"""create core tables
+
+Revision ID: create_core_tables
+Revises: 
+Create Date: 2024-03-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'create_core_tables'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # users, therapists and appointments used to be created by create_all at startup.
+    # Databases that already have them: `alembic stamp create_core_tables` (or a later
+    # revision that matches) before upgrading.
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('password', sa.String(), nullable=False),
+        sa.Column('userType', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'therapists',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('specialization', sa.String(), nullable=False),
+        sa.Column('contact', sa.String(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('experience', sa.Integer(), nullable=False),
+        sa.Column('bio', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_therapists_id', 'therapists', ['id'])
+
+    op.create_table(
+        'appointments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('therapist_id', sa.Integer(), nullable=False),
+        sa.Column('scheduled_time', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['therapist_id'], ['therapists.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_appointments_id', 'appointments', ['id'])
+
+
+def downgrade():
+    op.drop_index('ix_appointments_id', table_name='appointments')
+    op.drop_table('appointments')
+    op.drop_index('ix_therapists_id', table_name='therapists')
+    op.drop_table('therapists')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_table('users')
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import  BaseSettings
 
 class Settings(BaseSettings):
@@ -8,7 +10,56 @@ class Settings(BaseSettings):
     database_name: str
     secret_key: str
     algorithm: str
+    # keep it short (minutes): clients renew through /token/refresh, and a logout only
+    # takes full effect once the session's outstanding access tokens expire
     access_token_expire_minutes: int
+    refresh_token_expire_days: int = 30
+    revocation_sync_interval_seconds: float = 5
+    revocation_false_positive_rate: float = 0.001
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout: float = 30
+    database_pool_recycle: int = 1800
+    database_pool_pre_ping: bool = True
+    # Vercel and other serverless hosts: no in-process pool, pgbouncer-safe connections
+    database_serverless: bool = False
+    schema_revision_check: bool = True
+    # Read replica for read-only routes, same credentials as the primary; unset = primary only
+    database_replica_hostname: Optional[str] = None
+    database_replica_port: Optional[int] = None
+    database_replica_name: Optional[str] = None
+    replica_max_lag_seconds: float = 5
+    replica_check_interval_seconds: float = 2
+    principal_cache_size: int = 10000
+    principal_cache_ttl_seconds: float = 60
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 0  # 0 means one per CPU
+    password_hash_max_pending: int = 64
+    like_flush_interval_seconds: float = 1.0
+    like_reconcile_interval_seconds: float = 3600
+    # changing it only affects new activity until `python -m backend.trending` rebuilds the scores
+    trending_half_life_hours: float = 24
+    appointment_slot_minutes: int = 60
+    response_cache_size: int = 1024
+    # invalidations reach other processes over the realtime channel; this bounds staleness
+    # when that is off (REALTIME_ENABLED=false) or an invalidation is lost
+    response_cache_max_age_seconds: float = 60
+    metrics_enabled: bool = True
+    # /metrics and /internal/*: a bearer token when set, otherwise clients in these networks
+    # only. Behind a proxy on the same host every client looks local, so set the token there.
+    internal_token: Optional[str] = None
+    internal_allowed_networks: str = "127.0.0.1/32,::1/128"
+    notification_sink: str = "log"  # "log" or "file"
+    notification_file: str = "notifications.jsonl"
+    outbox_poll_interval_seconds: float = 5.0
+    outbox_batch_size: int = 100
+    outbox_max_attempts: int = 10
+    outbox_delivery_timeout_seconds: float = 10.0
+    slow_request_ms: float = 0  # 0 turns the slow-request log off
+    # LISTEN needs a session-mode connection: behind pgbouncer in transaction mode, turn it off
+    realtime_enabled: bool = True
+    realtime_queue_size: int = 100
+    realtime_heartbeat_seconds: float = 15
 
 
     class Config:
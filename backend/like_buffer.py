@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from contextlib import suppress
+from datetime import timedelta
+
+from sqlalchemy import bindparam, func, literal, select, update
+
+from . import models, trending
+from .config import settings
+from .database import AsyncSessionLocal
+from .response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+_TABLES = {
+    "topic": models.ForumTopic.__table__,
+    "comment": models.Comment.__table__,
+}
+# the ledger each count is rebuilt from, and its column naming the liked row
+_LEDGERS = {
+    "topic": (models.TopicLike.__table__, "topic_id"),
+    "comment": (models.CommentLike.__table__, "comment_id"),
+}
+_RECONCILE_LOCK = 0x6C696B6573  # pg advisory lock key, one reconciler at a time
+
+
+def reconcile_statement(kind: str, grace: timedelta):
+    """Raise ``likes`` to the ledger count on rows where it is lower, skipping rows liked
+    in the last ``grace``, whose increments may still be waiting in some process's buffer.
+    Returns the ids of the topics whose counts changed.
+
+    The ledger is a floor, never the whole count: likes given before it existed are only
+    in ``likes``, so rows without ledger entries are left alone and no count is lowered.
+    A lost buffered increment only ever leaves a count too low.
+    """
+    table = _TABLES[kind]
+    ledger, column = _LEDGERS[kind]
+    counted = (
+        select(ledger.c[column].label("id"), func.count().label("n"), func.max(ledger.c.created_at).label("last"))
+        .group_by(ledger.c[column])
+        .subquery()
+    )
+    return (
+        update(table)
+        .where(table.c.id == counted.c.id, func.coalesce(table.c.likes, 0) < counted.c.n)
+        .where(counted.c.last < func.now() - literal(grace))
+        .values(likes=counted.c.n)
+        .returning(table.c.id if kind == "topic" else table.c.topic_id)
+    )
+
+
+class LikeBuffer:
+    """Collects like increments in memory and applies them as one batched UPDATE per table.
+
+    Each flush issues ``UPDATE ... SET likes = likes + n`` for every row touched since the
+    previous flush, so a hot topic costs one row update per interval instead of one per like.
+    Rows are updated in id order so concurrent flushers cannot deadlock each other. Topic
+    likes are folded into the trending scores by the same flush.
+
+    Increments still buffered when a process dies are lost, so at startup and then every
+    ``reconcile_interval`` seconds counts below the topic_likes and comment_likes ledger,
+    where every like is committed before it is buffered, are raised to it.
+    """
+
+    def __init__(self, interval: float, reconcile_interval: float):
+        self.interval = interval
+        self.reconcile_interval = reconcile_interval
+        # longer than any increment should sit in a buffer, flush retries included
+        self.grace = timedelta(seconds=max(60, 10 * interval))
+        self.reconciled_at = None
+        self.corrected = 0
+        self._pending = {kind: Counter() for kind in _TABLES}
+        self._stopping = None
+        self._task = None
+
+    def add(self, kind: str, row_id: int, n: int = 1):
+        self._pending[kind][row_id] += n
+
+    async def flush(self):
+        batches, self._pending = self._pending, {kind: Counter() for kind in _TABLES}
+        if not any(batches.values()):
+            return
+        committed = False
+        try:
+            async with AsyncSessionLocal() as db:
+                for kind, counts in batches.items():
+                    if not counts:
+                        continue
+                    table = _TABLES[kind]
+                    stmt = (
+                        update(table)
+                        .where(table.c.id == bindparam("row_id"))
+                        .values(likes=func.coalesce(table.c.likes, 0) + bindparam("n"))
+                    )
+                    await db.execute(stmt, [{"row_id": row_id, "n": n} for row_id, n in sorted(counts.items())])
+                # a comment's like count is rendered inside its topic's cached response
+                topic_ids = set(batches["topic"])
+                if batches["comment"]:
+                    topic_ids.update(await db.scalars(select(models.Comment.topic_id).distinct().where(
+                        models.Comment.id.in_(batches["comment"]))))
+                if batches["topic"]:
+                    await db.execute(trending.bump_many(), [
+                        {"row_id": topic_id, "activity": trending.activity("like", n)}
+                        for topic_id, n in sorted(batches["topic"].items())
+                    ])
+                await db.commit()
+                committed = True
+        except BaseException:
+            # keep the increments for the next attempt rather than dropping them, unless
+            # they are already in: a cancel while the session closes would count them twice
+            if not committed:
+                for kind, counts in batches.items():
+                    self._pending[kind].update(counts)
+            raise
+        finally:
+            if committed:
+                await response_cache.invalidate(*(f"topic:{topic_id}" for topic_id in topic_ids))
+
+    async def reconcile(self, grace: timedelta = None) -> int:
+        """Raise counts that fell behind the ledger; returns how many rows were corrected.
+        Skipped, returning 0, while another process is reconciling."""
+        grace = self.grace if grace is None else grace
+        topic_ids = set()
+        corrected = 0
+        async with AsyncSessionLocal() as db:
+            if not await db.scalar(select(func.pg_try_advisory_xact_lock(_RECONCILE_LOCK))):
+                return 0
+            for kind in _TABLES:
+                changed = (await db.scalars(reconcile_statement(kind, grace))).all()
+                corrected += len(changed)
+                topic_ids.update(changed)
+            await db.commit()
+        if corrected:
+            logger.warning("Reconciled %d like counts with the ledger", corrected)
+            self.corrected += corrected
+        await response_cache.invalidate(*(f"topic:{topic_id}" for topic_id in topic_ids))
+        return corrected
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            if self.reconciled_at is None or time.monotonic() - self.reconciled_at > self.reconcile_interval:
+                try:
+                    await self.reconcile()
+                    self.reconciled_at = time.monotonic()
+                except Exception:
+                    logger.exception("Reconciling like counters failed")
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing like counters failed")
+
+    def start(self):
+        if self._task is None:
+            # created here so it belongs to the loop the app is served from
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            # not cancelled: a cancel landing in a flush's commit could apply its increments
+            # and still hand them back for the next flush
+            self._stopping.set()
+            await task
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": sum(len(counts) for counts in self._pending.values()),
+            "reconciled_rows": self.corrected,
+        }
+
+
+like_buffer = LikeBuffer(settings.like_flush_interval_seconds, settings.like_reconcile_interval_seconds)
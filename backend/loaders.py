@@ -0,0 +1,98 @@
+from sqlalchemy import String, func, literal, select, true
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by, array_agg
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload, noload, selectinload, with_expression
+from sqlalchemy.orm.attributes import set_committed_value
+
+from . import models
+
+# Loader strategies for the community read paths, one per response shape.
+# Many-to-one relationships ride along as a JOIN on the parent query; collections
+# get one IN (...) query each, so a page costs the same number of statements
+# however many comments or tags hang off each topic.
+
+# A topic listing embeds only the first few comments of each topic; clients read the
+# rest of a thread from /community/topics/{id}/comments, or list /topics/summary.
+TOPIC_COMMENT_PREVIEW = 3
+
+_comment_count = (
+    select(func.count(models.Comment.id))
+    .where(models.Comment.topic_id == models.ForumTopic.id)
+    .correlate(models.ForumTopic)
+    .scalar_subquery()
+)
+
+_tag_names = (
+    select(func.coalesce(array_agg(aggregate_order_by(models.Tag.name, models.Tag.name)), literal([], ARRAY(String))))
+    .join(models.TopicTag, models.TopicTag.tag_id == models.Tag.id)
+    .where(models.TopicTag.topic_id == models.ForumTopic.id)
+    .correlate(models.ForumTopic)
+    .scalar_subquery()
+)
+
+def topic_detail():
+    # ForumTopicResponse: 3 queries (topics + authors, comments + authors, tags)
+    return (
+        joinedload(models.ForumTopic.user),
+        selectinload(models.ForumTopic.comments).joinedload(models.Comment.user),
+        selectinload(models.ForumTopic.tags),
+    )
+
+def topic_listing():
+    # ForumTopicResponse in a list: 3 queries, the third one in comment_previews
+    return (
+        joinedload(models.ForumTopic.user),
+        noload(models.ForumTopic.comments),
+        selectinload(models.ForumTopic.tags),
+    )
+
+def select_comment_previews(topic_ids, limit: int = TOPIC_COMMENT_PREVIEW):
+    """The first ``limit`` comments of each of ``topic_ids``.
+
+    A LATERAL subquery reads at most ``limit`` entries of ix_comments_topic_id_created_at_id
+    per topic, however long the thread is.
+    """
+    page = select(models.ForumTopic.id).where(models.ForumTopic.id.in_(topic_ids)).subquery()
+    ranked = aliased(models.Comment)
+    first = (
+        select(ranked.id)
+        .where(ranked.topic_id == page.c.id)
+        .order_by(ranked.created_at, ranked.id)
+        .limit(limit)
+        .lateral()
+    )
+    return (
+        select(models.Comment)
+        .options(*comment())
+        .select_from(page)
+        .join(first, true())
+        .join(models.Comment, models.Comment.id == first.c.id)
+        .order_by(models.Comment.topic_id, models.Comment.created_at, models.Comment.id)
+    )
+
+async def comment_previews(db: AsyncSession, topics, limit: int = TOPIC_COMMENT_PREVIEW):
+    """Load the first ``limit`` comments of each topic into its ``comments``, in one query."""
+    if not topics:
+        return
+    result = await db.execute(select_comment_previews([topic.id for topic in topics], limit))
+    by_topic = {}
+    for loaded in result.scalars():
+        by_topic.setdefault(loaded.topic_id, []).append(loaded)
+    for topic in topics:
+        set_committed_value(topic, "comments", by_topic.get(topic.id, []))
+
+def topic_summary():
+    # ForumTopicSummary: a single query, counts and tag names are computed in SQL
+    return (
+        joinedload(models.ForumTopic.user),
+        with_expression(models.ForumTopic.comment_count, _comment_count),
+        with_expression(models.ForumTopic.tag_names, _tag_names),
+    )
+
+def comment():
+    # CommentResponse
+    return (joinedload(models.Comment.user),)
+
+def event():
+    # EventResponse: attendees are paged separately, the count is a column
+    return (joinedload(models.Event.creator),)
@@ -1,9 +1,43 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .database import engine, Base
-from .routers import users, therapist, appoitnment, auth, community
+from fastapi.responses import ORJSONResponse
+from .like_buffer import like_buffer
+from .outbox import outbox_worker
+from .realtime import broker
+from .replica import ReadYourWritesMiddleware, replica_monitor
+from .revocation import revocation_list
+from .utils import password_hasher
+from .config import settings
+from .schema_check import check_schema_revision
+from .metrics import MetricsMiddleware
+from .routers import users, therapist, appoitnment, auth, community, internal
 from fastapi.middleware.cors import CORSMiddleware
+from .pagination import NEXT_CURSOR_HEADER
 
-app = FastAPI(title="SpectrumConnect API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    like_buffer.start()
+    outbox_worker.start()
+    revocation_list.start()
+    if settings.realtime_enabled:
+        broker.start()
+    if replica_monitor is not None:
+        replica_monitor.start()
+    if settings.schema_revision_check:
+        schema_check = asyncio.create_task(check_schema_revision())
+    yield
+    if settings.schema_revision_check:
+        schema_check.cancel()
+    if replica_monitor is not None:
+        await replica_monitor.stop()
+    await broker.stop()
+    await revocation_list.stop()
+    await outbox_worker.stop()
+    await like_buffer.stop()
+    password_hasher.shutdown()
+
+app = FastAPI(title="SpectrumConnect API", lifespan=lifespan, default_response_class=ORJSONResponse)
 origins = ['*']
 
 
@@ -13,15 +47,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
-Base.metadata.create_all(bind=engine)
+if replica_monitor is not None:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, slow_request_ms=settings.slow_request_ms)
 
 app.include_router(users.router)
 app.include_router(auth.router)
 app.include_router(therapist.router)
 app.include_router(appoitnment.router)
 app.include_router(community.router)
+app.include_router(internal.router)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,196 @@
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from .database import request_engines
+
+logger = logging.getLogger(__name__)
+
+# Request latency buckets in seconds, Prometheus' defaults
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Responses that last as long as the client stays (SSE) or the result set runs (NDJSON):
+# their duration is not a latency, so they are counted but kept out of the histogram
+STREAMING_MEDIA_TYPES = (b"text/event-stream", b"application/x-ndjson")
+
+
+class RequestStats:
+    """SQL accounting for the request being served, filled in by the engine hooks below."""
+
+    __slots__ = ("statements", "db_seconds", "rows", "log")
+
+    def __init__(self, keep_statements: bool):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        # (sql, seconds) pairs, only kept when the slow-request log is on
+        self.log = [] if keep_statements else None
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class RouteMetrics:
+    __slots__ = ("buckets", "count", "seconds", "statuses", "statements", "db_seconds", "rows")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last one is +Inf
+        self.count = 0
+        self.seconds = 0.0
+        self.statuses = {}
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+
+    def observe(self, seconds: Optional[float], status: int, stats: RequestStats):
+        if seconds is not None:
+            self.buckets[bisect_left(BUCKETS, seconds)] += 1
+            self.count += 1
+            self.seconds += seconds
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.statements += stats.statements
+        self.db_seconds += stats.db_seconds
+        self.rows += stats.rows
+
+
+class Registry:
+    """Per-route counters and histograms, rendered in the Prometheus text format.
+
+    Plain in-process counters: the event loop is single threaded, so no locking is
+    needed, and each worker process exposes its own series.
+    """
+
+    def __init__(self):
+        self.routes = {}
+
+    def observe(self, method: str, route: str, seconds: Optional[float], status: int, stats: RequestStats):
+        """Record a request; ``seconds`` is None for streaming responses, which skip the histogram."""
+        key = (method, route)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics()
+        metrics.observe(seconds, status, stats)
+
+    def render(self, extra_gauges: dict = None) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), metrics in sorted(self.routes.items()):
+            if not metrics.count:
+                continue
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, metrics.buckets):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {metrics.seconds}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {metrics.count}")
+
+        counters = [
+            ("http_requests_total", "Requests by route and status.", None),
+            ("http_request_db_statements_total", "SQL statements executed while serving the route.", "statements"),
+            ("http_request_db_seconds_total", "Time spent executing SQL while serving the route.", "db_seconds"),
+            ("http_request_db_rows_total", "Rows returned or affected by the route's SQL.", "rows"),
+        ]
+        for name, help_text, attr in counters:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (method, route), metrics in sorted(self.routes.items()):
+                labels = f'method="{method}",route="{_escape(route)}"'
+                if attr is None:
+                    for status, count in sorted(metrics.statuses.items()):
+                        lines.append(f'{name}{{{labels},status="{status}"}} {count}')
+                else:
+                    lines.append(f"{name}{{{labels}}} {getattr(metrics, attr)}")
+
+        for name, value in (extra_gauges or {}).items():
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = Registry()
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request and attributing its SQL to the matched route.
+
+    Requests that match no route are grouped under "unmatched" to keep label cardinality
+    bounded. Streaming responses (STREAMING_MEDIA_TYPES) are counted without a latency.
+    With ``slow_request_ms`` set, other requests slower than that are logged together
+    with the statements they ran.
+    """
+
+    def __init__(self, app, slow_request_ms: float = 0):
+        self.app = app
+        self.slow_request_seconds = slow_request_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(keep_statements=self.slow_request_seconds > 0)
+        token = _current.set(stats)
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = dict(message.get("headers", ())).get(b"content-type", b"")
+                streaming = content_type.startswith(STREAMING_MEDIA_TYPES)
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            registry.observe(scope["method"], path, None if streaming else elapsed, status, stats)
+            if self.slow_request_seconds and not streaming and elapsed >= self.slow_request_seconds:
+                _log_slow_request(scope["method"], scope["path"], path, elapsed, status, stats)
+
+
+def _log_slow_request(method, path, route, elapsed, status, stats):
+    statements = "\n".join(f"  {seconds * 1000:8.2f} ms  {' '.join(sql.split())[:500]}" for sql, seconds in stats.log)
+    logger.warning(
+        "Slow request %s %s (%s) -> %s in %.1f ms, %d statements, %.1f ms in SQL\n%s",
+        method, path, route, status, elapsed * 1000, stats.statements, stats.db_seconds * 1000, statements,
+    )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context.metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    start = getattr(context, "metrics_start", None)
+    if stats is None or start is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats.statements += 1
+    stats.db_seconds += elapsed
+    if cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+    if stats.log is not None:
+        stats.log.append((statement, elapsed))
+
+
+for _engine in request_engines:
+    event.listen(_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
@@ -1,5 +1,6 @@
-from sqlalchemy import Boolean, Column, Integer, String, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Computed, Date, Double, Integer, String, ForeignKey, DateTime, Index, UniqueConstraint, Time, func, literal_column
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, ExcludeConstraint
+from sqlalchemy.orm import deferred, relationship, query_expression
 from sqlalchemy.sql.expression import text
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 
@@ -31,6 +32,22 @@ class Therapist(Base):
 
     user = relationship("User", back_populates="therapist_profile")
 
+    # Directory filters and sorts. The pg_trgm GIN indexes behind free-text search on
+    # name/bio need the extension, so they live only in the add_therapist_search_indexes migration.
+    __table_args__ = (
+        Index("ix_therapists_specialization_id", "specialization", "id"),
+        Index("ix_therapists_experience_id", "experience", "id"),
+        Index("ix_therapists_name_id", "name", "id"),
+        Index("ix_therapists_user_id", "user_id"),
+    )
+
+def therapist_key(therapist_id):
+    """therapist_id as a one-element range: ``&&`` on it is equality that plain gist can index."""
+    return func.int4range(therapist_id, therapist_id, literal_column("'[]'"))
+
+def period(start, end):
+    return func.tsrange(start, end)
+
 class Appointment(Base):
     __tablename__ = "appointments"
 
@@ -38,11 +55,84 @@ class Appointment(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     therapist_id = Column(Integer, ForeignKey("therapists.id"), nullable=False)
     scheduled_time = Column(DateTime, nullable=False)
+    ends_at = Column(DateTime, nullable=False)
     status = Column(String, default="pending")  
+    # NULL on appointments booked before these were recorded
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=True)
+    confirmed_at = Column(TIMESTAMP(timezone=True), nullable=True)
 
     user = relationship("User", foreign_keys=[user_id])
     therapist = relationship("Therapist", foreign_keys=[therapist_id])
 
+    # A therapist's live appointments never overlap. Booking relies on this constraint
+    # to reject the loser of a race; its index also serves the slot range query.
+    __table_args__ = (
+        ExcludeConstraint(
+            (therapist_key(therapist_id), "&&"), (period(scheduled_time, ends_at), "&&"),
+            name="ex_appointments_therapist_id_period", using="gist", where=text("status <> 'cancelled'")),
+        # pending list for a therapist, confirmed list for a user
+        Index("ix_appointments_therapist_id_status", "therapist_id", "status"),
+        Index("ix_appointments_user_id_status", "user_id", "status"),
+    )
+
+class TherapistDailyStats(Base):
+    """Per-therapist counters for the appointments scheduled on one day, maintained
+    incrementally (see therapist_stats.py)."""
+    __tablename__ = "therapist_daily_stats"
+
+    therapist_id = Column(Integer, ForeignKey("therapists.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    booked = Column(Integer, nullable=False, server_default=text("0"))
+    pending = Column(Integer, nullable=False, server_default=text("0"))
+    confirmed = Column(Integer, nullable=False, server_default=text("0"))
+    cancelled = Column(Integer, nullable=False, server_default=text("0"))
+    # confirmations with a known booking time, and the sum of their booking-to-confirmation seconds
+    confirmations = Column(Integer, nullable=False, server_default=text("0"))
+    confirmation_lead_seconds = Column(Double, nullable=False, server_default=text("0"))
+    # clients whose first / second booking with the therapist is on this day
+    new_clients = Column(Integer, nullable=False, server_default=text("0"))
+    repeat_clients = Column(Integer, nullable=False, server_default=text("0"))
+
+class TherapistClient(Base):
+    """Bookings per (therapist, client) pair, so a booking knows whether the client is new."""
+    __tablename__ = "therapist_clients"
+
+    therapist_id = Column(Integer, ForeignKey("therapists.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    appointments = Column(Integer, nullable=False)
+
+class TherapistAvailability(Base):
+    __tablename__ = "therapist_availability"
+
+    id = Column(Integer, primary_key=True, index=True)
+    therapist_id = Column(Integer, ForeignKey("therapists.id"), nullable=False)
+    weekday = Column(Integer, nullable=False)  # 0 = Monday
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+
+    __table_args__ = (
+        Index("ix_therapist_availability_therapist_id_weekday", "therapist_id", "weekday"),
+    )
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox_messages"
+
+    # Written in the same transaction as the change it announces, delivered by outbox.OutboxWorker
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
+    # next delivery attempt; NULL once delivered or given up on
+    available_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=True)
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+    last_error = Column(String, nullable=True)
+    delivered_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_messages_available_at_id", "available_at", "id",
+              postgresql_where=text("available_at IS NOT NULL")),
+    )
+
 # Community Models
 class ForumTopic(Base):
     __tablename__ = "forum_topics"
@@ -54,10 +144,22 @@ class ForumTopic(Base):
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
     category = Column(String, nullable=False)
     likes = Column(Integer, default=0)
+    # written with the topic, see search.topic_search_vector
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
     
     user = relationship("User", foreign_keys=[user_id])
     comments = relationship("Comment", back_populates="topic")
-    tags = relationship("TopicTag", back_populates="topic")
+    tags = relationship("Tag", secondary="topic_tags", order_by="Tag.name")
+
+    # Only populated by queries that ask for them (see loaders.topic_summary)
+    comment_count = query_expression()
+    tag_names = query_expression()
+
+    __table_args__ = (
+        Index("ix_forum_topics_created_at_id", "created_at", "id"),
+        Index("ix_forum_topics_category_created_at_id", "category", "created_at", "id"),
+        Index("ix_forum_topics_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -68,18 +170,70 @@ class Comment(Base):
     topic_id = Column(Integer, ForeignKey("forum_topics.id"), nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
     likes = Column(Integer, default=0)
+    search_vector = deferred(Column(TSVECTOR, Computed("to_tsvector('english', content)", persisted=True)))
     
     user = relationship("User", foreign_keys=[user_id])
     topic = relationship("ForumTopic", back_populates="comments")
 
-class TopicTag(Base):
-    __tablename__ = "topic_tags"
-    
+    __table_args__ = (
+        Index("ix_comments_topic_id_created_at_id", "topic_id", "created_at", "id"),
+        Index("ix_comments_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+class TopicRanking(Base):
+    """Trending score per topic, maintained incrementally (see trending.py)."""
+    __tablename__ = "topic_rankings"
+
+    topic_id = Column(Integer, ForeignKey("forum_topics.id"), primary_key=True)
+    # copied from the topic so a category feed is one range of the index below
+    category = Column(String, nullable=False)
+    score = Column(Double, nullable=False)
+
+    __table_args__ = (
+        Index("ix_topic_rankings_score_topic_id", "score", "topic_id"),
+        Index("ix_topic_rankings_category_score_topic_id", "category", "score", "topic_id"),
+    )
+
+# One row per (user, topic) / (user, comment); the counters on the parent rows are
+# bumped in batches by like_buffer.
+class TopicLike(Base):
+    __tablename__ = "topic_likes"
+
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     topic_id = Column(Integer, ForeignKey("forum_topics.id"), nullable=False)
-    
-    topic = relationship("ForumTopic", back_populates="tags")
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
+
+    __table_args__ = (UniqueConstraint("user_id", "topic_id", name="uq_topic_likes_user_id_topic_id"),)
+
+class CommentLike(Base):
+    __tablename__ = "comment_likes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    comment_id = Column(Integer, ForeignKey("comments.id"), nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
+
+    __table_args__ = (UniqueConstraint("user_id", "comment_id", name="uq_comment_likes_user_id_comment_id"),)
+
+class Tag(Base):
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True)
+    # maintained by the tag upsert in tags.attach_tags, never recounted on read
+    topic_count = Column(Integer, nullable=False, server_default=text("0"))
+
+    __table_args__ = (Index("ix_tags_topic_count_id", "topic_count", "id"),)
+
+class TopicTag(Base):
+    __tablename__ = "topic_tags"
+
+    # (topic_id, tag_id) primary key serves topic -> tags, the index below tag -> topics
+    topic_id = Column(Integer, ForeignKey("forum_topics.id"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
+
+    __table_args__ = (Index("ix_topic_tags_tag_id_topic_id", "tag_id", "topic_id"),)
 
 class Event(Base):
     __tablename__ = "events"
@@ -91,6 +245,9 @@ class Event(Base):
     time = Column(String, nullable=False)
     location = Column(String, nullable=False)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # NULL means unlimited; attendee_count is maintained by the join statement, never counted
+    capacity = Column(Integer, nullable=True)
+    attendee_count = Column(Integer, nullable=False, server_default=text("0"))
     
     creator = relationship("User", foreign_keys=[created_by])
     attendees = relationship("EventAttendee", back_populates="event")
@@ -104,3 +261,34 @@ class EventAttendee(Base):
     
     event = relationship("Event", back_populates="attendees")
     user = relationship("User")
+
+    # one attendance per user per event; join_event relies on it instead of checking first
+    __table_args__ = (UniqueConstraint("event_id", "user_id", name="uq_event_attendees_event_id_user_id"),)
+
+class RefreshToken(Base):
+    """One rotation step of a login session; only a hash of the token is stored."""
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    session_id = Column(String, nullable=False)
+    token_hash = Column(String, nullable=False, unique=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    # set when the token is exchanged; presenting it again revokes the session
+    used_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_refresh_tokens_session_id", "session_id"),
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
+
+class TokenRevocation(Base):
+    """A revoked login session, kept until its last access token expires (see revocation.py)."""
+    __tablename__ = "token_revocations"
+
+    session_id = Column(String, primary_key=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
+
+    __table_args__ = (Index("ix_token_revocations_created_at", "created_at"),)
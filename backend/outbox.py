@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import settings
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(db: AsyncSession, event_type: str, payload: dict):
+    """Add a notification to the caller's transaction; it is delivered only if that commits."""
+    db.add(models.OutboxMessage(event_type=event_type, payload=payload))
+
+
+class Delivery:
+    """Where outbox messages go. Raising marks the attempt failed and schedules a retry;
+    delivery is at-least-once, so implementations should tolerate duplicates (the
+    message id is stable across attempts)."""
+
+    async def deliver(self, message_id: int, event_type: str, payload: dict):
+        raise NotImplementedError
+
+
+class LogDelivery(Delivery):
+    async def deliver(self, message_id, event_type, payload):
+        logger.info("Notification %s %s %s", message_id, event_type, json.dumps(payload))
+
+
+class FileDelivery(Delivery):
+    """Appends one JSON line per message, for local development and tests."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    async def deliver(self, message_id, event_type, payload):
+        line = json.dumps({"id": message_id, "event_type": event_type, "payload": payload}) + "\n"
+        await asyncio.to_thread(self._append, line)
+
+    def _append(self, line):
+        with self.path.open("a") as f:
+            f.write(line)
+
+
+def _delivery_from_settings() -> Delivery:
+    if settings.notification_sink == "file":
+        return FileDelivery(settings.notification_file)
+    return LogDelivery()
+
+
+class OutboxWorker:
+    """Drains the outbox in the background so request latency never includes delivery.
+
+    Each batch is claimed with ``FOR UPDATE SKIP LOCKED`` in a short transaction that
+    leases it: ``available_at`` moves past the time the batch may take to deliver, so
+    several workers (one per app process) can run side by side, and a worker that dies
+    mid-batch only delays its messages until the lease runs out. Delivery happens after
+    that commit, with no transaction or row lock held, and each attempt is cut off after
+    ``timeout`` seconds. A failed message is retried with exponential backoff and parked
+    after ``max_attempts``. Requests that enqueue call ``wake`` so messages go out right
+    after the commit instead of on the next poll.
+    """
+
+    def __init__(self, delivery: Delivery, interval: float, batch_size: int, max_attempts: int,
+                 timeout: float = 10.0, backoff: float = 1.0, max_backoff: float = 3600.0):
+        self.delivery = delivery
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.delivered = 0
+        self.failed = 0
+        self._wakeup = None
+        self._task = None
+
+    def wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def retry_delay(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(self.backoff * 2 ** (attempts - 1), self.max_backoff))
+
+    def lease(self, messages: int) -> timedelta:
+        # messages are delivered one after another, each for at most ``timeout``
+        return timedelta(seconds=self.timeout * (messages + 1))
+
+    async def claim(self) -> list:
+        """Lease up to one batch of due messages; returns (id, event_type, payload, attempts) rows."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(models.OutboxMessage)
+                .where(models.OutboxMessage.available_at <= datetime.now(timezone.utc))
+                .order_by(models.OutboxMessage.available_at, models.OutboxMessage.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            messages = result.scalars().all()
+            # attempts are counted on claim: a message whose delivery took its worker down
+            # never reached drain_batch's handler, and is parked here once out of attempts
+            exhausted = [message for message in messages if message.attempts >= self.max_attempts]
+            for message in exhausted:
+                message.available_at = None
+                message.last_error = f"delivery did not finish in {message.attempts} attempts"
+                logger.error("Giving up on outbox message %s after %s unfinished attempts",
+                             message.id, message.attempts)
+            messages = [message for message in messages if message.attempts < self.max_attempts]
+            leased_until = datetime.now(timezone.utc) + self.lease(len(messages))
+            for message in messages:
+                message.attempts += 1
+                message.available_at = leased_until
+            claimed = [(message.id, message.event_type, message.payload, message.attempts) for message in messages]
+            await db.commit()
+            return claimed
+
+    async def drain_batch(self) -> int:
+        """Deliver up to one batch of due messages; returns how many were claimed."""
+        claimed = await self.claim()
+        if not claimed:
+            return 0
+        delivered, failed = [], []
+        for message_id, event_type, payload, attempts in claimed:
+            try:
+                await asyncio.wait_for(self.delivery.deliver(message_id, event_type, payload), self.timeout)
+            except Exception as exc:
+                self.failed += 1
+                if attempts >= self.max_attempts:
+                    available_at = None
+                    logger.error("Giving up on outbox message %s after %s attempts: %r", message_id, attempts, exc)
+                else:
+                    available_at = datetime.now(timezone.utc) + self.retry_delay(attempts)
+                failed.append({"id": message_id, "available_at": available_at, "last_error": repr(exc)[:1000]})
+            else:
+                self.delivered += 1
+                delivered.append({"id": message_id, "available_at": None,
+                                  "delivered_at": datetime.now(timezone.utc)})
+        async with AsyncSessionLocal() as db:
+            for outcomes in (delivered, failed):
+                if outcomes:
+                    await db.execute(update(models.OutboxMessage), outcomes)
+            await db.commit()
+        return len(claimed)
+
+    async def drain(self):
+        """Deliver everything currently due."""
+        while await self.drain_batch() == self.batch_size:
+            pass
+
+    async def _run(self):
+        while True:
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            self._wakeup.clear()
+            try:
+                await self.drain()
+            except Exception:
+                logger.exception("Draining the outbox failed")
+
+    def start(self):
+        if self._task is None:
+            # created here so it belongs to the loop the app is served from
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        self._wakeup = None
+
+    def stats(self) -> dict:
+        return {"delivered": self.delivered, "failed": self.failed}
+
+
+outbox_worker = OutboxWorker(
+    _delivery_from_settings(),
+    interval=settings.outbox_poll_interval_seconds,
+    batch_size=settings.outbox_batch_size,
+    max_attempts=settings.outbox_max_attempts,
+    timeout=settings.outbox_delivery_timeout_seconds,
+)
+
+
+if __name__ == "__main__":
+    # one-off drain, e.g. from a cron job where no long-lived app process runs the worker
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(outbox_worker.drain())
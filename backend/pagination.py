@@ -0,0 +1,31 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from fastapi import HTTPException, Response
+
+# Keyset pagination: list endpoints return a page of rows plus an opaque cursor
+# for the row after the last one. Bodies stay plain JSON arrays; the cursor for
+# the next page travels in this header and is absent on the last page.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(*values) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def decode_cursor(cursor: str, *types) -> list:
+    """Decode a cursor made by encode_cursor, converting each value to the matching type."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(payload) != len(types):
+            raise ValueError
+        return [datetime.fromisoformat(v) if t is datetime else t(v) for t, v in zip(types, payload)]
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(rows: list, limit: int, response: Response, key) -> list:
+    """Trim the look-ahead row fetched with limit + 1 and advertise the next cursor."""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    return rows
@@ -0,0 +1,248 @@
+import asyncio
+import json
+import logging
+from contextlib import suppress
+from typing import Iterable, Optional
+
+import psycopg
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .database import SQLALCHEMY_DATABASE_URL, async_engine
+
+logger = logging.getLogger(__name__)
+
+# Every worker LISTENs on one Postgres channel; the logical channel ("topic:12",
+# "therapist:3", ...) travels in the payload and is routed in process. NOTIFY is
+# transactional, so an event is only seen once the write that published it commits.
+PG_CHANNEL = "spectrum_events"
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more, so events carry ids and
+# small fields; clients fetch anything larger (a comment body) through the API.
+MAX_PAYLOAD_BYTES = 7999
+
+RESYNC = b"event: resync\ndata: {}\n\n"
+HEARTBEAT = b": ping\n\n"
+
+
+def _notify_statement(channel: str, event: str, data: dict):
+    payload = json.dumps({"channel": channel, "event": event, "data": data}, separators=(",", ":"))
+    if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+        raise ValueError(f"{event} payload is too large for NOTIFY")
+    return select(func.pg_notify(PG_CHANNEL, payload))
+
+
+async def publish(db: AsyncSession, channel: str, event: str, data: dict):
+    """Queue an event in the caller's transaction; it is delivered if that commits."""
+    if not settings.realtime_enabled:
+        return
+    await db.execute(_notify_statement(channel, event, data))
+
+
+async def notify(channel: str, event: str, data: dict):
+    """Send an event right away, on a pooled connection of its own; for callers with no
+    transaction to attach it to, such as work done after a commit."""
+    if not settings.realtime_enabled:
+        return
+    async with async_engine.connect() as conn:
+        await conn.execute(_notify_statement(channel, event, data))
+        await conn.commit()
+
+
+class Subscription:
+    """One client's queue of encoded SSE frames. A client that falls ``maxsize`` frames
+    behind is closed with a resync event rather than buffered without bound."""
+
+    def __init__(self, channels: tuple, maxsize: int):
+        self.channels = channels
+        self._queue = asyncio.Queue(maxsize + 1)  # room for the close marker
+        self._maxsize = maxsize
+
+    def put(self, frame: bytes) -> bool:
+        if self._queue.qsize() >= self._maxsize:
+            return False
+        self._queue.put_nowait(frame)
+        return True
+
+    def close(self):
+        # anything still queued is moot once the client has to resync
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    async def get(self) -> Optional[bytes]:
+        """The next frame, or None once the subscription is closed."""
+        return await self._queue.get()
+
+
+class Broker:
+    """Fans NOTIFY events out to the SSE clients connected to this process.
+
+    A single dedicated connection (outside the request pool) listens for every worker's
+    events, so subscribers cost a queue each and no database connection. When that
+    connection drops, events may have been missed: every subscriber is sent a resync and
+    disconnected, and the listener reconnects with backoff.
+
+    In-process consumers (the response cache) ``watch`` a channel instead: their handler is
+    called with each event's name and data, and with ("resync", None) each time the
+    listener starts, since events sent before that were missed.
+    """
+
+    def __init__(self, conninfo: str, queue_size: int, heartbeat: float, max_backoff: float = 30.0):
+        self.conninfo = conninfo
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.max_backoff = max_backoff
+        self.listening = False
+        self.delivered = 0
+        self.dropped = 0
+        self._subscribers = {}  # logical channel -> set of Subscription
+        self._handlers = {}  # logical channel -> list of handler(event, data)
+        self._pending = set()  # handler coroutines still running
+        self._tasks = ()
+
+    def watch(self, channel: str, handler):
+        """Call ``handler(event, data)``, a function or coroutine function, for every event on ``channel``."""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def _call(self, handler, event: str, data):
+        try:
+            result = handler(event, data)
+            if asyncio.iscoroutine(result):
+                task = asyncio.ensure_future(result)
+                self._pending.add(task)
+                task.add_done_callback(self._pending.discard)
+        except Exception:
+            logger.exception("Realtime handler for %s failed", event)
+
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        subscription = Subscription(tuple(channels), self.queue_size)
+        for channel in subscription.channels:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for channel in subscription.channels:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def dispatch(self, payload: str):
+        try:
+            message = json.loads(payload)
+            channel, event, data = message["channel"], message["event"], message["data"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed realtime payload %r", payload[:200])
+            return
+        for handler in self._handlers.get(channel, ()):
+            self._call(handler, event, data)
+        subscribers = self._subscribers.get(channel)
+        if not subscribers:
+            return
+        # encoded once, the same bytes go to every subscriber
+        frame = f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+        for subscription in list(subscribers):
+            if subscription.put(frame):
+                self.delivered += 1
+            else:
+                self.dropped += 1
+                self.unsubscribe(subscription)
+                subscription.close()
+
+    def _close_all(self):
+        for subscription in self._all():
+            subscription.close()
+        self._subscribers.clear()
+
+    def _all(self) -> set:
+        return {s for subscribers in self._subscribers.values() for s in subscribers}
+
+    async def _beat(self):
+        # one timer for every stream rather than a timeout per client; the ping keeps
+        # proxies from timing idle streams out and surfaces clients that have gone away
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            for subscription in self._all():
+                subscription.put(HEARTBEAT)
+
+    async def _run(self):
+        delay = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {PG_CHANNEL}")
+                    self.listening = True
+                    delay = 1.0
+                    # whatever was sent before this LISTEN, or while the last one was down, is lost
+                    for handlers in self._handlers.values():
+                        for handler in handlers:
+                            self._call(handler, "resync", None)
+                    async for message in conn.notifies():
+                        self.dispatch(message.payload)
+            except Exception:
+                logger.exception("Realtime listener failed; reconnecting in %.0fs", delay)
+            if self.listening:
+                self.listening = False
+                self._close_all()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = (asyncio.create_task(self._run()), asyncio.create_task(self._beat()))
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, ()
+        for task in tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        self.listening = False
+        self._close_all()
+
+    def stats(self) -> dict:
+        return {
+            "listening": int(self.listening),
+            "subscribers": len(self._all()),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+broker = Broker(
+    SQLALCHEMY_DATABASE_URL.render_as_string(hide_password=False),
+    queue_size=settings.realtime_queue_size,
+    heartbeat=settings.realtime_heartbeat_seconds,
+)
+
+
+def event_stream(channels: Iterable[str]) -> StreamingResponse:
+    """A ``text/event-stream`` response relaying the given channels until the client leaves."""
+    if not settings.realtime_enabled:
+        raise HTTPException(status_code=503, detail="Realtime updates are disabled")
+    channels = tuple(channels)
+
+    async def frames():
+        # subscribed only once the body starts, so a client gone before then leaks nothing
+        subscription = broker.subscribe(channels)
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                frame = await subscription.get()
+                if frame is None:
+                    yield RESYNC
+                    return
+                yield frame
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
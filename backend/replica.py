@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import math
+import time
+from contextlib import suppress
+
+from fastapi import Request
+from sqlalchemy import text
+
+from .config import settings
+from .database import AsyncSessionLocal, ReplicaSessionLocal, replica_engine
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary; 0 when it has replayed everything it
+# received (an idle primary would otherwise look like growing lag), and 0 for a
+# server that is not in recovery at all, such as a second database standing in.
+LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+# Set after a successful write; while it is in the future, reads go to the primary
+PIN_COOKIE = "primary_reads_until"
+
+
+class ReplicaMonitor:
+    """Polls replica lag so ``get_read_db`` can fall back to the primary.
+
+    The replica is used only while the last check succeeded and measured less than
+    ``max_lag`` seconds of lag; an unreachable or lagging replica sends every read to
+    the primary until a later check finds it caught up.
+    """
+
+    def __init__(self, engine, max_lag: float, interval: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.healthy = False
+        self.lag = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self._task = None
+
+    async def check(self):
+        try:
+            async with self.engine.connect() as conn:
+                lag = float(await asyncio.wait_for(conn.scalar(LAG_SQL), self.interval))
+        except Exception as exc:
+            if self.healthy:
+                logger.warning("Read replica unavailable, reading from the primary: %r", exc)
+            self.healthy, self.lag = False, None
+            return
+        healthy = lag <= self.max_lag
+        if healthy != self.healthy:
+            logger.warning("Read replica lag %.1fs, %s", lag,
+                           "reading from the replica" if healthy else "reading from the primary")
+        self.healthy, self.lag = healthy, lag
+
+    async def _run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        self.healthy = False
+
+    def stats(self) -> dict:
+        return {
+            "healthy": int(self.healthy),
+            "lag_seconds": self.lag if self.lag is not None else -1,
+            "reads_routed_replica": self.replica_reads,
+            "reads_routed_primary": self.primary_reads,
+        }
+
+
+replica_monitor = ReplicaMonitor(
+    replica_engine,
+    max_lag=settings.replica_max_lag_seconds,
+    interval=settings.replica_check_interval_seconds,
+) if replica_engine is not None else None
+
+# A lag check can be up to one interval old, so a pin that outlasts both bounds
+# means a replica read never predates the client's own write.
+PIN_SECONDS = settings.replica_max_lag_seconds + settings.replica_check_interval_seconds
+
+
+def _pinned(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_db(request: Request):
+    """Session for read-only routes: the replica when it is healthy and the caller has not
+    written within the last ``PIN_SECONDS``, the primary otherwise."""
+    if replica_monitor is not None and replica_monitor.healthy and not _pinned(request):
+        replica_monitor.replica_reads += 1
+        sessionmaker = ReplicaSessionLocal
+    else:
+        if replica_monitor is not None:
+            replica_monitor.primary_reads += 1
+        sessionmaker = AsyncSessionLocal
+    async with sessionmaker() as db:
+        yield db
+
+
+class ReadYourWritesMiddleware:
+    """Pins a client's reads to the primary for ``PIN_SECONDS`` after any successful
+    non-GET request, with a cookie so it holds whichever worker serves the next read."""
+
+    SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in self.SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (f"{PIN_COOKIE}={time.time() + PIN_SECONDS:.3f}; Max-Age={math.ceil(PIN_SECONDS)}; "
+                          "Path=/; HttpOnly; SameSite=Lax")
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,246 @@
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+from . import realtime, serialization
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# NOTIFY channel carrying invalidations between processes, see ResponseCache
+CACHE_CHANNEL = "response_cache"
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    headers: dict = field(default_factory=dict)
+
+
+class CacheBackend:
+    """Storage for cached responses. Entries are grouped under tags so writes can drop
+    exactly the responses they affect; a shared store (e.g. Redis) implements the same methods.
+
+    Every tag has a version that ``invalidate`` bumps. A response rendered from data read
+    after ``versions(tags)`` is only stored if those versions still hold, so an
+    invalidation that lands mid-render cannot be overwritten by the stale body.
+    """
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        raise NotImplementedError
+
+    async def versions(self, tags: Iterable[str]) -> tuple:
+        raise NotImplementedError
+
+    async def set(self, key: str, entry: CachedResponse, tags: Iterable[str], versions: tuple) -> bool:
+        """Store ``entry`` unless a tag's version moved from ``versions``; False if skipped."""
+        raise NotImplementedError
+
+    async def invalidate(self, tags: Iterable[str]):
+        raise NotImplementedError
+
+    async def clear(self):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU whose entries expire ``max_age`` seconds after they are stored.
+
+    Other processes' writes reach it through ResponseCache's broadcast invalidations; the
+    max age bounds how stale an entry can get if one is lost.
+
+    Tag versions live in a fixed array of counters indexed by the tag's hash, so they take
+    the same memory however many tags there are. Tags sharing a counter only cause the odd
+    extra skipped store.
+    """
+
+    VERSION_SLOTS = 4096
+
+    def __init__(self, maxsize: int, max_age: float):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self._entries = OrderedDict()  # key -> (entry, tags, expires_at)
+        self._keys_by_tag = {}
+        self._versions = [0] * self.VERSION_SLOTS
+
+    async def get(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        if item[2] <= time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return item[0]
+
+    async def versions(self, tags):
+        return tuple(self._versions[hash(tag) % self.VERSION_SLOTS] for tag in tags)
+
+    async def set(self, key, entry, tags, versions):
+        tags = tuple(tags)
+        if await self.versions(tags) != versions:
+            return False
+        self._drop(key)
+        self._entries[key] = (entry, tags, time.monotonic() + self.max_age)
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._drop(next(iter(self._entries)))
+        return True
+
+    async def invalidate(self, tags):
+        for tag in tags:
+            self._versions[hash(tag) % self.VERSION_SLOTS] += 1
+            for key in self._keys_by_tag.pop(tag, ()):
+                self._drop(key)
+
+    async def clear(self):
+        # every entry may be stale, so anything rendered before now must not be stored either
+        self._versions = [version + 1 for version in self._versions]
+        self._entries.clear()
+        self._keys_by_tag.clear()
+
+    def _drop(self, key):
+        item = self._entries.pop(key, None)
+        if item is None:
+            return
+        for tag in item[1]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+
+class ResponseCache:
+    """Serves anonymous GET responses from a backend, with strong ETags and 304s.
+
+    Handlers opt in by returning ``lookup`` when it hits and ``store`` otherwise, passing
+    both the tags of the response; writes call ``invalidate`` with the tags of the
+    responses they change. A miss notes the tag versions before the handler reads
+    anything, and ``store`` still answers but caches nothing if they have moved since.
+
+    With ``broadcast`` on, ``invalidate`` also sends the tags to every other process over
+    the realtime NOTIFY channel, and ``apply`` drops them from this process's backend
+    when another process sends them. If the listener drops, events sent while it was down
+    are lost, so each process clears its backend when it starts listening again.
+    """
+
+    # headers set by handlers that are part of the cached representation
+    CACHED_HEADERS = ("x-next-cursor",)
+
+    def __init__(self, backend: CacheBackend, broadcast: bool = False):
+        self.backend = backend
+        self.broadcast = broadcast
+        # tells this process's own invalidations apart when they come back over NOTIFY
+        self.origin = uuid.uuid4().hex
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.stale_skips = 0
+        self.miss_seconds = 0.0
+
+    @staticmethod
+    def key(request: Request) -> str:
+        return request.url.path + "?" + "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+    async def lookup(self, request: Request, tags: Iterable[str]) -> Optional[Response]:
+        """The cached response for this request, or None on a miss."""
+        entry = await self.backend.get(self.key(request))
+        if entry is None:
+            self.misses += 1
+            request.state.cache_miss_started = time.perf_counter()
+            request.state.cache_versions = await self.backend.versions(tags)
+            return None
+        self.hits += 1
+        return self._respond(request, entry)
+
+    async def store(self, request: Request, response: Response, response_model, tags: Iterable[str], data) -> Response:
+        """Serialize ``data`` as ``response_model``, cache it under ``tags`` and answer with it."""
+        body = serialization.render(response_model, data)
+        entry = CachedResponse(
+            body=body,
+            etag='"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"',
+            headers={name: response.headers[name] for name in self.CACHED_HEADERS if name in response.headers},
+        )
+        versions = getattr(request.state, "cache_versions", None)
+        if versions is None or not await self.backend.set(self.key(request), entry, tags, versions):
+            # invalidated while this body was rendered, or never looked up
+            self.stale_skips += 1
+        started = getattr(request.state, "cache_miss_started", None)
+        if started is not None:
+            self.miss_seconds += time.perf_counter() - started
+        return self._respond(request, entry)
+
+    def _respond(self, request: Request, entry: CachedResponse) -> Response:
+        headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    async def invalidate(self, *tags: str):
+        await self.backend.invalidate(tags)
+        if not self.broadcast or not tags:
+            return
+        try:
+            for batch in _batches(tags):
+                await realtime.notify(CACHE_CHANNEL, "invalidate", {"origin": self.origin, "tags": batch})
+        except Exception:
+            # the write is committed either way; other processes catch up within max_age
+            logger.exception("Broadcasting a cache invalidation failed")
+
+    async def apply(self, event: str, data: Optional[dict]):
+        """Broker handler for CACHE_CHANNEL."""
+        if event == "resync":
+            await self.backend.clear()
+        elif event == "invalidate" and data["origin"] != self.origin:
+            await self.backend.invalidate(data["tags"])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        mean_miss = self.miss_seconds / self.misses if self.misses else 0.0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "stale_skips": self.stale_skips,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "mean_miss_seconds": mean_miss,
+            # each hit skipped roughly one miss worth of database and serialization work
+            "estimated_seconds_saved": self.hits * mean_miss,
+        }
+
+
+def _batches(tags, max_bytes: int = realtime.MAX_PAYLOAD_BYTES - 200):
+    """Split ``tags`` into lists small enough for one NOTIFY payload each."""
+    batch, size = [], 0
+    for tag in tags:
+        if batch and size + len(tag.encode()) + 3 > max_bytes:
+            yield batch
+            batch, size = [], 0
+        batch.append(tag)
+        size += len(tag.encode()) + 3
+    if batch:
+        yield batch
+
+
+response_cache = ResponseCache(
+    MemoryBackend(settings.response_cache_size, settings.response_cache_max_age_seconds),
+    broadcast=settings.realtime_enabled,
+)
+realtime.broker.watch(CACHE_CHANNEL, response_cache.apply)
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .config import settings
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Logging out, and replaying a refresh token that was already rotated, revoke a whole
+# login session: every access token minted from one login carries its session id.
+# Access tokens are short-lived, so a revocation matters only until the session's last
+# access token expires. token_revocations rows carry that time and are purged after it.
+#
+# Looking the table up on every authenticated request would add a query to each one.
+# Instead each process holds the live revocations in a Bloom filter, synced in the
+# background. A miss is definitive. A hit (a revoked session, or a false positive at
+# about ``error_rate``) is confirmed against the table. Before the first sync, and
+# whenever syncing falls behind, every check goes to the table, so a revocation is
+# never missed because of a stale filter.
+
+class BloomFilter:
+    """Set membership with no false negatives, sized for ``capacity`` items at ``error_rate``."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _probe(self, item: str):
+        # k positions from one 128-bit digest by double hashing (Kirsch-Mitzenmacher)
+        digest = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=16).digest(), "little")
+        return digest & 0xFFFFFFFFFFFFFFFF, (digest >> 64) | 1
+
+    def add(self, item: str):
+        h1, h2 = self._probe(item)
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % self.size
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        # most lookups are for sessions that were never revoked; those stop at the first clear bit
+        h1, h2 = self._probe(item)
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class RevocationList:
+    """In-process view of token_revocations, kept in sync by a background task.
+
+    Every ``interval`` seconds it adds the rows created since the previous sync, re-reading
+    ``overlap`` seconds so rows committed late are not missed. Every ``rebuild_interval`` seconds, or once the filter fills up, it purges
+    expired revocations and refresh tokens and rebuilds the filter from what is left.
+    """
+
+    def __init__(self, interval: float, rebuild_interval: float, error_rate: float,
+                 min_capacity: int = 1024, overlap: float = 60):
+        self.interval = interval
+        self.rebuild_interval = rebuild_interval
+        self.error_rate = error_rate
+        self.min_capacity = min_capacity
+        self.overlap = timedelta(seconds=overlap)
+        self.filter = None
+        self.synced_at = 0.0
+        self.rebuilt_at = 0.0
+        self.lookups = 0
+        self.revoked = 0
+        self._since = None
+        self._recent = set()  # ids from the previous overlapping read, already added
+        self._task = None
+
+    def may_be_revoked(self, session_id: str) -> bool:
+        """False only when the session is certainly not revoked."""
+        current = self.filter
+        if current is None or time.monotonic() - self.synced_at > 3 * self.interval:
+            return True
+        return session_id in current
+
+    async def is_revoked(self, db: AsyncSession, session_id: str) -> bool:
+        if not self.may_be_revoked(session_id):
+            return False
+        self.lookups += 1
+        revocation = models.TokenRevocation
+        revoked = await db.scalar(select(revocation.session_id).where(
+            revocation.session_id == session_id, revocation.expires_at > func.now()))
+        if revoked is not None:
+            self.revoked += 1
+        return revoked is not None
+
+    def add(self, session_id: str):
+        """Apply a revocation committed by this process without waiting for the next sync."""
+        if self.filter is not None:
+            self.filter.add(session_id)
+
+    async def sync(self):
+        revocation = models.TokenRevocation
+        async with AsyncSessionLocal() as db:
+            now = await db.scalar(select(func.now()))
+            current = self.filter
+            if (current is None or current.count > current.capacity
+                    or time.monotonic() - self.rebuilt_at > self.rebuild_interval):
+                await db.execute(delete(revocation).where(revocation.expires_at <= now))
+                await db.execute(delete(models.RefreshToken).where(models.RefreshToken.expires_at <= now))
+                await db.commit()
+                session_ids = (await db.scalars(select(revocation.session_id))).all()
+                rebuilt = BloomFilter(max(self.min_capacity, 2 * len(session_ids)), self.error_rate)
+                for session_id in session_ids:
+                    rebuilt.add(session_id)
+                self.filter = current = rebuilt
+                self.rebuilt_at = time.monotonic()
+                self._recent = set()
+            else:
+                recent = set(await db.scalars(
+                    select(revocation.session_id).where(revocation.created_at > self._since)))
+                for session_id in recent - self._recent:
+                    current.add(session_id)
+                self._recent = recent
+        self._since = now - self.overlap
+        self.synced_at = time.monotonic()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Syncing the token revocation list failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def stats(self) -> dict:
+        current = self.filter
+        return {
+            "sessions": current.count if current is not None else 0,
+            "filter_bytes": len(current.bits) if current is not None else 0,
+            "lookups": self.lookups,
+            "revoked": self.revoked,
+        }
+
+
+revocation_list = RevocationList(
+    interval=settings.revocation_sync_interval_seconds,
+    # a revocation outlives its session's access tokens by at most this long
+    rebuild_interval=settings.access_token_expire_minutes * 60,
+    error_rate=settings.revocation_false_positive_rate,
+)
+
+
+async def revoke_session(db: AsyncSession, session_id: str):
+    """End a login session: its refresh tokens are deleted and its access tokens rejected
+    until they would have expired anyway. Commits."""
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
+    await db.execute(insert(models.TokenRevocation).values(session_id=session_id, expires_at=expires_at)
+                     .on_conflict_do_nothing())
+    await db.execute(delete(models.RefreshToken).where(models.RefreshToken.session_id == session_id))
+    await db.commit()
+    revocation_list.add(session_id)
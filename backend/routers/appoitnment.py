@@ -1,85 +1,153 @@
 from fastapi import FastAPI,Response,status,HTTPException,Depends,APIRouter
-from .. import models,schemas,database,utils,security
-from sqlalchemy.orm import Session
+from .. import models,schemas,database,utils,security,slots,outbox,realtime,serialization,therapist_stats
+from datetime import datetime, timezone
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import get_db
+from ..replica import get_read_db
 
 router = APIRouter(
     prefix="/appointments",
     tags=['Appointments']
 )
 
+def _appointment_event(appointment):
+    return {
+        "appointment_id": appointment.id,
+        "user_id": appointment.user_id,
+        "therapist_id": appointment.therapist_id,
+        "scheduled_time": appointment.scheduled_time.isoformat(),
+        "status": appointment.status,
+    }
+
+def select_pending(therapist_id: int):
+    return select(models.Appointment).where(models.Appointment.therapist_id == therapist_id,
+                                            models.Appointment.status == "pending")
+
+def select_confirmed(user_id: int):
+    return select(models.Appointment).where(models.Appointment.user_id == user_id,
+                                            models.Appointment.status == "confirmed")
+
 @router.post("/", response_model=schemas.AppointmentResponse)
-def create_appointment(appointment: schemas.AppointmentCreate, db:Session = Depends(database.get_db),
+async def create_appointment(appointment: schemas.AppointmentCreate, db:AsyncSession = Depends(database.get_db),
                        current_user = Depends(security.get_current_user)):
     
-    therapist = db.query(models.Therapist).filter(models.Therapist.id == appointment.therapist_id, models.User.userType == "therapist").first()
+    result = await db.execute(select(models.Therapist).join(models.Therapist.user).where(
+        models.Therapist.id == appointment.therapist_id, models.User.userType == "therapist"))
+    therapist = result.scalars().first()
     if not therapist:
         raise HTTPException(status_code=404, detail="Therapist not found")
+
+    # therapists who publish availability can only be booked on one of their slots
+    scheduled_time = slots.as_utc(appointment.scheduled_time)
+    result = await db.execute(select(models.TherapistAvailability).where(
+        models.TherapistAvailability.therapist_id == appointment.therapist_id))
+    windows = result.scalars().all()
+    if windows and not slots.is_slot_start(windows, scheduled_time, slots.SLOT_LENGTH):
+        raise HTTPException(status_code=400, detail="Requested time is not an available slot")
     
     new_appointment = models.Appointment(
         user_id=current_user.id,
         therapist_id=appointment.therapist_id,
-        scheduled_time=appointment.scheduled_time,
+        scheduled_time=scheduled_time,
+        ends_at=scheduled_time + slots.SLOT_LENGTH,
         status="pending"
     )
 
     db.add(new_appointment)
-    db.commit()
-    db.refresh(new_appointment)
+    try:
+        await db.flush()
+        await db.execute(therapist_stats.booking(new_appointment))
+        event = _appointment_event(new_appointment)
+        outbox.enqueue(db, "appointment.created", event)
+        await realtime.publish(db, f"therapist:{new_appointment.therapist_id}", "appointment.created", event)
+        await db.commit()
+    except IntegrityError:
+        # ex_appointments_therapist_id_period: someone else booked an overlapping time first
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="This time slot is already booked")
+    outbox.outbox_worker.wake()
+    await db.refresh(new_appointment)
     return new_appointment
 
 
 @router.get("/pending", response_model=list[schemas.AppointmentResponse])
-def view_pending_appointments(db: Session = Depends(database.get_db),
+async def view_pending_appointments(response: Response, db: AsyncSession = Depends(get_read_db),
                               current_user=Depends(security.get_current_user)):
     
-    therapist = db.query(models.Therapist).filter(models.Therapist.user_id == current_user.id).first()
+    therapist_id = await security.get_therapist_id(db, current_user)
     
-    if not therapist:
+    if not therapist_id:
         raise HTTPException(status_code=404, detail="Therapist profile not found")
     
-    appointments = db.query(models.Appointment).filter(models.Appointment.therapist_id == therapist.id,
-                                                        models.Appointment.status == "pending").all()
+    result = await db.execute(select_pending(therapist_id))
+    appointments = result.scalars().all()
 
     if not appointments:
         raise HTTPException(status_code=404, detail="No pending appointments found")
 
-    return appointments
+    return serialization.json_response(response, list[schemas.AppointmentResponse], appointments)
+
+@router.post("/events/token", response_model=schemas.StreamToken)
+async def appointment_events_token(token: schemas.TokenData = Depends(security.get_token_data),
+                                   current_user=Depends(security.get_current_user)):
+    """A token for ``GET /appointments/events?token=...``, for EventSource clients."""
+    return {"token": security.create_stream_token(token), "expires_in": security.STREAM_TOKEN_EXPIRE_SECONDS}
+
+@router.get("/events")
+async def appointment_events(db: AsyncSession = Depends(database.get_db),
+                             current_user=Depends(security.get_stream_user)):
+    """Server-sent events for the caller's appointments: appointment.confirmed for their own
+    bookings and, for therapists, appointment.created for their inbox. Authenticated by an
+    access token, or by a token from ``POST /appointments/events/token`` in ``?token=``."""
+    channels = [f"user:{current_user.id}"]
+    therapist_id = await security.get_therapist_id(db, current_user)
+    if therapist_id:
+        channels.append(f"therapist:{therapist_id}")
+    return realtime.event_stream(channels)
 
 @router.put("/{appointment_id}/confirm", response_model=schemas.AppointmentResponse)
-def confirm_appointment(appointment_id: int,db: Session = Depends(database.get_db),
+async def confirm_appointment(appointment_id: int,db: AsyncSession = Depends(database.get_db),
                         current_user=Depends(security.get_current_user)):
    
-    therapist = db.query(models.Therapist).filter(models.Therapist.user_id == current_user.id).first()
+    therapist_id = await security.get_therapist_id(db, current_user)
 
-    if not therapist:
+    if not therapist_id:
         raise HTTPException(status_code=403, detail="You are not registered as a therapist")
 
-    appointment = db.query(models.Appointment).filter(models.Appointment.id == appointment_id,
-                                                      models.Appointment.therapist_id == therapist.id).first()
+    # locked so a double-submitted confirm counts once in the therapist's stats
+    result = await db.execute(select(models.Appointment).where(models.Appointment.id == appointment_id,
+                                                                models.Appointment.therapist_id == therapist_id)
+                              .with_for_update())
+    appointment = result.scalars().first()
 
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found or unauthorized")
 
-    appointment.status = "confirmed"
-    db.commit()
-    db.refresh(appointment)
-
-    print(f"📩 Notification: Appointment {appointment_id} confirmed for user {appointment.user_id}")
+    if appointment.status != "confirmed":
+        previous, appointment.status = appointment.status, "confirmed"
+        appointment.confirmed_at = datetime.now(timezone.utc)
+        await db.execute(therapist_stats.status_change(appointment, previous))
+        # the patient is notified by the outbox worker once this commits, once per confirmation
+        event = _appointment_event(appointment)
+        outbox.enqueue(db, "appointment.confirmed", event)
+        await realtime.publish(db, f"user:{appointment.user_id}", "appointment.confirmed", event)
+    await db.commit()
+    outbox.outbox_worker.wake()
+    await db.refresh(appointment)
 
     return appointment
 
 @router.get("/confirmed", response_model=list[schemas.AppointmentResponse])
-def view_confirmed_appointments(db: Session = Depends(database.get_db),
+async def view_confirmed_appointments(response: Response, db: AsyncSession = Depends(get_read_db),
                                 current_user=Depends(security.get_current_user)):
 
-    appointments = db.query(models.Appointment).filter(
-        models.Appointment.user_id == current_user.id,
-        models.Appointment.status == "confirmed"
-    ).all()
+    result = await db.execute(select_confirmed(current_user.id))
+    appointments = result.scalars().all()
 
     if not appointments:
         raise HTTPException(status_code=404, detail="No confirmed appointments found")
 
-    return appointments
+    return serialization.json_response(response, list[schemas.AppointmentResponse], appointments)
 
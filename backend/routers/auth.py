@@ -1,24 +1,68 @@
 from fastapi import HTTPException,Response,Depends,APIRouter,status
-from .. import database,schemas, models, utils, security
-from sqlalchemy.orm import session
+from .. import database,schemas, models, utils, security, revocation
+from datetime import datetime, timezone
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 
 router = APIRouter(tags= ["Authentication"])
 
 @router.post("/login",response_model=schemas.Token)
-def userlogin(user_credentials: schemas.UserLogin, db: session = Depends(database.get_db)):
+async def userlogin(user_credentials: schemas.UserLogin, db: AsyncSession = Depends(database.get_db)):
 
-    user = db.query(models.User).filter(models.User.email == user_credentials.email).first()
+    result = await db.execute(select(models.User).where(models.User.email == user_credentials.email))
+    user = result.scalars().first()
 
     if not user:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,detail=f"invalid credentials")
 
-    if not utils.verify(user_credentials.password,user.password):
+    valid, new_hash = await utils.password_hasher.verify_and_update(user_credentials.password, user.password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,detail=f"Invalid credentials")
     
     if user.userType != user_credentials.userType:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid user type")
-    
-    access_token = security.create_access_token(data={"user_id": user.id})
-    
-    return {"access_token" : access_token, "token_type": "bearer"}
\ No newline at end of file
+
+    # stored hash was made with a different bcrypt cost
+    if new_hash:
+        user.password = new_hash
+
+    tokens = security.issue_tokens(db, user.id)
+    await db.commit()
+
+    return tokens
+
+@router.post("/token/refresh", response_model=schemas.Token)
+async def refresh_access_token(body: schemas.RefreshRequest, db: AsyncSession = Depends(database.get_db)):
+    invalid = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    token_hash = security.refresh_token_hash(body.refresh_token)
+    refresh = models.RefreshToken
+
+    # each refresh token is exchanged at most once; the conditional update settles races
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        update(refresh)
+        .where(refresh.token_hash == token_hash, refresh.used_at.is_(None), refresh.expires_at > now)
+        .values(used_at=now)
+        .returning(refresh.user_id, refresh.session_id)
+    )
+    claimed = result.first()
+    if claimed is None:
+        reused = await db.scalar(select(refresh.session_id).where(refresh.token_hash == token_hash,
+                                                                  refresh.used_at.isnot(None)))
+        if reused is not None:
+            # a rotated-out token came back, so one copy is in the wrong hands: end the session
+            await revocation.revoke_session(db, reused)
+        raise invalid
+
+    tokens = security.issue_tokens(db, claimed.user_id, claimed.session_id)
+    await db.commit()
+    return tokens
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token: str = Depends(security.oauth2_scheme), db: AsyncSession = Depends(database.get_db)):
+    token_data = security.verify_access_token(
+        token, HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"))
+    if token_data.session_id is not None:
+        await revocation.revoke_session(db, token_data.session_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,81 +1,259 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import func, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from .. import models, schemas,security
+from datetime import datetime
+from .. import models, schemas,security, loaders, pagination, realtime, search, serialization, streaming, tags, trending
 from ..database import get_db
+from ..like_buffer import like_buffer
+from ..replica import get_read_db
+from ..response_cache import response_cache
 
 router = APIRouter(
     prefix="/community",
     tags=["Community"]
 )
 
+# Statement builders: each route runs the statement its builder returns, and
+# benchmarks/query_plans.py EXPLAINs the same builders, so the plans checked there are
+# the plans served here.
+
+def select_topic(topic_id: int):
+    return select(models.ForumTopic).options(*loaders.topic_detail()).where(models.ForumTopic.id == topic_id)
+
+def select_topics(options, category: str = None, after: tuple = None, limit: int = 10):
+    """A page of limit + 1 topics loaded with ``options``, newest first after the
+    (created_at, id) keyset ``after``."""
+    # (created_at, id) matches ix_forum_topics_created_at_id
+    query = select(models.ForumTopic).options(*options)
+    if category:
+        query = query.where(models.ForumTopic.category == category)
+    if after is not None:
+        query = query.where(tuple_(models.ForumTopic.created_at, models.ForumTopic.id) < after)
+    return query.order_by(models.ForumTopic.created_at.desc(), models.ForumTopic.id.desc()).limit(limit + 1)
+
+def select_popular_tags(limit: int = 20):
+    # served from ix_tags_topic_count_id, counts are maintained on write
+    return (
+        select(models.Tag)
+        .where(models.Tag.topic_count > 0)
+        .order_by(models.Tag.topic_count.desc(), models.Tag.id.desc())
+        .limit(limit)
+    )
+
+def select_tag_topics(tag_id: int, after: int = None, limit: int = 10):
+    # newest first by topic id, which walks ix_topic_tags_tag_id_topic_id backwards
+    query = (
+        select(models.ForumTopic)
+        .options(*loaders.topic_summary())
+        .join(models.TopicTag, models.TopicTag.topic_id == models.ForumTopic.id)
+        .where(models.TopicTag.tag_id == tag_id)
+    )
+    if after is not None:
+        query = query.where(models.TopicTag.topic_id < after)
+    return query.order_by(models.TopicTag.topic_id.desc()).limit(limit + 1)
+
+def select_comments(topic_id: int, after: tuple = None, limit: int = None):
+    """A thread's comments after the (created_at, id) keyset ``after``; limit + 1 of them, or
+    all of them when ``limit`` is None."""
+    # oldest first so a thread reads top to bottom; served by ix_comments_topic_id_created_at_id
+    query = select(models.Comment).options(*loaders.comment()).where(models.Comment.topic_id == topic_id)
+    if after is not None:
+        query = query.where(tuple_(models.Comment.created_at, models.Comment.id) > after)
+    query = query.order_by(models.Comment.created_at, models.Comment.id)
+    return query if limit is None else query.limit(limit + 1)
+
+def select_events(after: int = None, limit: int = 10):
+    # Event.date is free text, so pages follow the primary key
+    query = select(models.Event).options(*loaders.event())
+    if after is not None:
+        query = query.where(models.Event.id > after)
+    return query.order_by(models.Event.id).limit(limit + 1)
+
+def select_attendees(event_id: int, after: int = None, limit: int = None):
+    # ordered by user id so pages walk uq_event_attendees_event_id_user_id
+    query = (
+        select(models.User)
+        .join(models.EventAttendee, models.EventAttendee.user_id == models.User.id)
+        .where(models.EventAttendee.event_id == event_id)
+    )
+    if after is not None:
+        query = query.where(models.EventAttendee.user_id > after)
+    query = query.order_by(models.EventAttendee.user_id)
+    return query if limit is None else query.limit(limit + 1)
+
+async def _load_topic(db: AsyncSession, topic_id: int):
+    result = await db.execute(select_topic(topic_id))
+    return result.scalars().first()
+
+def _created_at_cursor(cursor: str):
+    return tuple(pagination.decode_cursor(cursor, datetime, int)) if cursor else None
+
+def _topic_key(topic):
+    return topic.created_at, topic.id
+
 # Forum Topics
 @router.post("/topics", response_model=schemas.ForumTopicResponse)
-def create_topic(
+async def create_topic(
     topic: schemas.ForumTopicCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
 ):
+    tag_names = tags.normalize(topic.tags)
     db_topic = models.ForumTopic(
         title=topic.title,
         content=topic.content,
         category=topic.category,
-        user_id=current_user.id
+        user_id=current_user.id,
+        search_vector=search.topic_search_vector(topic.title, topic.content, tag_names)
     )
     db.add(db_topic)
-    db.commit()
-    db.refresh(db_topic)
+    await db.flush()
 
-    # Add tags if provided
-    if topic.tags:
-        for tag_name in topic.tags:
-            db_tag = models.TopicTag(name=tag_name, topic_id=db_topic.id)
-            db.add(db_tag)
-        db.commit()
-        db.refresh(db_topic)
+    # Add tags if provided, in the same transaction as the topic
+    if tag_names:
+        await db.execute(tags.attach_tags(db_topic.id, tag_names))
+    await db.execute(trending.new_topic(db_topic))
+    await db.commit()
+    if tag_names:
+        await response_cache.invalidate("tags")
 
-    return db_topic
+    return await _load_topic(db, db_topic.id)
 
 @router.get("/topics", response_model=List[schemas.ForumTopicResponse])
-def get_topics(
-    skip: int = 0,
-    limit: int = 10,
+async def get_topics(
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(10, ge=1, le=100),
     category: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(models.ForumTopic)
-    if category:
-        query = query.filter(models.ForumTopic.category == category)
-    return query.offset(skip).limit(limit).all()
+    # each topic carries only its first comments, see loaders.TOPIC_COMMENT_PREVIEW
+    result = await db.execute(select_topics(loaders.topic_listing(), category, _created_at_cursor(cursor), limit))
+    topics = pagination.paginate(result.scalars().all(), limit, response, _topic_key)
+    await loaders.comment_previews(db, topics)
+    return serialization.json_response(response, List[schemas.ForumTopicResponse], topics)
+
+@router.get("/topics/summary", response_model=List[schemas.ForumTopicSummary])
+async def get_topic_summaries(
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(10, ge=1, le=100),
+    category: str = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    result = await db.execute(select_topics(loaders.topic_summary(), category, _created_at_cursor(cursor), limit))
+    topics = pagination.paginate(result.scalars().all(), limit, response, _topic_key)
+    return serialization.json_response(response, List[schemas.ForumTopicSummary], topics)
+
+@router.get("/topics/trending", response_model=List[schemas.ForumTopicSummary])
+async def get_trending_topics(
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(10, ge=1, le=100),
+    category: str = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    # most active first by time-decayed likes, comments and recency, see trending.py
+    after = pagination.decode_cursor(cursor, float, int) if cursor else None
+    result = await db.execute(trending.trending_page(category, after, limit))
+    rows = pagination.paginate(result.all(), limit, response, lambda row: (row.score, row.ForumTopic.id))
+    return serialization.json_response(response, List[schemas.ForumTopicSummary], [row.ForumTopic for row in rows])
+
+@router.get("/search", response_model=List[schemas.SearchResult])
+async def search_forum(
+    response: Response,
+    q: str = Query(..., min_length=1),
+    cursor: str = None,
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db)
+):
+    after = pagination.decode_cursor(cursor, float, str, int) if cursor else None
+    result = await db.execute(search.search_page(q, after, limit))
+    hits = pagination.paginate(result.mappings().all(), limit, response, lambda hit: (hit["rank"], hit["kind"], hit["id"]))
+    return serialization.json_response(response, List[schemas.SearchResult], hits)
+
+@router.get("/tags/popular", response_model=List[schemas.TagResponse])
+async def get_popular_tags(
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    cached = await response_cache.lookup(request, ["tags"])
+    if cached is not None:
+        return cached
+
+    result = await db.execute(select_popular_tags(limit))
+    return await response_cache.store(request, response, List[schemas.TagResponse], ["tags"], result.scalars().all())
+
+@router.get("/tags/{name}/topics", response_model=List[schemas.ForumTopicSummary])
+async def get_tag_topics(
+    name: str,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    tag_id = await db.scalar(select(models.Tag.id).where(models.Tag.name == name))
+    if tag_id is None:
+        raise HTTPException(status_code=404, detail="Tag not found")
+
+    after = pagination.decode_cursor(cursor, int)[0] if cursor else None
+    result = await db.execute(select_tag_topics(tag_id, after, limit))
+    topics = pagination.paginate(result.scalars().all(), limit, response, lambda topic: (topic.id,))
+    return serialization.json_response(response, List[schemas.ForumTopicSummary], topics)
 
 @router.get("/topics/{topic_id}", response_model=schemas.ForumTopicResponse)
-def get_topic(topic_id: int, db: Session = Depends(get_db)):
-    topic = db.query(models.ForumTopic).filter(models.ForumTopic.id == topic_id).first()
+async def get_topic(topic_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    cached = await response_cache.lookup(request, [f"topic:{topic_id}"])
+    if cached is not None:
+        return cached
+
+    topic = await _load_topic(db, topic_id)
     if not topic:
         raise HTTPException(status_code=404, detail="Topic not found")
-    return topic
+    return await response_cache.store(request, response, schemas.ForumTopicResponse, [f"topic:{topic_id}"], topic)
+
+async def _insert_once(db: AsyncSession, model, **key):
+    """Insert a row guarded by a unique constraint; False if it already exists, None if
+    a referenced row (topic, comment) is missing. The caller commits."""
+    stmt = insert(model).values(**key).on_conflict_do_nothing().returning(model.id)
+    try:
+        result = await db.execute(stmt)
+    except IntegrityError:
+        # foreign key violation: the referenced row does not exist
+        await db.rollback()
+        return None
+    return result.scalar() is not None
 
 @router.post("/topics/{topic_id}/like")
-def like_topic(
+async def like_topic(
     topic_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
 ):
-    topic = db.query(models.ForumTopic).filter(models.ForumTopic.id == topic_id).first()
-    if not topic:
+    liked = await _insert_once(db, models.TopicLike, user_id=current_user.id, topic_id=topic_id)
+    if liked is None:
         raise HTTPException(status_code=404, detail="Topic not found")
-    
-    topic.likes += 1
-    db.commit()
+    if not liked:
+        raise HTTPException(status_code=400, detail="Already liked this topic")
+    await realtime.publish(db, f"topic:{topic_id}", "topic.liked", {"topic_id": topic_id, "user_id": current_user.id})
+    await db.commit()
+
+    # the cached topic is invalidated when the buffered count is flushed
+    like_buffer.add("topic", topic_id)
     return {"message": "Topic liked successfully"}
 
 # Comments
 @router.post("/topics/{topic_id}/comments", response_model=schemas.CommentResponse)
-def create_comment(
+async def create_comment(
     topic_id: int,
     comment: schemas.CommentCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
 ):
     db_comment = models.Comment(
         content=comment.content,
@@ -83,58 +261,160 @@ def create_comment(
         topic_id=topic_id
     )
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
+    await db.flush()
+    await realtime.publish(db, f"topic:{topic_id}", "comment.created",
+                           {"topic_id": topic_id, "comment_id": db_comment.id, "user_id": current_user.id})
+    await db.execute(trending.bump(topic_id, "comment"))
+    await db.commit()
+    await db.refresh(db_comment, attribute_names=["created_at", "likes", "user"])
+    await response_cache.invalidate(f"topic:{topic_id}")
     return db_comment
 
 @router.get("/topics/{topic_id}/comments", response_model=List[schemas.CommentResponse])
-def get_comments(topic_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Comment).filter(models.Comment.topic_id == topic_id).all()
+async def get_comments(
+    topic_id: int,
+    request: Request,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_read_db)
+):
+    after = _created_at_cursor(cursor)
+    if streaming.wants_ndjson(request):
+        # the rest of the thread after the cursor, however long
+        return streaming.ndjson_response(select_comments(topic_id, after), schemas.CommentResponse, bind=db.bind)
+    result = await db.execute(select_comments(topic_id, after, limit))
+    comments = pagination.paginate(result.scalars().all(), limit, response, lambda c: (c.created_at, c.id))
+    return serialization.json_response(response, List[schemas.CommentResponse], comments)
+
+@router.get("/topics/{topic_id}/events")
+async def topic_events(topic_id: int, db: AsyncSession = Depends(get_read_db)):
+    """Server-sent events for a thread: comment.created and topic.liked, ids only.
+    A resync event means events may have been missed; refetch and reconnect."""
+    if await db.scalar(select(models.ForumTopic.id).where(models.ForumTopic.id == topic_id)) is None:
+        raise HTTPException(status_code=404, detail="Topic not found")
+    return realtime.event_stream([f"topic:{topic_id}"])
+
+@router.post("/comments/{comment_id}/like")
+async def like_comment(
+    comment_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
+):
+    liked = await _insert_once(db, models.CommentLike, user_id=current_user.id, comment_id=comment_id)
+    if liked is None:
+        raise HTTPException(status_code=404, detail="Comment not found")
+    if not liked:
+        raise HTTPException(status_code=400, detail="Already liked this comment")
+    await db.commit()
+
+    like_buffer.add("comment", comment_id)
+    return {"message": "Comment liked successfully"}
 
 # Events
 @router.post("/events", response_model=schemas.EventResponse)
-def create_event(
+async def create_event(
     event: schemas.EventCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
 ):
     db_event = models.Event(
-        **event.dict(),
-        created_by=current_user.id
+        **event.model_dump(),
+        created_by=current_user.id,
+        attendee_count=0
     )
     db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
+    await db.commit()
+    await db.refresh(db_event, attribute_names=["creator"])
+    await response_cache.invalidate("events")
     return db_event
 
 @router.get("/events", response_model=List[schemas.EventResponse])
-def get_events(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db)
+async def get_events(
+    request: Request,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
 ):
-    return db.query(models.Event).offset(skip).limit(limit).all()
+    cached = await response_cache.lookup(request, ["events"])
+    if cached is not None:
+        return cached
+
+    after = pagination.decode_cursor(cursor, int)[0] if cursor else None
+    result = await db.execute(select_events(after, limit))
+    events = pagination.paginate(result.scalars().all(), limit, response, lambda e: (e.id,))
+    return await response_cache.store(request, response, List[schemas.EventResponse], ["events"], events)
+
+def _join_event_stmt(event_id: int, user_id: int):
+    """Insert the attendance and bump the event's count in one statement.
+
+    The insert is a no-op if the user already attends (unique constraint); the count only
+    moves if the event still has room. The UPDATE locks the event row and re-checks
+    ``attendee_count < capacity`` against the latest version, so concurrent joins cannot
+    overbook. Returns (inserted, counted); inserted without counted means the event is full
+    and the caller must roll back.
+    """
+    inserted = (
+        insert(models.EventAttendee)
+        .values(event_id=event_id, user_id=user_id)
+        .on_conflict_do_nothing(constraint="uq_event_attendees_event_id_user_id")
+        .returning(models.EventAttendee.event_id)
+        .cte("inserted")
+    )
+    counted = (
+        update(models.Event)
+        .where(
+            models.Event.id.in_(select(inserted.c.event_id)),
+            or_(models.Event.capacity.is_(None), models.Event.attendee_count < models.Event.capacity),
+        )
+        .values(attendee_count=models.Event.attendee_count + 1)
+        .returning(models.Event.id)
+        .cte("counted")
+    )
+    return select(
+        select(func.count()).select_from(inserted).scalar_subquery(),
+        select(func.count()).select_from(counted).scalar_subquery(),
+    )
 
 @router.post("/events/{event_id}/join")
-def join_event(
+async def join_event(
     event_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(security.get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: security.Principal = Depends(security.get_current_user)
 ):
-    event = db.query(models.Event).filter(models.Event.id == event_id).first()
-    if not event:
+    try:
+        inserted, counted = (await db.execute(_join_event_stmt(event_id, current_user.id))).one()
+    except IntegrityError:
+        # foreign key violation: the event does not exist
+        await db.rollback()
         raise HTTPException(status_code=404, detail="Event not found")
-    
-    # Check if user is already attending
-    existing_attendee = db.query(models.EventAttendee).filter(
-        models.EventAttendee.event_id == event_id,
-        models.EventAttendee.user_id == current_user.id
-    ).first()
-    
-    if existing_attendee:
+    if not inserted:
+        await db.rollback()
         raise HTTPException(status_code=400, detail="Already attending this event")
-    
-    attendee = models.EventAttendee(event_id=event_id, user_id=current_user.id)
-    db.add(attendee)
-    db.commit()
-    return {"message": "Successfully joined event"} 
\ No newline at end of file
+    if not counted:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Event is full")
+    await db.commit()
+
+    await response_cache.invalidate("events")
+    return {"message": "Successfully joined event"} 
+
+@router.get("/events/{event_id}/attendees", response_model=List[schemas.UserOut])
+async def get_event_attendees(
+    event_id: int,
+    request: Request,
+    response: Response,
+    cursor: str = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_read_db)
+):
+    if await db.scalar(select(models.Event.id).where(models.Event.id == event_id)) is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+
+    after = pagination.decode_cursor(cursor, int)[0] if cursor else None
+    if streaming.wants_ndjson(request):
+        return streaming.ndjson_response(select_attendees(event_id, after), schemas.UserOut, bind=db.bind)
+    result = await db.execute(select_attendees(event_id, after, limit))
+    users = pagination.paginate(result.scalars().all(), limit, response, lambda user: (user.id,))
+    return serialization.json_response(response, List[schemas.UserOut], users)
@@ -0,0 +1,69 @@
+import ipaddress
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
+from ..config import settings
+from ..database import async_engine, pool_stats
+from ..like_buffer import like_buffer
+from ..metrics import registry
+from ..outbox import outbox_worker
+from ..principals import principal_cache
+from ..realtime import broker
+from ..replica import replica_monitor
+from ..response_cache import response_cache
+from ..revocation import revocation_list
+from ..utils import password_hasher
+
+ALLOWED_NETWORKS = [ipaddress.ip_network(network.strip())
+                    for network in settings.internal_allowed_networks.split(",") if network.strip()]
+
+def require_internal_access(request: Request):
+    """Pool stats and metrics are for operators: with INTERNAL_TOKEN set they need it as a
+    bearer token, otherwise the client has to be in INTERNAL_ALLOWED_NETWORKS."""
+    if settings.internal_token:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.internal_token.encode()):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials",
+                                headers={"WWW-Authenticate": "Bearer"})
+        return
+    try:
+        client = ipaddress.ip_address(request.client.host if request.client else "")
+    except ValueError:
+        client = None
+    if getattr(client, "ipv4_mapped", None) is not None:
+        client = client.ipv4_mapped
+    if client is None or not any(client in network for network in ALLOWED_NETWORKS):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed from this address")
+
+router = APIRouter(
+    tags=["Internal"],
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_access)]
+)
+
+@router.get("/internal/pool")
+async def get_pool_stats():
+    pool = async_engine.pool
+    stats = {"pool": type(pool).__name__, "status": pool.status(), **pool_stats.as_dict()}
+    if hasattr(pool, "size"):
+        stats.update(size=pool.size(), overflow=pool.overflow(), checked_in=pool.checkedin())
+    if replica_monitor is not None:
+        replica_pool = replica_monitor.engine.pool
+        stats["replica"] = {"pool": type(replica_pool).__name__, "status": replica_pool.status(), **replica_monitor.stats()}
+    return stats
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint: per-route latency and SQL accounting plus pool gauges."""
+    gauges = {f"db_pool_{name}": value for name, value in pool_stats.as_dict().items()}
+    gauges.update({f"principal_cache_{name}": value for name, value in principal_cache.stats().items()})
+    gauges.update({f"password_hasher_{name}": value for name, value in password_hasher.stats().items()})
+    gauges.update({f"like_buffer_{name}": value for name, value in like_buffer.stats().items()})
+    gauges.update({f"response_cache_{name}": value for name, value in response_cache.stats().items()})
+    gauges.update({f"outbox_{name}": value for name, value in outbox_worker.stats().items()})
+    gauges.update({f"realtime_{name}": value for name, value in broker.stats().items()})
+    gauges.update({f"revocation_{name}": value for name, value in revocation_list.stats().items()})
+    if replica_monitor is not None:
+        gauges.update({f"replica_{name}": value for name, value in replica_monitor.stats().items()})
+    return PlainTextResponse(registry.render(gauges), media_type="text/plain; version=0.0.4")
@@ -1,22 +1,35 @@
-from fastapi import FastAPI,Response,status,HTTPException,Depends,APIRouter
-from .. import models,schemas,database,utils,security
-from sqlalchemy.orm import Session
+from fastapi import FastAPI,Request,Response,status,HTTPException,Depends,APIRouter,Query
+from .. import models,schemas,database,utils,security,slots,pagination,serialization,therapist_stats
+from datetime import date, datetime, timedelta
+from typing import Literal
+from sqlalchemy import DateTime, Integer, delete, literal, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import get_db
+from ..principals import principal_cache
+from ..replica import get_read_db
+from ..response_cache import response_cache
 
 router = APIRouter(
     prefix="/therapists",
     tags=['Therapists']
 )
 
+MAX_SLOT_RANGE = timedelta(days=62)
+MAX_STATS_RANGE = timedelta(days=366)
+
+def select_profile(user_id: int):
+    return select(models.Therapist).where(models.Therapist.user_id == user_id)
+
 @router.post("/", response_model=schemas.TherapistResponse)
-def create_therapist(therapist: schemas.TherapistCreate,db: Session = Depends(database.get_db),
+async def create_therapist(therapist: schemas.TherapistCreate,db: AsyncSession = Depends(database.get_db),
                      current_user=Depends(security.get_current_user)  
 ):
     
     if current_user.userType != "therapist":
         raise HTTPException(status_code=403, detail="Only therapists can create a profile.")
 
-    existing_therapist = db.query(models.Therapist).filter(models.Therapist.user_id == current_user.id).first()
+    result = await db.execute(select_profile(current_user.id))
+    existing_therapist = result.scalars().first()
     if existing_therapist:
         raise HTTPException(status_code=400, detail="Therapist profile already exists.")
 
@@ -30,29 +43,160 @@ def create_therapist(therapist: schemas.TherapistCreate,db: Session = Depends(da
     )
 
     db.add(new_therapist)
-    db.commit()
-    db.refresh(new_therapist)
+    await db.commit()
+    await db.refresh(new_therapist)
+    # the cached principal still says this user has no therapist profile
+    principal_cache.invalidate(current_user.id)
+    await response_cache.invalidate("therapists")
     return new_therapist
 
+# sort -> (leading column, its cursor type, descending); ties break on id in the same direction
+THERAPIST_SORTS = {
+    "id": (None, None, False),
+    "name": (models.Therapist.name, str, False),
+    "experience": (models.Therapist.experience, int, True),
+}
+
+def therapist_sort_keys(sort: str):
+    """The (sort column, id) keyset of a directory sort, and the cursor types of its keys."""
+    column, column_type, _ = THERAPIST_SORTS[sort]
+    if column is None:
+        return (models.Therapist.id,), (int,)
+    return (column, models.Therapist.id), (column_type, int)
+
+def select_therapists(specialization: str = None, min_experience: int = None, q: str = None, sort: str = "id",
+                      after: tuple = None, limit: int = 20):
+    """A directory page: limit + 1 therapists matching the filters, in ``sort`` order after the
+    ``after`` keyset."""
+    keys, _ = therapist_sort_keys(sort)
+    descending = THERAPIST_SORTS[sort][2]
+    query = select(models.Therapist)
+    if specialization:
+        query = query.where(models.Therapist.specialization == specialization)
+    if min_experience is not None:
+        query = query.where(models.Therapist.experience >= min_experience)
+    if q:
+        # substring match, answered by the pg_trgm GIN indexes on name and bio
+        pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        query = query.where(or_(models.Therapist.name.ilike(pattern), models.Therapist.bio.ilike(pattern)))
+    if after is not None:
+        query = query.where(tuple_(*keys) < after if descending else tuple_(*keys) > after)
+    return query.order_by(*(key.desc() if descending else key for key in keys)).limit(limit + 1)
+
 @router.get("/", response_model=list[schemas.TherapistResponse])
-def get_all_therapists(db: Session = Depends(database.get_db)):
-    return db.query(models.Therapist).all()
+async def get_all_therapists(request: Request, response: Response, specialization: str = None, min_experience: int = None,
+                             q: str = None, sort: Literal["id", "name", "experience"] = "id", cursor: str = None,
+                             limit: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(database.get_db)):
+    cached = await response_cache.lookup(request, ["therapists"])
+    if cached is not None:
+        return cached
+
+    keys, types = therapist_sort_keys(sort)
+    after = tuple(pagination.decode_cursor(cursor, *types)) if cursor else None
+    result = await db.execute(select_therapists(specialization, min_experience, q, sort, after, limit))
+    therapists = pagination.paginate(result.scalars().all(), limit, response,
+                                     lambda therapist: tuple(getattr(therapist, key.key) for key in keys))
+    return await response_cache.store(request, response, list[schemas.TherapistResponse], ["therapists"], therapists)
 
 @router.get("/me", response_model=schemas.TherapistResponse)
-def get_my_profile(db: Session = Depends(database.get_db),current_user=Depends(security.get_current_user)):
-    therapist = db.query(models.Therapist).filter(models.Therapist.user_id == current_user.id).first()
+async def get_my_profile(db: AsyncSession = Depends(database.get_db),current_user=Depends(security.get_current_user)):
+    result = await db.execute(select_profile(current_user.id))
+    therapist = result.scalars().first()
     if not therapist:
         raise HTTPException(status_code=404, detail="Therapist profile not found. Please complete your setup.")
     return therapist
 
+@router.get("/me/stats", response_model=schemas.TherapistStats)
+async def get_my_stats(start: date = Query(alias="from"), end: date = Query(alias="to"),
+                       bucket: Literal["day", "week", "month"] = "day",
+                       db: AsyncSession = Depends(get_read_db), current_user=Depends(security.get_current_user)):
+    """Appointment counts by status, confirmation lead time and new/repeat clients for the
+    scheduled days in [from, to), per day, week or month. Read from the daily rollups."""
+    therapist_id = await security.get_therapist_id(db, current_user)
+    if not therapist_id:
+        raise HTTPException(status_code=404, detail="Therapist profile not found. Please complete your setup.")
+    if end <= start or end - start > MAX_STATS_RANGE:
+        raise HTTPException(status_code=400, detail="Range must be positive and at most 366 days")
+
+    result = await db.execute(therapist_stats.stats_query(therapist_id, start, end, bucket))
+    rows = result.mappings().all()
+    totals = {name: sum(row[name] for row in rows) for name in therapist_stats.COUNTERS}
+
+    def summary(counts):
+        confirmations = counts["confirmations"]
+        return {
+            **{name: counts[name] for name in ("booked", "pending", "confirmed", "cancelled", "new_clients", "repeat_clients")},
+            "avg_confirmation_lead_seconds": counts["confirmation_lead_seconds"] / confirmations if confirmations else None,
+        }
+
+    return {
+        "start": start, "end": end, "bucket": bucket,
+        "totals": summary(totals),
+        "buckets": [{"start": row["start"], **summary(row)} for row in rows],
+    }
+
 @router.get("/{therapist_id}", response_model=schemas.TherapistResponse)
-def get_therapist(therapist_id: int, db: Session = Depends(database.get_db)):
-    therapist = db.query(models.Therapist).filter(models.Therapist.id == therapist_id).first()
+async def get_therapist(therapist_id: int, request: Request, response: Response,
+                        db: AsyncSession = Depends(database.get_db)):
+    cached = await response_cache.lookup(request, [f"therapist:{therapist_id}"])
+    if cached is not None:
+        return cached
+
+    result = await db.execute(select(models.Therapist).where(models.Therapist.id == therapist_id))
+    therapist = result.scalars().first()
     if not therapist:
         raise HTTPException(status_code=404, detail="Therapist not found")
-    return therapist
+    return await response_cache.store(request, response, schemas.TherapistResponse, [f"therapist:{therapist_id}"], therapist)
 
+@router.put("/me/availability", response_model=list[schemas.AvailabilityResponse])
+async def set_my_availability(windows: list[schemas.AvailabilityWindow], db: AsyncSession = Depends(database.get_db),
+                              current_user=Depends(security.get_current_user)):
+    therapist_id = await security.get_therapist_id(db, current_user)
+    if not therapist_id:
+        raise HTTPException(status_code=404, detail="Therapist profile not found. Please complete your setup.")
+    if any(window.end_time <= window.start_time for window in windows):
+        raise HTTPException(status_code=400, detail="Availability windows must end after they start")
+
+    # the weekly schedule is replaced as a whole
+    await db.execute(delete(models.TherapistAvailability).where(models.TherapistAvailability.therapist_id == therapist_id))
+    new_windows = [models.TherapistAvailability(therapist_id=therapist_id, **window.model_dump()) for window in windows]
+    db.add_all(new_windows)
+    await db.commit()
+    return new_windows
+
+@router.get("/{therapist_id}/availability", response_model=list[schemas.AvailabilityResponse])
+async def get_availability(therapist_id: int, response: Response, db: AsyncSession = Depends(get_read_db)):
+    result = await db.execute(select(models.TherapistAvailability).where(
+        models.TherapistAvailability.therapist_id == therapist_id
+    ).order_by(models.TherapistAvailability.weekday, models.TherapistAvailability.start_time))
+    return serialization.json_response(response, list[schemas.AvailabilityResponse], result.scalars().all())
+
+def select_booked(therapist_id: int, start: datetime, end: datetime):
+    """(scheduled_time, ends_at) of the live appointments overlapping [start, end), in the
+    terms of the overlap constraint so its gist index answers it."""
+    appointment = models.Appointment
+    return select(appointment.scheduled_time, appointment.ends_at).where(
+        models.therapist_key(appointment.therapist_id).op("&&")(models.therapist_key(literal(therapist_id, Integer))),
+        models.period(appointment.scheduled_time, appointment.ends_at).op("&&")(
+            models.period(literal(start, DateTime), literal(end, DateTime))),
+        appointment.status != "cancelled",
+    )
 
+@router.get("/{therapist_id}/slots", response_model=list[schemas.Slot])
+async def get_free_slots(therapist_id: int, start: datetime = Query(alias="from"), end: datetime = Query(alias="to"),
+                         db: AsyncSession = Depends(get_read_db)):
+    start, end = slots.as_utc(start), slots.as_utc(end)
+    if end <= start or end - start > MAX_SLOT_RANGE:
+        raise HTTPException(status_code=400, detail="Range must be positive and at most 62 days")
 
+    result = await db.execute(select(models.TherapistAvailability).where(
+        models.TherapistAvailability.therapist_id == therapist_id))
+    windows = result.scalars().all()
+    if not windows:
+        return []
 
+    result = await db.execute(select_booked(therapist_id, start, end))
+    busy = slots.merge_intervals(result.tuples())
 
+    free = slots.free_slots(slots.expand_windows(windows, start, end), busy, slots.SLOT_LENGTH, start, end)
+    return [{"start": slot_start, "end": slot_end} for slot_start, slot_end in free]
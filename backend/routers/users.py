@@ -1,6 +1,7 @@
 from fastapi import FastAPI,Response,status,HTTPException,Depends,APIRouter
 from .. import models,schemas,database,utils
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import get_db
 
 router = APIRouter(
@@ -9,21 +10,21 @@ router = APIRouter(
 )
 
 @router.post("/",status_code=status.HTTP_201_CREATED,response_model=schemas.UserOut)
-def create_users(user: schemas.UserCreate,db: Session = Depends(get_db)):
+async def create_users(user: schemas.UserCreate,db: AsyncSession = Depends(get_db)):
 
-    existing_user = db.query(models.User).filter(models.User.email == user.email).first()
+    result = await db.execute(select(models.User).where(models.User.email == user.email))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
 
-    hashed_password = utils.hash(user.password)
+    hashed_password = await utils.password_hasher.hash(user.password)
     user.password = hashed_password
 
-    new_user = models.User(**user.dict())
+    new_user = models.User(**user.model_dump())
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     return new_user
     
-
@@ -0,0 +1,42 @@
+import asyncio
+import logging
+from pathlib import Path
+
+from sqlalchemy import text
+
+from .database import async_engine
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parent / "alembic.ini"
+
+
+def _script_heads():
+    # Imported here so the app does not pay for alembic on every cold start.
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    return set(ScriptDirectory.from_config(Config(str(ALEMBIC_INI))).get_heads())
+
+
+async def check_schema_revision():
+    """Warns when the database is not at the latest migration.
+
+    The schema is owned by Alembic (``alembic -c backend/alembic.ini upgrade head``);
+    the app never creates tables itself. This runs in the background after startup so
+    it never delays the first request.
+    """
+    try:
+        heads = await asyncio.to_thread(_script_heads)
+        async with async_engine.connect() as conn:
+            result = await conn.execute(text("SELECT version_num FROM alembic_version"))
+            current = set(result.scalars())
+    except Exception:
+        logger.warning("Could not verify the database schema revision", exc_info=True)
+        return
+    if current != heads:
+        logger.warning(
+            "Database schema is at %s but migrations head is %s; run `alembic upgrade head`",
+            ", ".join(sorted(current)) or "no revision",
+            ", ".join(sorted(heads)),
+        )
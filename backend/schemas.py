@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from datetime import date, datetime, time
 from typing import Optional, List
 
 class UserBase(BaseModel):
@@ -12,10 +12,11 @@ class UserCreate(UserBase):
 
 class UserOut(BaseModel):
     id: int
-    email: EmailStr
-    
-    class Config:
-        from_attributes = True
+    # validated as EmailStr on the way in; re-checking every address on the way out
+    # dominated the cost of serializing topics and comments
+    email: str = Field(json_schema_extra={"format": "email"})
+
+    model_config = ConfigDict(from_attributes=True)
 
 
 class TherapistBase(BaseModel):
@@ -31,8 +32,8 @@ class TherapistCreate(TherapistBase):
 class TherapistResponse(TherapistBase):
     id: int
     user_id: Optional[int]  
-    class Config:
-        orm_mode = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 class AppointmentBase(BaseModel):
     therapist_id: int
@@ -45,8 +46,42 @@ class AppointmentResponse(AppointmentBase):
     id: int
     status: str  
 
-    class Config:
-        orm_mode = True   
+    model_config = ConfigDict(from_attributes=True)
+
+class AvailabilityWindow(BaseModel):
+    weekday: int = Field(ge=0, le=6)  # 0 = Monday
+    start_time: time
+    end_time: time
+
+class AvailabilityResponse(AvailabilityWindow):
+    id: int
+    therapist_id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+class Slot(BaseModel):
+    start: datetime
+    end: datetime
+
+class StatsTotals(BaseModel):
+    booked: int
+    pending: int
+    confirmed: int
+    cancelled: int
+    new_clients: int
+    repeat_clients: int
+    # booking to confirmation, over confirmations whose booking time is known
+    avg_confirmation_lead_seconds: Optional[float] = None
+
+class StatsBucket(StatsTotals):
+    start: date
+
+class TherapistStats(BaseModel):
+    start: date
+    end: date
+    bucket: str
+    totals: StatsTotals
+    buckets: List[StatsBucket]
 
 class UserLogin(BaseModel):
     email: EmailStr
@@ -56,9 +91,19 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str
+    expires_in: int  # seconds until access_token expires
+
+class StreamToken(BaseModel):
+    token: str
+    expires_in: int  # seconds left to open a stream with it
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     id: Optional[str] = None
+    session_id: Optional[str] = None
 
 # Community Schemas
 class TopicTagBase(BaseModel):
@@ -69,10 +114,8 @@ class TopicTagCreate(TopicTagBase):
 
 class TopicTagResponse(TopicTagBase):
     id: int
-    topic_id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class CommentBase(BaseModel):
     content: str
@@ -88,8 +131,7 @@ class CommentResponse(CommentBase):
     likes: int
     user: UserOut
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ForumTopicBase(BaseModel):
     title: str
@@ -108,8 +150,32 @@ class ForumTopicResponse(ForumTopicBase):
     comments: List[CommentResponse]
     tags: List[TopicTagResponse]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class ForumTopicSummary(ForumTopicBase):
+    id: int
+    user_id: int
+    created_at: datetime
+    likes: int
+    user: UserOut
+    comment_count: int
+    tag_names: List[str]
+
+    model_config = ConfigDict(from_attributes=True)
+
+class TagResponse(TopicTagBase):
+    id: int
+    topic_count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+class SearchResult(BaseModel):
+    kind: str  # "topic" or "comment"
+    id: int
+    topic_id: int
+    title: str
+    snippet: str
+    rank: float
 
 class EventBase(BaseModel):
     title: str
@@ -117,6 +183,7 @@ class EventBase(BaseModel):
     date: str
     time: str
     location: str
+    capacity: Optional[int] = Field(None, ge=1)
 
 class EventCreate(EventBase):
     pass
@@ -125,7 +192,6 @@ class EventResponse(EventBase):
     id: int
     created_by: int
     creator: UserOut
-    attendees: List[UserOut]
+    attendee_count: int
 
-    class Config:
-        orm_mode = True   
+    model_config = ConfigDict(from_attributes=True)
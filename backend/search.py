@@ -0,0 +1,73 @@
+from sqlalchemy import String, case, cast, func, literal, literal_column, select, tuple_, union_all
+from sqlalchemy.orm import aliased
+
+from . import models
+
+# Forum full-text search. Topics carry a weighted tsvector (title A, content B,
+# tag names C) written together with the topic; comments have a generated
+# tsvector column. Both are GIN indexed, see the add_forum_search migration.
+
+SEARCH_CONFIG = "english"
+# A word in most posts matches most rows, and ts_rank reads the whole tsvector of every
+# row it scores. Only the newest SEARCH_CANDIDATES matches of each kind are ranked, which
+# bounds a search's cost whatever the table size; older matches of such a term are not
+# reachable by paging. See benchmarks/search.py.
+SEARCH_CANDIDATES = 1000
+
+def topic_search_vector(title: str, content: str, tags: list):
+    """SQL expression for ForumTopic.search_vector, assigned when the topic is created."""
+    def weighted(text, weight):
+        # setweight takes a "char", which a bound varchar will not cast to
+        return func.setweight(func.to_tsvector(SEARCH_CONFIG, cast(text or "", String)), literal_column(f"'{weight}'"))
+    return weighted(title, "A").op("||")(weighted(content, "B")).op("||")(weighted(" ".join(tags or []), "C"))
+
+def _ranked_hits(kind: str, id_column, topic_id_column, vector_column, query, candidates):
+    matches = select(id_column.label("id"), topic_id_column.label("topic_id"), vector_column.label("vector")) \
+        .where(vector_column.op("@@")(query))
+    if candidates is not None:
+        matches = matches.order_by(id_column.desc()).limit(candidates)
+    matches = matches.subquery()
+    return select(
+        literal(kind).label("kind"),
+        matches.c.id,
+        matches.c.topic_id,
+        func.ts_rank(matches.c.vector, query).label("rank"),
+    )
+
+def search_page(q: str, after, limit: int, candidates: int = SEARCH_CANDIDATES):
+    """Ranked topic and comment hits for ``q``, limit + 1 rows after the (rank, kind, id) cursor.
+
+    Matching and ranking read only the indexed tsvectors, and only the newest
+    ``candidates`` matches of each kind are ranked (None ranks them all); titles and
+    snippets are fetched, and ts_headline run, for the rows of the page alone.
+    """
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    topic, comment = models.ForumTopic, models.Comment
+    hits = union_all(
+        _ranked_hits("topic", topic.id, topic.id, topic.search_vector, query, candidates),
+        _ranked_hits("comment", comment.id, comment.topic_id, comment.search_vector, query, candidates),
+    ).subquery()
+    page = select(hits)
+    if after:
+        page = page.where(tuple_(hits.c.rank, hits.c.kind, hits.c.id) < tuple(after))
+    page = page.order_by(hits.c.rank.desc(), hits.c.kind.desc(), hits.c.id.desc()).limit(limit + 1).subquery()
+
+    topic = aliased(models.ForumTopic)
+    comment = aliased(models.Comment)
+    matched_text = case(
+        (page.c.kind == "comment", comment.content),
+        else_=func.concat_ws(" ", topic.title, topic.content),
+    )
+    return (
+        select(
+            page.c.kind,
+            page.c.id,
+            page.c.topic_id,
+            page.c.rank,
+            topic.title,
+            func.ts_headline(SEARCH_CONFIG, matched_text, query).label("snippet"),
+        )
+        .join(topic, topic.id == page.c.topic_id)
+        .outerjoin(comment, (page.c.kind == "comment") & (comment.id == page.c.id))
+        .order_by(page.c.rank.desc(), page.c.kind.desc(), page.c.id.desc())
+    )
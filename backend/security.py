@@ -1,54 +1,143 @@
+import hashlib
+import secrets
+import uuid
 from jose import JWTError,jwt
-from datetime import datetime,timedelta
+from datetime import datetime,timedelta,timezone
 from . import schemas,database,models
 from fastapi import HTTPException,status,Depends
+from typing import Optional
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from .config import settings
+from .principals import Principal, principal_cache
+from .revocation import revocation_list
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
 
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
+# EventSource cannot send an Authorization header, so event streams take a token in the
+# query string instead; it can only open streams and is useless once the stream is open
+STREAM_TOKEN_EXPIRE_SECONDS = 60
+STREAM_SCOPE = "stream"
 
-def create_access_token(data: dict): 
+def create_access_token(data: dict, session_id: str = None): 
 
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # sid ties the token to its login session, which is what gets revoked
+    to_encode.update({"exp": expire, "sid": session_id or uuid.uuid4().hex})
 
     encoded_jwt = jwt.encode(to_encode,SECRET_KEY,algorithm=ALGORITHM)
 
     return encoded_jwt
 
-def verify_access_token(token: str, credetials_exception):
+def create_stream_token(token: schemas.TokenData) -> str:
+    """A short-lived token for the same user and session as ``token``, accepted only by
+    event streams (see get_stream_user)."""
+    expire = datetime.utcnow() + timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS)
+    to_encode = {"user_id": int(token.id), "sid": token.session_id, "scope": STREAM_SCOPE, "exp": expire}
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def refresh_token_hash(token: str) -> str:
+    # refresh tokens are 256 random bits, so a plain digest is enough to keep them out of the table
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def issue_tokens(db: AsyncSession, user_id: int, session_id: str = None) -> dict:
+    """Access and refresh token for ``session_id``, or for a new session. The refresh
+    token row is added to ``db``; the caller commits."""
+    session_id = session_id or uuid.uuid4().hex
+    refresh_token = secrets.token_urlsafe(32)
+    db.add(models.RefreshToken(
+        user_id=user_id, session_id=session_id, token_hash=refresh_token_hash(refresh_token),
+        expires_at=datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return {
+        "access_token": create_access_token(data={"user_id": user_id}, session_id=session_id),
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+def verify_access_token(token: str, credetials_exception, scope: str = None):
     try:
         payload = jwt.decode(token,SECRET_KEY,algorithms=[ALGORITHM])
 
         id: str = payload.get("user_id")
 
-        if id is None:
+        # a stream token is not an access token, nor the other way round
+        if id is None or payload.get("scope") != scope:
             raise credetials_exception
-        token_data = schemas.TokenData(id=str(id))
+        token_data = schemas.TokenData(id=str(id), session_id=payload.get("sid"))
 
     except JWTError:
         raise credetials_exception  
 
     return token_data  
     
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    credential_exception = HTTPException(status.HTTP_401_UNAUTHORIZED, detail = f"Invalid credentials",
-                                         headers={"WWW.Authenticate": "Bearer"})
-    
-    token = verify_access_token(token, credential_exception)  
+def select_principal(user_id: int):
+    """The Principal fields of a user, with their therapist profile id if they have one."""
+    return (
+        select(models.User.id, models.User.userType, models.User.is_active, models.Therapist.id)
+        .outerjoin(models.Therapist, models.Therapist.user_id == models.User.id)
+        .where(models.User.id == user_id)
+    )
+
+def select_therapist_id(user_id: int):
+    return select(models.Therapist.id).where(models.Therapist.user_id == user_id)
+
+def _credential_exception():
+    return HTTPException(status.HTTP_401_UNAUTHORIZED, detail = f"Invalid credentials",
+                         headers={"WWW.Authenticate": "Bearer"})
 
-    user = db.query(models.User).filter(models.User.id == token.id).first()
+async def get_token_data(token: str = Depends(oauth2_scheme)) -> schemas.TokenData:
+    return verify_access_token(token, _credential_exception())
+
+async def get_current_user(token: schemas.TokenData = Depends(get_token_data),
+                           db: AsyncSession = Depends(database.get_db)):
+    return await _load_principal(db, token)
+
+async def get_stream_user(token: Optional[str] = None, bearer: Optional[str] = Depends(optional_oauth2_scheme),
+                          db: AsyncSession = Depends(database.get_db)):
+    """The caller of an event stream: an access token in the Authorization header, or a
+    token from create_stream_token in the ``token`` query parameter."""
+    if bearer:
+        return await _load_principal(db, verify_access_token(bearer, _credential_exception()))
+    if token:
+        return await _load_principal(db, verify_access_token(token, _credential_exception(), STREAM_SCOPE))
+    raise _credential_exception()
+
+async def _load_principal(db: AsyncSession, token: schemas.TokenData):
+    credential_exception = _credential_exception()
+    # in-memory filter first; the table is only read for revoked sessions and false positives
+    if token.session_id is not None and await revocation_list.is_revoked(db, token.session_id):
+        raise credential_exception
+
+    user_id = int(token.id)
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        result = await db.execute(select_principal(user_id))
+        row = result.first()
+        if row is None:
+            raise credential_exception
+        principal = Principal(*row)
+        principal_cache.put(principal)
     
-    return user   
+    return principal   
+
+async def get_therapist_id(db: AsyncSession, current_user: Principal):
+    if current_user.therapist_id is not None:
+        return current_user.therapist_id
+    # the profile may have been created after this principal was cached by another worker
+    result = await db.execute(select_therapist_id(current_user.id))
+    return result.scalar()
 
 def check_user_role(required_role: str):
-    def role_checker(current_user: models.User = Depends(get_current_user)):
+    async def role_checker(current_user: Principal = Depends(get_current_user)):
         if current_user.userType != required_role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,27 @@
+from functools import lru_cache
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+# FastAPI validates a returned ORM object into its response_model, dumps that to
+# Python dicts and lists, then encodes them as JSON. A TypeAdapter for the whole
+# response type does the same in pydantic-core: one validation from attributes and
+# one dump straight to bytes. Adapters compile their schema on creation, so they
+# are built once per response type.
+
+@lru_cache(maxsize=None)
+def type_adapter(response_model) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+def render(response_model, data) -> bytes:
+    """``data`` (ORM objects, mappings or models) as ``response_model`` JSON."""
+    adapter = type_adapter(response_model)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+def json_response(response: Response, response_model, data) -> Response:
+    """Answer with ``data`` rendered as ``response_model``, keeping any headers (e.g. the
+    next-page cursor) already set on the endpoint's ``response``. Keep ``response_model``
+    on the route as well: it still drives the OpenAPI schema."""
+    rendered = Response(content=render(response_model, data), media_type="application/json")
+    rendered.headers.raw.extend(response.headers.raw)
+    return rendered
@@ -0,0 +1,81 @@
+from datetime import datetime, time, timedelta, timezone
+from typing import Iterable, List, Tuple
+
+from .config import settings
+
+# Slot arithmetic for therapist booking. Everything here is pure so it can be
+# reasoned about separately from the queries in the routers.
+
+SLOT_LENGTH = timedelta(minutes=settings.appointment_slot_minutes)
+
+Interval = Tuple[datetime, datetime]
+
+def as_utc(when: datetime) -> datetime:
+    """Naive UTC, as appointments and availability windows are stored. An aware datetime
+    is converted first; a naive one is taken to be UTC already."""
+    if when.tzinfo is not None:
+        when = when.astimezone(timezone.utc).replace(tzinfo=None)
+    return when
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Sort and merge overlapping or touching intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def expand_windows(windows, start: datetime, end: datetime) -> List[Interval]:
+    """Turn weekly (weekday, start_time, end_time) windows into concrete intervals clipped to [start, end)."""
+    by_weekday = {}
+    for window in windows:
+        by_weekday.setdefault(window.weekday, []).append(window)
+
+    intervals = []
+    day = start.date()
+    while day < end.date() + timedelta(days=1):
+        for window in by_weekday.get(day.weekday(), ()):
+            opens = datetime.combine(day, window.start_time)
+            closes = datetime.combine(day, window.end_time)
+            if opens < end and closes > start:
+                intervals.append((opens, closes))
+        day += timedelta(days=1)
+    return merge_intervals(intervals)
+
+def free_slots(windows: List[Interval], busy: List[Interval], slot: timedelta,
+               start: datetime, end: datetime) -> List[Interval]:
+    """Slots of length ``slot`` inside ``windows`` that overlap nothing in ``busy``.
+
+    Both lists must be sorted and merged. Slots are aligned to the window opening time,
+    so they line up with what ``is_slot_start`` accepts, and the walk over ``busy`` is a
+    single forward pass: O(windows + busy + slots).
+    """
+    slots = []
+    b = 0
+    for opens, closes in windows:
+        slot_start = opens
+        while slot_start + slot <= closes:
+            slot_end = slot_start + slot
+            while b < len(busy) and busy[b][1] <= slot_start:
+                b += 1
+            if b < len(busy) and busy[b][0] < slot_end:
+                # jump to the first aligned start at or after the end of this busy interval
+                skipped = -((opens - busy[b][1]) // slot)
+                slot_start = max(opens + skipped * slot, slot_end)
+                continue
+            if slot_start >= start and slot_end <= end:
+                slots.append((slot_start, slot_end))
+            slot_start = slot_end
+    return slots
+
+def is_slot_start(windows, when: datetime, slot: timedelta) -> bool:
+    """True if ``when`` is one of the slot starts ``free_slots`` would offer on an empty calendar."""
+    when = as_utc(when)
+    day = datetime.combine(when.date(), time())
+    for opens, closes in expand_windows(windows, day, day + timedelta(days=1)):
+        if opens <= when and when + slot <= closes and (when - opens) % slot == timedelta(0):
+            return True
+    return False
@@ -0,0 +1,31 @@
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import async_engine
+from .serialization import type_adapter
+
+# Collection endpoints that can grow without bound also answer
+# ``Accept: application/x-ndjson`` with one JSON document per line, streamed
+# from a server-side cursor so memory stays flat however many rows there are.
+NDJSON = "application/x-ndjson"
+BATCH_SIZE = 500
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON in request.headers.get("accept", "")
+
+async def _lines(query, item_model, batch_size: int, bind):
+    adapter = type_adapter(item_model)
+    # Its own session: the request's session is closed before the body is sent.
+    async with AsyncSession(bind=bind, autoflush=False, expire_on_commit=False) as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for batch in result.scalars().partitions():
+            yield b"".join(
+                adapter.dump_json(adapter.validate_python(row, from_attributes=True)) + b"\n" for row in batch
+            )
+
+def ndjson_response(query, item_model, batch_size: int = BATCH_SIZE, bind=async_engine) -> StreamingResponse:
+    """Stream every row of ``query`` as ``item_model``, one line each, ``batch_size`` rows per fetch.
+    Pass the request session's ``bind`` so a route on ``get_read_db`` streams from the same database."""
+    return StreamingResponse(_lines(query, item_model, batch_size, bind), media_type=NDJSON)
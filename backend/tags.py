@@ -0,0 +1,28 @@
+from sqlalchemy import Integer, literal, select
+from sqlalchemy.dialects.postgresql import insert
+
+from . import models
+
+# Topic tags live in a ``tags`` dictionary linked to topics through ``topic_tags``.
+# Each tag keeps a running topic_count so popular tags never need a GROUP BY.
+
+def normalize(names):
+    """Trimmed, de-duplicated, non-empty tag names in sorted order."""
+    return sorted({name.strip() for name in names or [] if name and name.strip()})
+
+def attach_tags(topic_id: int, names: list):
+    """One statement that upserts ``names`` into ``tags``, bumps their counts and links them to the topic.
+
+    ``names`` must come from ``normalize``: a name may appear only once per upsert, and
+    taking the tag row locks in sorted order keeps concurrent topic inserts from deadlocking.
+    """
+    upserted = (
+        insert(models.Tag)
+        .values([{"name": name, "topic_count": 1} for name in names])
+        .on_conflict_do_update(index_elements=[models.Tag.name], set_={"topic_count": models.Tag.topic_count + 1})
+        .returning(models.Tag.id)
+        .cte("upserted")
+    )
+    return insert(models.TopicTag).from_select(
+        ["topic_id", "tag_id"], select(literal(topic_id, Integer), upserted.c.id)
+    )
@@ -0,0 +1,127 @@
+import asyncio
+from datetime import date
+
+from sqlalchemy import Date, case, cast, delete, func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from . import models
+from .database import AsyncSessionLocal
+
+# Practice dashboard. therapist_daily_stats keeps one row per therapist per day of
+# scheduled appointments, holding additive counters only. Any range is the sum of its
+# days, so a dashboard read touches at most one row per day in range, however long
+# the therapist's history. Booking and confirming fold their change in within the same
+# transaction, and backfill() recomputes everything from appointments.
+#
+# New and repeat clients are counted on the day of a client's first and second
+# booking with the therapist. The running count per pair lives in therapist_clients.
+
+COUNTERS = ("booked", "pending", "confirmed", "cancelled", "confirmations",
+            "confirmation_lead_seconds", "new_clients", "repeat_clients")
+
+def _add(rows, counters):
+    """Upsert of ``rows`` into therapist_daily_stats, adding ``counters`` on conflict."""
+    stats = models.TherapistDailyStats
+    return rows.on_conflict_do_update(
+        index_elements=[stats.therapist_id, stats.day],
+        set_={name: getattr(stats, name) + rows.excluded[name] for name in counters},
+    )
+
+def booking(appointment: models.Appointment):
+    """Count a newly booked (pending) appointment, in the booking transaction."""
+    clients = models.TherapistClient
+    pair = (
+        insert(clients)
+        .values(therapist_id=appointment.therapist_id, user_id=appointment.user_id, appointments=1)
+        .on_conflict_do_update(
+            index_elements=[clients.therapist_id, clients.user_id],
+            set_={"appointments": clients.appointments + 1},
+        )
+        .returning(clients.appointments)
+        .cte("pair")
+    )
+    counters = ("booked", "pending", "new_clients", "repeat_clients")
+    rows = insert(models.TherapistDailyStats).from_select(
+        ["therapist_id", "day", *counters],
+        select(
+            literal(appointment.therapist_id), literal(appointment.scheduled_time.date(), Date), literal(1), literal(1),
+            case((pair.c.appointments == 1, 1), else_=0), case((pair.c.appointments == 2, 1), else_=0),
+        ),
+    ).add_cte(pair)
+    return _add(rows, counters)
+
+def status_change(appointment: models.Appointment, previous: str):
+    """Move an appointment from ``previous`` to its current status, and count its
+    confirmation lead time if it was just confirmed."""
+    counts = {appointment.status: 1, previous: -1}
+    if appointment.status == "confirmed" and appointment.created_at is not None:
+        counts["confirmations"] = 1
+        counts["confirmation_lead_seconds"] = (appointment.confirmed_at - appointment.created_at).total_seconds()
+    rows = insert(models.TherapistDailyStats).values(
+        therapist_id=appointment.therapist_id, day=appointment.scheduled_time.date(), **counts
+    )
+    return _add(rows, counts)
+
+def stats_query(therapist_id: int, start: date, end: date, bucket: str):
+    """Counter sums per ``bucket`` for days in [start, end), labelled by each bucket's first
+    day (so the first week or month can begin before ``start``)."""
+    stats = models.TherapistDailyStats
+    period = stats.day if bucket == "day" else cast(func.date_trunc(bucket, stats.day), Date)
+    return (
+        select(period.label("start"), *(func.sum(getattr(stats, name)).label(name) for name in COUNTERS))
+        .where(stats.therapist_id == therapist_id, stats.day >= start, stats.day < end)
+        .group_by(period)
+        .order_by(period)
+    )
+
+def backfill_statements():
+    """Recompute both tables from appointments."""
+    appointment = models.Appointment
+    # booking order per client, by id, as the live counters see it
+    numbered = select(
+        appointment,
+        func.row_number().over(
+            partition_by=(appointment.therapist_id, appointment.user_id), order_by=appointment.id
+        ).label("nth"),
+    ).subquery()
+    lead = func.extract("epoch", numbered.c.confirmed_at - numbered.c.created_at)
+    timed = (numbered.c.status == "confirmed") & numbered.c.created_at.isnot(None) & numbered.c.confirmed_at.isnot(None)
+    day = cast(numbered.c.scheduled_time, Date)
+
+    def count(condition):
+        return func.count().filter(condition)
+
+    return (
+        # holds off bookings and confirmations until the fresh counts are in
+        text("LOCK TABLE therapist_daily_stats, therapist_clients IN EXCLUSIVE MODE"),
+        delete(models.TherapistDailyStats),
+        delete(models.TherapistClient),
+        insert(models.TherapistClient).from_select(
+            ["therapist_id", "user_id", "appointments"],
+            select(appointment.therapist_id, appointment.user_id, func.count())
+            .group_by(appointment.therapist_id, appointment.user_id),
+        ),
+        insert(models.TherapistDailyStats).from_select(
+            ["therapist_id", "day", *COUNTERS],
+            select(
+                numbered.c.therapist_id, day, func.count(),
+                count(numbered.c.status == "pending"),
+                count(numbered.c.status == "confirmed"),
+                count(numbered.c.status == "cancelled"),
+                count(timed),
+                func.coalesce(func.sum(lead).filter(timed), 0),
+                count(numbered.c.nth == 1),
+                count(numbered.c.nth == 2),
+            ).group_by(numbered.c.therapist_id, day),
+        ),
+    )
+
+async def backfill():
+    async with AsyncSessionLocal() as db:
+        for statement in backfill_statements():
+            await db.execute(statement)
+        await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
@@ -0,0 +1,114 @@
+import asyncio
+import math
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Double, bindparam, cast, delete, func, insert, literal, select, text, tuple_, union_all, update
+
+from . import loaders, models
+from .config import settings
+from .database import AsyncSessionLocal
+
+# Trending feed. A topic's trending value is the sum of its activity (the post itself,
+# comments, likes), each weighted and decayed by age with a fixed half-life. Decay
+# scales every topic by the same factor, so the order never changes with time alone,
+# only with new activity. topic_rankings therefore stores the sum relative to a fixed
+# epoch, in log space so it cannot overflow:
+#
+#     score = ln(sum of weight * exp((at - EPOCH) / TAU))
+#
+# New activity folds in with a single logaddexp on one row. Nothing is ever
+# recomputed, and the feed is a range scan of (category, score, topic_id) in reverse.
+
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+TAU = settings.trending_half_life_hours * 3600 / math.log(2)  # seconds per e-fold of decay
+
+WEIGHTS = {"topic": 3.0, "comment": 2.0, "like": 1.0}
+
+def activity(kind: str, n: int = 1, at: Optional[datetime] = None) -> float:
+    """Log-space score of ``n`` units of activity at ``at`` (default now)."""
+    at = at or datetime.now(timezone.utc)
+    return math.log(WEIGHTS[kind] * n) + (at - EPOCH).total_seconds() / TAU
+
+def _logaddexp(a, b):
+    # ln(e^a + e^b) without overflow; the clamp keeps exp() away from Postgres' underflow error
+    return func.greatest(a, b) + func.ln(1 + func.exp(-func.least(func.abs(a - b), 700)))
+
+def new_topic(topic: models.ForumTopic):
+    """Ranking row for a topic being created, in the same transaction."""
+    return insert(models.TopicRanking).values(topic_id=topic.id, category=topic.category, score=activity("topic"))
+
+def bump(topic_id: int, kind: str):
+    """Fold one unit of new activity into a topic's score."""
+    ranking = models.TopicRanking
+    return (
+        update(ranking)
+        .where(ranking.topic_id == topic_id)
+        .values(score=_logaddexp(ranking.score, literal(activity(kind))))
+    )
+
+def bump_many():
+    """Executemany form of ``bump``, taking ``row_id`` and ``activity`` per row."""
+    ranking = models.TopicRanking.__table__
+    return (
+        update(ranking)
+        .where(ranking.c.topic_id == bindparam("row_id"))
+        .values(score=_logaddexp(ranking.c.score, bindparam("activity")))
+    )
+
+def trending_page(category: Optional[str], after, limit: int):
+    """Topics by score, limit + 1 of them after the (score, topic_id) cursor, with the score as
+    the second column."""
+    ranking = models.TopicRanking
+    query = (
+        select(models.ForumTopic, ranking.score)
+        .options(*loaders.topic_summary())
+        .join(ranking, ranking.topic_id == models.ForumTopic.id)
+    )
+    if category:
+        query = query.where(ranking.category == category)
+    if after:
+        query = query.where(tuple_(ranking.score, ranking.topic_id) < tuple(after))
+    return query.order_by(ranking.score.desc(), ranking.topic_id.desc()).limit(limit + 1)
+
+def _event_scores(kind, topic_id, at):
+    seconds = cast(func.extract("epoch", at - literal(EPOCH)), Double)
+    return select(topic_id.label("topic_id"), (math.log(WEIGHTS[kind]) + seconds / TAU).label("x"))
+
+def rebuild_statements():
+    """Recompute every score from the stored activity, e.g. after the half-life changes."""
+    events = union_all(
+        _event_scores("topic", models.ForumTopic.id, models.ForumTopic.created_at),
+        _event_scores("comment", models.Comment.topic_id, models.Comment.created_at),
+        _event_scores("like", models.TopicLike.topic_id, models.TopicLike.created_at),
+    ).subquery()
+    # log-sum-exp per topic, shifted by the largest term
+    shifted = select(
+        events.c.topic_id, events.c.x, func.max(events.c.x).over(partition_by=events.c.topic_id).label("m")
+    ).subquery()
+    terms = func.exp(func.greatest(shifted.c.x - shifted.c.m, -700))
+    scores = (
+        select(shifted.c.topic_id, (shifted.c.m + func.ln(func.sum(terms))).label("score"))
+        .group_by(shifted.c.topic_id, shifted.c.m)
+        .subquery()
+    )
+    return (
+        # holds off new topics and bumps until the fresh scores are in
+        text("LOCK TABLE topic_rankings IN EXCLUSIVE MODE"),
+        delete(models.TopicRanking),
+        insert(models.TopicRanking).from_select(
+            ["topic_id", "category", "score"],
+            select(scores.c.topic_id, models.ForumTopic.category, scores.c.score)
+            .join(models.ForumTopic, models.ForumTopic.id == scores.c.topic_id),
+        ),
+    )
+
+async def rebuild():
+    async with AsyncSessionLocal() as db:
+        for statement in rebuild_statements():
+            await db.execute(statement)
+        await db.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
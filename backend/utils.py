@@ -1,9 +1,129 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from .config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+# Pinning min/max rounds to the configured cost makes verify_and_update hand back
+# a fresh hash whenever a stored hash was made with a different cost.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
 
 def hash(password: str):
     return pwd_context.hash(password)
 
 def verify(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return pwd_context.verify(plain_password, hashed_password)
+
+def verify_and_update(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class LatencyStats:
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def as_dict(self) -> dict:
+        mean = self.total_seconds / self.count if self.count else 0.0
+        return {"count": self.count, "mean_seconds": mean, "max_seconds": self.max_seconds}
+
+
+def _busy():
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                         detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated process pool so it neither holds the GIL nor the request threads.
+
+    At most max_pending operations may be queued or running; beyond that callers get a 503
+    straight away instead of waiting behind a login burst. If a worker dies (OOM killer,
+    SIGKILL) the executor is broken for good, so it is replaced and the operation retried
+    once on the new one.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.latency = {"hash": LatencyStats(), "verify": LatencyStats()}
+        self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # created on first use so importing the app never forks;
+        # spawn because forking a process that already runs threads is unsafe
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _replace(self, executor: ProcessPoolExecutor):
+        # concurrent operations all see the same broken executor; only the first replaces it
+        if self._executor is executor:
+            logger.error("Password hashing worker died; starting a new process pool")
+            self.restarts += 1
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, operation: str, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise _busy()
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            for _ in range(2):
+                executor = self._pool()
+                try:
+                    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+                except BrokenProcessPool:
+                    self._replace(executor)
+            raise _busy()
+        finally:
+            self.pending -= 1
+            self.latency[operation].observe(time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", hash, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str):
+        """Returns (valid, new_hash); new_hash is None unless the stored hash should be replaced."""
+        return await self._run("verify", verify_and_update, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            **{f"{operation}_{name}": value
+               for operation, stats in self.latency.items() for name, value in stats.as_dict().items()},
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(settings.password_hash_workers, settings.password_hash_max_pending)
@@ -0,0 +1,154 @@
+"""Sync vs async request handling under concurrency.
+
+Serves the same read, a therapist by id after ``--db-latency-ms`` of ``pg_sleep``
+standing in for the round trip to a remote Postgres, from two minimal apps:
+
+- ``sync``: a ``def`` handler on a blocking Session, as the routers were written
+  before. Starlette runs it, and its ``get_db`` dependency, in its threadpool of 40
+  threads, and each request holds a thread for its whole database round trip.
+- ``async``: an ``async def`` handler on an AsyncSession (psycopg 3), as the routers
+  are now. Waiting on the database holds no thread.
+
+Both get a pool of ``--pool-size`` connections, so the threadpool is the only
+difference. The load driver and the app share one process, which tops out at a few
+hundred requests per second; the default latency is long enough that 40 threads
+reach their ceiling (40 / latency) below that. Each mode is driven at every ``--concurrency`` level through an ASGI
+transport, and throughput and latency percentiles are reported per level. Run
+``benchmarks.datagen`` first.
+
+    python -m benchmarks.async_concurrency --concurrency 10 40 100 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend import models
+from backend.database import ASYNC_SQLALCHEMY_DATABASE_URL, SQLALCHEMY_DATABASE_URL
+
+from .common import require_local_database
+
+
+def sync_app(engine, delay):
+    SessionLocal = sessionmaker(bind=engine)
+    app = FastAPI()
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/therapists/{therapist_id}")
+    def get_therapist(therapist_id: int, db: Session = Depends(get_db)):
+        if delay:
+            db.execute(select(func.pg_sleep(delay)))
+        therapist = db.scalars(select(models.Therapist).where(models.Therapist.id == therapist_id)).first()
+        return {"id": therapist.id, "name": therapist.name}
+
+    return app
+
+
+def async_app(engine, delay):
+    SessionLocal = async_sessionmaker(bind=engine)
+    app = FastAPI()
+
+    async def get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    @app.get("/therapists/{therapist_id}")
+    async def get_therapist(therapist_id: int, db: AsyncSession = Depends(get_db)):
+        if delay:
+            await db.execute(select(func.pg_sleep(delay)))
+        therapist = (await db.scalars(select(models.Therapist).where(models.Therapist.id == therapist_id))).first()
+        return {"id": therapist.id, "name": therapist.name}
+
+    return app
+
+
+async def drive(app, therapist_ids, concurrency):
+    latencies = []
+    remaining = iter(therapist_ids)
+
+    async def worker(client):
+        for therapist_id in remaining:
+            start = time.perf_counter()
+            (await client.get(f"/therapists/{therapist_id}")).raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(cuts[49], 2),
+        "p99_ms": round(cuts[98], 2),
+    }
+
+
+async def run(args):
+    pool = {"pool_size": args.pool_size, "max_overflow": 0, "pool_timeout": 300}
+    delay = args.db_latency_ms / 1000
+    modes = {
+        "sync": (lambda: create_engine(SQLALCHEMY_DATABASE_URL, **pool), sync_app),
+        "async": (lambda: create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, **pool), async_app),
+    }
+
+    engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+    async with engine.connect() as conn:
+        therapists = await conn.scalar(select(func.max(models.Therapist.id)))
+    await engine.dispose()
+    if not therapists:
+        sys.exit("No therapists found; run `python -m benchmarks.datagen` first")
+
+    rng = random.Random(args.seed)
+    workloads = {concurrency: [rng.randint(1, therapists) for _ in range(args.requests)]
+                 for concurrency in args.concurrency}
+    levels = {concurrency: {} for concurrency in args.concurrency}
+    # one mode at a time, so the two pools never hold connections together
+    for mode, (make_engine, make_app) in modes.items():
+        engine = make_engine()
+        app = make_app(engine, delay)
+        for concurrency, therapist_ids in workloads.items():
+            await drive(app, therapist_ids[:concurrency], concurrency)  # opens the pool's connections
+            levels[concurrency][mode] = await drive(app, therapist_ids, concurrency)
+        if mode == "async":
+            await engine.dispose()
+        else:
+            engine.dispose()
+
+    for level in levels.values():
+        level["async_speedup"] = round(level["async"]["throughput_rps"] / level["sync"]["throughput_rps"], 2)
+    return {"requests": args.requests, "db_latency_ms": args.db_latency_ms, "pool_size": args.pool_size,
+            "levels": levels}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 40, 100, 200])
+    parser.add_argument("--requests", type=int, default=1000, help="per mode and concurrency level")
+    parser.add_argument("--db-latency-ms", type=float, default=250)
+    parser.add_argument("--pool-size", type=int, default=80, help="connections per mode; keep under max_connections")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    require_local_database()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Helpers shared by the benchmark scripts."""
+import subprocess
+import sys
+
+from backend.database import SQLALCHEMY_DATABASE_URL
+
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1", ""}
+
+
+def require_local_database():
+    """Exit unless DATABASE_HOSTNAME points at this machine; the benchmarks write a lot of rows."""
+    host = SQLALCHEMY_DATABASE_URL.host or ""
+    if host not in LOCAL_HOSTS and not host.startswith("/"):
+        sys.exit(f"Refusing to run against {host!r}: benchmarks only run against a local Postgres")
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
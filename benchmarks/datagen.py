@@ -0,0 +1,194 @@
+"""Deterministic bulk data generator for the benchmarks.
+
+Loads users, therapists (with weekday availability), appointments, forum topics
+and their likes, tags, comments, events and attendees with COPY, then computes the trending scores and
+the therapist stats rollups. The same ``--scale`` and ``--seed`` always produce the
+same rows and ids, so runs on different commits stay comparable.
+Scale 1 is roughly 1M users, 50k therapists, 5M appointments and 10M comments.
+
+Every generated user has the password ``benchmark`` and the email
+``bench-<id>@example.com``; users whose id is a multiple of 20 are therapists.
+
+    python -m benchmarks.datagen --scale 0.01 --truncate
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, time as dtime, timedelta, timezone
+
+import psycopg
+
+from backend import therapist_stats, trending, utils
+from backend.config import settings
+
+from .common import require_local_database
+
+PASSWORD = "benchmark"
+THERAPIST_EVERY = 20
+
+# row counts at scale 1
+BASE_SIZES = {
+    "users": 1_000_000,
+    "appointments": 5_000_000,
+    "topics": 500_000,
+    "comments": 10_000_000,
+    "tags": 1_000,
+    "events": 20_000,
+    "attendees": 1_000_000,
+}
+
+SPECIALIZATIONS = ["ABA", "Speech", "Occupational", "Behavioral", "Play", "Social Skills", "Sensory", "Family"]
+CATEGORIES = ["support", "education", "stories", "events", "workplace", "research"]
+WORDS = ("sensory routine school sleep meltdown therapy support diagnosis speech social "
+         "anxiety parenting teen adult work friends food noise schedule change").split()
+
+APP_TABLES = ["token_revocations", "refresh_tokens", "therapist_daily_stats", "therapist_clients", "topic_rankings", "outbox_messages", "event_attendees", "events", "topic_tags", "tags", "comment_likes", "topic_likes", "comments",
+              "forum_topics", "therapist_availability", "appointments", "therapists", "users"]
+
+EPOCH = datetime(2025, 1, 6, tzinfo=timezone.utc)  # a Monday
+
+
+def email(user_id):
+    return f"bench-{user_id}@example.com"
+
+
+def is_therapist(user_id):
+    return user_id % THERAPIST_EVERY == 0
+
+
+def sizes_for(scale):
+    sizes = {name: max(1, int(count * scale)) for name, count in BASE_SIZES.items()}
+    sizes["users"] = max(sizes["users"], THERAPIST_EVERY)
+    sizes["therapists"] = sizes["users"] // THERAPIST_EVERY
+    return sizes
+
+
+def sentence(rng, words):
+    return " ".join(rng.choices(WORDS, k=words))
+
+
+def copy_rows(cur, table, columns, rows):
+    start = time.perf_counter()
+    count = 0
+    quoted = ", ".join(f'"{column}"' for column in columns)
+    with cur.copy(f"COPY {table} ({quoted}) FROM STDIN") as copy:
+        for row in rows:
+            copy.write_row(row)
+            count += 1
+    print(f"{table:<24} {count:>10} rows  {time.perf_counter() - start:6.1f}s", file=sys.stderr)
+
+
+def generate(cur, sizes, seed):
+    rng = random.Random(seed)
+    password_hash = utils.hash(PASSWORD)
+    users, therapists = sizes["users"], sizes["therapists"]
+
+    copy_rows(cur, "users", ["id", "name", "email", "password", "userType", "is_active"], (
+        (i, f"User {i}", email(i), password_hash, "therapist" if is_therapist(i) else "user", True)
+        for i in range(1, users + 1)
+    ))
+
+    # therapist n belongs to user n * THERAPIST_EVERY
+    copy_rows(cur, "therapists", ["id", "name", "specialization", "contact", "user_id", "experience", "bio"], (
+        (n, f"Therapist {n}", rng.choice(SPECIALIZATIONS), email(n * THERAPIST_EVERY), n * THERAPIST_EVERY,
+         rng.randint(0, 30), sentence(rng, 12))
+        for n in range(1, therapists + 1)
+    ))
+
+    copy_rows(cur, "therapist_availability", ["therapist_id", "weekday", "start_time", "end_time"], (
+        (n, weekday, dtime(9), dtime(17))
+        for n in range(1, therapists + 1) for weekday in range(5)
+    ))
+
+    # one appointment per therapist per working hour, walking forward from EPOCH
+    def appointments():
+        for i in range(sizes["appointments"]):
+            slot = i // therapists
+            day, hour = divmod(slot, 8)
+            scheduled = (EPOCH + timedelta(days=day // 5 * 7 + day % 5, hours=9 + hour)).replace(tzinfo=None)
+            user_id = rng.randint(1, users)
+            status = rng.choices(["confirmed", "pending", "cancelled"], [60, 25, 15])[0]
+            # booked up to four weeks ahead, confirmed within two days
+            created = scheduled.replace(tzinfo=timezone.utc) - timedelta(minutes=rng.randint(60, 28 * 24 * 60))
+            confirmed = created + timedelta(minutes=rng.randint(5, 48 * 60)) if status == "confirmed" else None
+            yield (user_id, i % therapists + 1, scheduled, scheduled + timedelta(hours=1), status, created, confirmed)
+    copy_rows(cur, "appointments", ["user_id", "therapist_id", "scheduled_time", "ends_at", "status", "created_at",
+                                    "confirmed_at"],
+              appointments())
+
+    topics = sizes["topics"]
+    # counts match the topic_likes ledger, which the like buffer reconciles them with
+    like_counts = [rng.randint(0, min(10, users)) for _ in range(topics + 1)]
+    copy_rows(cur, "forum_topics", ["id", "title", "content", "user_id", "created_at", "category", "likes"], (
+        (i, sentence(rng, 6), sentence(rng, 40), rng.randint(1, users), EPOCH + timedelta(minutes=i),
+         rng.choice(CATEGORIES), like_counts[i])
+        for i in range(1, topics + 1)
+    ))
+    copy_rows(cur, "topic_likes", ["user_id", "topic_id", "created_at"], (
+        (user_id, topic, EPOCH + timedelta(minutes=topic, seconds=n + 1))
+        for topic in range(1, topics + 1)
+        for n, user_id in enumerate(rng.sample(range(1, users + 1), like_counts[topic]))
+    ))
+
+    topic_tags = [(topic, tag) for topic in range(1, topics + 1)
+                  for tag in rng.sample(range(1, sizes["tags"] + 1), min(2, sizes["tags"]))]
+    tag_counts = [0] * (sizes["tags"] + 1)
+    for _, tag in topic_tags:
+        tag_counts[tag] += 1
+    copy_rows(cur, "tags", ["id", "name", "topic_count"], (
+        (tag, f"tag-{tag}", tag_counts[tag]) for tag in range(1, sizes["tags"] + 1)
+    ))
+    copy_rows(cur, "topic_tags", ["topic_id", "tag_id"], topic_tags)
+
+    copy_rows(cur, "comments", ["content", "user_id", "topic_id", "created_at", "likes"], (
+        (sentence(rng, 20), rng.randint(1, users), topic, EPOCH + timedelta(minutes=topic, seconds=i), 0)
+        for i in range(sizes["comments"]) for topic in [rng.randint(1, topics)]
+    ))
+
+    events = sizes["events"]
+    copy_rows(cur, "events", ["id", "title", "description", "date", "time", "location", "created_by"], (
+        (i, sentence(rng, 4), sentence(rng, 20), (EPOCH + timedelta(days=i % 365)).date().isoformat(),
+         "18:00", "Online", rng.randint(1, users))
+        for i in range(1, events + 1)
+    ))
+
+    per_event = max(1, min(users, sizes["attendees"] // events))
+    copy_rows(cur, "event_attendees", ["event_id", "user_id"], (
+        (event, user) for event in range(1, events + 1) for user in rng.sample(range(1, users + 1), per_event)
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=0.01, help="1.0 is ~1M users / 10M comments")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="empty the application tables first")
+    args = parser.parse_args()
+
+    require_local_database()
+    sizes = sizes_for(args.scale)
+    with psycopg.connect(host=settings.database_hostname, port=settings.database_port,
+                         user=settings.database_username, password=settings.database_password,
+                         dbname=settings.database_name) as conn, conn.cursor() as cur:
+        if args.truncate:
+            cur.execute(f"TRUNCATE {', '.join(APP_TABLES)} RESTART IDENTITY CASCADE")
+        elif cur.execute("SELECT EXISTS (SELECT 1 FROM users)").fetchone()[0]:
+            sys.exit("users is not empty; pass --truncate to replace the existing data")
+
+        generate(cur, sizes, args.seed)
+        for table in APP_TABLES:
+            if table not in ("topic_tags", "topic_rankings", "therapist_daily_stats", "therapist_clients",
+                             "token_revocations"):
+                cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                            f"coalesce((SELECT max(id) FROM {table}), 0) + 1, false)")
+        conn.commit()
+        # scores and rollups from the generated activity, as if it had arrived through the API
+        asyncio.run(trending.rebuild())
+        asyncio.run(therapist_stats.backfill())
+        cur.execute("ANALYZE")
+
+
+if __name__ == "__main__":
+    main()
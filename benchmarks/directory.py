@@ -0,0 +1,113 @@
+"""Therapist directory pages at growing table sizes.
+
+Inside one transaction, grows the therapists table to each of ``--sizes`` rows in turn.
+One in 100 bios mentions "sensory". At each size it times every directory scenario
+two ways: the first page, and the page after ``--depth`` rows reached through a
+cursor. The filters, ``q`` search, sorts and keysets are built by
+``select_therapists``, as the route builds them. For each scenario it reports the
+median of ``--rounds`` runs and whether the first page's plan sequentially scans
+therapists. Without pg_trgm the ``q`` scenarios have no index to use.
+
+Keyset pages should cost the same at every size and depth; a scenario whose time
+grows with the table is missing an index. The transaction is rolled back at the end.
+
+    python -m benchmarks.directory --sizes 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from sqlalchemy import func, select, text
+
+from backend import models
+from backend.database import async_engine
+from backend.routers.therapist import select_therapists, therapist_sort_keys
+
+from .common import require_local_database
+from .datagen import SPECIALIZATIONS
+from .query_plans import explain, seq_scans
+
+GROW = """
+INSERT INTO therapists (name, specialization, contact, experience, bio)
+SELECT 'Therapist ' || md5(g::text), specs[1 + g % cardinality(specs)], 'c', g % 40,
+       CASE WHEN g % 100 = 0 THEN 'sensory integration and play' ELSE 'speech and social skills' END
+FROM generate_series(CAST(:start AS integer), CAST(:stop AS integer)) g,
+     CAST(:specializations AS text[]) specs
+"""
+
+SCENARIOS = {
+    "by id": {},
+    "by name": {"sort": "name"},
+    "by experience": {"sort": "experience"},
+    "specialization": {"specialization": SPECIALIZATIONS[2]},
+    "specialization by experience": {"specialization": SPECIALIZATIONS[2], "sort": "experience"},
+    "min experience by name": {"min_experience": 30, "sort": "name"},
+    "q": {"q": "sensory"},
+    "q and specialization by name": {"q": "sensory", "specialization": SPECIALIZATIONS[0], "sort": "name"},
+}
+
+
+async def timed(conn, stmt, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        (await conn.execute(stmt)).all()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+async def deep_cursor(conn, filters, depth):
+    """The keyset of the ``depth``-th row of a scenario, or None if it has fewer rows."""
+    keys, _ = therapist_sort_keys(filters.get("sort", "id"))
+    page = select_therapists(**filters, limit=depth - 1).with_only_columns(*keys)
+    rows = (await conn.execute(page)).all()
+    return tuple(rows[-1]) if len(rows) == depth else None
+
+
+async def run(args):
+    report = {}
+    async with async_engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            trgm = await conn.scalar(text("SELECT count(*) FROM pg_extension WHERE extname = 'pg_trgm'"))
+            current = await conn.scalar(select(func.count()).select_from(models.Therapist))
+            for size in sorted(args.sizes):
+                if size > current:
+                    await conn.execute(text(GROW), {"specializations": SPECIALIZATIONS,
+                                                    "start": current + 1, "stop": size})
+                    current = size
+                await conn.execute(text("ANALYZE therapists"))
+                level = {}
+                for name, filters in SCENARIOS.items():
+                    first = select_therapists(**filters, limit=args.limit)
+                    after = await deep_cursor(conn, filters, args.depth)
+                    level[name] = {
+                        "first_page_ms": await timed(conn, first, args.rounds),
+                        "deep_page_ms": (await timed(conn, select_therapists(**filters, after=after, limit=args.limit),
+                                                     args.rounds) if after is not None else None),
+                        "seq_scan": "therapists" in seq_scans(await explain(conn, first)),
+                    }
+                report[current] = level
+        finally:
+            await trans.rollback()
+    await async_engine.dispose()
+    return {"pg_trgm": bool(trgm), "limit": args.limit, "depth": args.depth, "sizes": report}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="therapist rows, including any already there")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=1000, help="rows before the deep page")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    require_local_database()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
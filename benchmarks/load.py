@@ -0,0 +1,204 @@
+"""In-process async load driver.
+
+Replays a weighted mix of user scenarios against the FastAPI app through an ASGI
+transport (no network, no uvicorn), then reports latency percentiles and throughput
+per route as JSON. Run ``benchmarks.datagen`` first; the driver only reads the ids
+and credentials the generator produces.
+
+    python -m benchmarks.load --duration 30 --concurrency 32 --output baseline.json
+    python -m benchmarks.load --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+import httpx
+from sqlalchemy import func, select
+
+from backend import models, security
+from backend.database import AsyncSessionLocal
+from backend.main import app
+
+from .common import git_revision, require_local_database
+from .datagen import PASSWORD, email, is_therapist
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    async def request(self, client, route, method, url, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[route].append((time.perf_counter() - start) * 1000)
+        self.statuses[route][response.status_code] += 1
+        return response
+
+    def report(self, elapsed):
+        routes = {}
+        for route in sorted(self.latencies):
+            samples = self.latencies[route]
+            cuts = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+            routes[route] = {
+                "count": len(samples),
+                "throughput_rps": round(len(samples) / elapsed, 1),
+                "p50_ms": round(cuts[49], 2),
+                "p95_ms": round(cuts[94], 2),
+                "p99_ms": round(cuts[98], 2),
+                "statuses": {str(code): count for code, count in sorted(self.statuses[route].items())},
+            }
+        total = sum(route["count"] for route in routes.values())
+        return {"requests": total, "throughput_rps": round(total / elapsed, 1), "routes": routes}
+
+
+class Population:
+    """Ids the scenarios pick from, read once from the generated data."""
+
+    def __init__(self, users, therapists, events):
+        self.users, self.therapists, self.events = users, therapists, events
+        self.tokens = {}
+
+    def user(self, rng):
+        while True:
+            user_id = rng.randint(1, self.users)
+            if not is_therapist(user_id):
+                return user_id
+
+    def auth(self, user_id):
+        # minted directly so bcrypt only runs in the login scenario
+        if user_id not in self.tokens:
+            self.tokens[user_id] = security.create_access_token(data={"user_id": user_id})
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+
+async def login(client, rec, pop, rng):
+    user_id = pop.user(rng)
+    await rec.request(client, "POST /login", "POST", "/login",
+                      json={"email": email(user_id), "password": PASSWORD, "userType": "user"})
+
+
+async def browse_topics(client, rec, pop, rng):
+    response = await rec.request(client, "GET /community/topics", "GET", "/community/topics", params={"limit": 10})
+    cursor = response.headers.get("x-next-cursor")
+    if cursor and rng.random() < 0.5:
+        response = await rec.request(client, "GET /community/topics", "GET", "/community/topics",
+                                     params={"limit": 10, "cursor": cursor})
+    topics = response.json() if response.status_code == 200 else []
+    if topics:
+        topic_id = rng.choice(topics)["id"]
+        await rec.request(client, "GET /community/topics/{id}", "GET", f"/community/topics/{topic_id}")
+        await rec.request(client, "GET /community/topics/{id}/comments", "GET", f"/community/topics/{topic_id}/comments")
+
+
+async def book_appointment(client, rec, pop, rng):
+    therapist_id = rng.randint(1, pop.therapists)
+    day = date.today() + timedelta(days=rng.randint(1, 90))
+    start = datetime.combine(day, datetime.min.time())
+    response = await rec.request(client, "GET /therapists/{id}/slots", "GET", f"/therapists/{therapist_id}/slots",
+                                 params={"from": start.isoformat(), "to": (start + timedelta(days=1)).isoformat()})
+    free = response.json() if response.status_code == 200 else []
+    if free:
+        await rec.request(client, "POST /appointments", "POST", "/appointments/", headers=pop.auth(pop.user(rng)),
+                          json={"therapist_id": therapist_id, "scheduled_time": rng.choice(free)["start"]})
+
+
+async def join_event(client, rec, pop, rng):
+    event_id = rng.randint(1, pop.events)
+    await rec.request(client, "POST /community/events/{id}/join", "POST", f"/community/events/{event_id}/join",
+                      headers=pop.auth(pop.user(rng)))
+
+
+# scenario -> relative weight in the mix
+SCENARIOS = {
+    login: 1,
+    browse_topics: 6,
+    book_appointment: 2,
+    join_event: 1,
+}
+
+
+async def worker(client, rec, pop, rng, deadline):
+    scenarios, weights = list(SCENARIOS), list(SCENARIOS.values())
+    while time.perf_counter() < deadline:
+        scenario = rng.choices(scenarios, weights)[0]
+        await scenario(client, rec, pop, rng)
+
+
+async def population():
+    async with AsyncSessionLocal() as db:
+        users = await db.scalar(select(func.max(models.User.id)))
+        therapists = await db.scalar(select(func.max(models.Therapist.id)))
+        events = await db.scalar(select(func.max(models.Event.id)))
+    if not (users and therapists and events):
+        sys.exit("No generated data found; run `python -m benchmarks.datagen` first")
+    return Population(users, therapists, events)
+
+
+async def run(args):
+    pop = await population()
+    rec = Recorder()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            start = time.perf_counter()
+            deadline = start + args.duration
+            await asyncio.gather(*(
+                worker(client, rec, pop, random.Random(args.seed + n), deadline) for n in range(args.concurrency)
+            ))
+            elapsed = time.perf_counter() - start
+    return {
+        "revision": git_revision(),
+        "seed": args.seed,
+        "duration_s": round(elapsed, 1),
+        "concurrency": args.concurrency,
+        "population": {"users": pop.users, "therapists": pop.therapists, "events": pop.events},
+        "scenarios": {scenario.__name__: weight for scenario, weight in SCENARIOS.items()},
+        **rec.report(elapsed),
+    }
+
+
+def compare(report, baseline):
+    print(f"{'route':<40} {'p50 ms':>17} {'p95 ms':>17} {'p99 ms':>17}", file=sys.stderr)
+    for route, now in report["routes"].items():
+        before = baseline["routes"].get(route)
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if before is None:
+                cells.append(f"{now[key]:>17}")
+            else:
+                change = (now[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+                cells.append(f"{now[key]:>8} ({change:+5.0f}%)")
+        print(f"{route:<40} " + " ".join(cells), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="a previous report to compare percentiles against")
+    args = parser.parse_args()
+
+    require_local_database()
+    report = asyncio.run(run(args))
+    body = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(body + "\n")
+    else:
+        print(body)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
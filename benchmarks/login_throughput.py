@@ -0,0 +1,110 @@
+"""Login throughput next to other traffic.
+
+Runs the app in process and, for ``--duration`` seconds per mode, drives two groups
+of workers at once: ``--logins`` workers posting /login for generated users, and
+``--readers`` workers reading ``GET /community/topics/summary``. Modes:
+
+- ``process_pool``: bcrypt runs on ``utils.password_hasher``'s process pool, as the
+  app does.
+- ``threadpool``: bcrypt runs on the event loop's default thread pool, next to the
+  request handling, as login did before it had a pool of its own.
+
+Reports login throughput and latency, reader throughput and latency, 503s from the
+hasher's queue limit, and the hasher's own stats. Run ``benchmarks.datagen`` first.
+
+    python -m benchmarks.login_throughput --duration 20 --logins 16 --readers 16
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from backend import utils
+from backend.database import async_engine
+from backend.main import app
+
+from .common import require_local_database
+from .datagen import PASSWORD, email, is_therapist
+from .load import Recorder, population
+
+
+class ThreadpoolHasher:
+    """The hashing calls login makes, run on the default thread pool instead."""
+
+    async def verify_and_update(self, plain_password, hashed_password):
+        return await asyncio.to_thread(utils.verify_and_update, plain_password, hashed_password)
+
+
+async def login_worker(client, rec, users, rng, deadline):
+    while time.perf_counter() < deadline:
+        user_id = rng.randint(1, users)
+        if is_therapist(user_id):
+            continue
+        await rec.request(client, "POST /login", "POST", "/login",
+                          json={"email": email(user_id), "password": PASSWORD, "userType": "user"})
+
+
+async def reader_worker(client, rec, deadline):
+    while time.perf_counter() < deadline:
+        await rec.request(client, "GET /community/topics/summary", "GET", "/community/topics/summary",
+                          params={"limit": 10})
+
+
+async def run_mode(args, users, hasher):
+    process_pool, utils.password_hasher = utils.password_hasher, hasher
+    rec = Recorder()
+    try:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                # start the hashing workers before the clock does
+                await client.post("/login", json={"email": email(1), "password": PASSWORD, "userType": "user"})
+                start = time.perf_counter()
+                deadline = start + args.duration
+                await asyncio.gather(
+                    *(login_worker(client, rec, users, random.Random(args.seed + n), deadline)
+                      for n in range(args.logins)),
+                    *(reader_worker(client, rec, deadline) for _ in range(args.readers)),
+                )
+                elapsed = time.perf_counter() - start
+    finally:
+        utils.password_hasher = process_pool
+    await async_engine.dispose()
+    report = rec.report(elapsed)
+    if isinstance(hasher, utils.PasswordHasher):
+        report["hasher"] = hasher.stats()
+    return report
+
+
+async def run(args):
+    users = (await population()).users
+    await async_engine.dispose()
+    return {
+        "duration_s": args.duration,
+        "logins": args.logins,
+        "readers": args.readers,
+        "hashing_workers": utils.password_hasher.workers,
+        "modes": {
+            "process_pool": await run_mode(args, users, utils.password_hasher),
+            "threadpool": await run_mode(args, users, ThreadpoolHasher()),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=20, help="seconds per mode")
+    parser.add_argument("--logins", type=int, default=16, help="concurrent login workers")
+    parser.add_argument("--readers", type=int, default=16, help="concurrent workers on another route")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    require_local_database()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
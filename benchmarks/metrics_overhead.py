@@ -0,0 +1,131 @@
+"""Cost of the request metrics middleware and SQL hooks.
+
+Runs the same sequential request loop in fresh interpreters with metrics off, on,
+and on with the slow-request statement capture armed, and reports per-request
+latency for a route without SQL and one with SQL. Modes are interleaved over
+several rounds and the best round of each is kept, so machine noise does not
+swamp the few microseconds being measured. The same costs are also timed directly,
+in process: the middleware around a no-op ASGI app and one pair of SQL hooks.
+
+    python -m benchmarks.metrics_overhead --requests 2000 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from .common import require_local_database
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MODES = {
+    "off": {"METRICS_ENABLED": "false"},
+    "on": {"METRICS_ENABLED": "true", "SLOW_REQUEST_MS": "0"},
+    # the threshold is never reached, but every statement is kept in case it is
+    "on_with_slow_log": {"METRICS_ENABLED": "true", "SLOW_REQUEST_MS": "3600000"},
+}
+
+PROBE = """
+import asyncio, json, statistics, sys, time
+import httpx
+from backend.main import app
+
+ROUTES = {"no_sql": "/", "sql": "/community/topics?limit=1"}
+requests = int(sys.argv[1])
+
+async def main():
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, url in ROUTES.items():
+                for _ in range(requests // 10):
+                    await client.get(url)
+                samples = []
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    (await client.get(url)).raise_for_status()
+                    samples.append((time.perf_counter() - start) * 1e6)
+                results[name] = {"mean_us": statistics.fmean(samples), "p50_us": statistics.median(samples)}
+    print(json.dumps(results))
+
+asyncio.run(main())
+"""
+
+
+def run_mode(env, requests):
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, str(requests)], cwd=ROOT, env={**os.environ, **env},
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def micro(iterations=100_000):
+    """Direct per-request and per-statement cost in microseconds, without HTTP or a database."""
+    from backend import metrics
+
+    async def noop_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def noop_send(message):
+        pass
+
+    route = SimpleNamespace(path="/bench")
+    middleware = metrics.MetricsMiddleware(noop_app)
+
+    async def loop(app):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await app({"type": "http", "method": "GET", "path": "/bench", "route": route}, None, noop_send)
+        return (time.perf_counter() - start) / iterations * 1e6
+
+    bare, wrapped = asyncio.run(loop(noop_app)), asyncio.run(loop(middleware))
+
+    cursor, context = SimpleNamespace(rowcount=1), SimpleNamespace()
+    token = metrics._current.set(metrics.RequestStats(keep_statements=False))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        metrics._before_cursor_execute(None, cursor, "SELECT 1", None, context, False)
+        metrics._after_cursor_execute(None, cursor, "SELECT 1", None, context, False)
+    hooks = (time.perf_counter() - start) / iterations * 1e6
+    metrics._current.reset(token)
+
+    return {"middleware_us_per_request": round(wrapped - bare, 2), "sql_hooks_us_per_statement": round(hooks, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    require_local_database()
+    results = {}
+    for _ in range(args.rounds):
+        for mode, env in MODES.items():
+            for route, stats in run_mode(env, args.requests).items():
+                best = results.setdefault(mode, {}).setdefault(route, stats)
+                results[mode][route] = {key: min(best[key], stats[key]) for key in stats}
+    report = {"requests": args.requests, "rounds": args.rounds, "micro": micro(), "modes": {}}
+    for mode, routes in results.items():
+        report["modes"][mode] = {}
+        for route, stats in routes.items():
+            baseline = results["off"][route]["mean_us"]
+            report["modes"][mode][route] = {
+                "mean_us": round(stats["mean_us"], 1),
+                "p50_us": round(stats["p50_us"], 1),
+                "overhead_us": round(stats["mean_us"] - baseline, 1),
+                "overhead_pct": round((stats["mean_us"] - baseline) / baseline * 100, 1),
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
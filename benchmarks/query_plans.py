@@ -0,0 +1,188 @@
+"""Query-plan regression check for the API's hot queries.
+
+Seeds realistic volumes into the configured database inside one transaction, runs
+``EXPLAIN`` on each router query, built by the router's own ``select_*`` builder, and
+fails if any of them sequentially scans one of the large tables (at least
+``--min-rows`` rows once seeded). The transaction is rolled back at the end, so it is
+safe to point at a development database; it needs the schema at ``alembic upgrade head``.
+
+    python -m benchmarks.query_plans
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select, text
+
+from backend import loaders, models, search, security, therapist_stats, trending
+from backend.database import async_engine
+from backend.routers import appoitnment, community, therapist
+
+from .common import require_local_database
+
+SEED = """
+INSERT INTO users (name, email, password, "userType", is_active)
+SELECT 'user ' || g, 'plan-' || g || '@example.com', 'x',
+       CASE WHEN g % 10 = 0 THEN 'therapist' ELSE 'user' END, true
+FROM generate_series(1, :users) g;
+
+INSERT INTO therapists (name, specialization, contact, user_id, experience, bio)
+SELECT 'therapist ' || id, 'spec ' || (id % 20), 'c', id, id % 30, 'bio'
+FROM users WHERE email LIKE 'plan-%' AND "userType" = 'therapist';
+
+INSERT INTO appointments (user_id, therapist_id, scheduled_time, ends_at, status)
+SELECT u.ids[1 + g % cardinality(u.ids)], t.ids[1 + g % cardinality(t.ids)],
+       timestamp '2026-01-01' + g * interval '1 hour', timestamp '2026-01-01' + (g + 1) * interval '1 hour',
+       (ARRAY['pending', 'confirmed', 'cancelled'])[1 + g % 3]
+FROM generate_series(1, :appointments) g,
+     (SELECT array_agg(id) AS ids FROM users WHERE email LIKE 'plan-%') u,
+     (SELECT array_agg(id) AS ids FROM therapists WHERE name LIKE 'therapist %') t;
+
+INSERT INTO therapist_daily_stats (therapist_id, day, booked)
+SELECT therapist_id, scheduled_time::date, count(*) FROM appointments GROUP BY 1, 2
+ON CONFLICT DO NOTHING;
+
+INSERT INTO forum_topics (title, content, user_id, category, likes, created_at)
+SELECT 'topic ' || g, 'content about sensory routines ' || g, u.ids[1 + g % cardinality(u.ids)],
+       'category ' || (g % 10), 0, now() - g * interval '1 minute'
+FROM generate_series(1, :topics) g, (SELECT array_agg(id) AS ids FROM users WHERE email LIKE 'plan-%') u;
+
+INSERT INTO comments (content, user_id, topic_id, likes, created_at)
+SELECT 'comment ' || g, u.ids[1 + g % cardinality(u.ids)], t.ids[1 + g % cardinality(t.ids)], 0,
+       now() - g * interval '1 second'
+FROM generate_series(1, :comments) g,
+     (SELECT array_agg(id) AS ids FROM users WHERE email LIKE 'plan-%') u,
+     (SELECT array_agg(id) AS ids FROM forum_topics WHERE title LIKE 'topic %') t;
+
+INSERT INTO topic_rankings (topic_id, category, score)
+SELECT id, category, (id * 7919) % 100000 / 1000.0 FROM forum_topics WHERE title LIKE 'topic %';
+
+INSERT INTO tags (name, topic_count) SELECT 'plan-tag-' || g, 0 FROM generate_series(1, 200) g;
+
+INSERT INTO topic_tags (topic_id, tag_id)
+SELECT t.id, tg.id FROM forum_topics t JOIN tags tg ON tg.name = 'plan-tag-' || (1 + t.id % 200)
+WHERE t.title LIKE 'topic %';
+
+INSERT INTO events (title, description, date, time, location, created_by)
+SELECT 'event ' || g, 'd', '2026-01-01', '10:00', 'online', u.ids[1 + g % cardinality(u.ids)]
+FROM generate_series(1, :events) g, (SELECT array_agg(id) AS ids FROM users WHERE email LIKE 'plan-%') u;
+
+INSERT INTO event_attendees (event_id, user_id)
+SELECT e.id, u.id FROM events e JOIN users u ON u.email LIKE 'plan-%' AND u.id % 50 = e.id % 50
+WHERE e.title LIKE 'event %';
+
+ANALYZE;
+"""
+
+def queries(ids):
+    """(name, statement) for each query a router issues, from the router's own statement builder."""
+    now = datetime.now()
+    return [
+        ("principal", security.select_principal(ids["user"])),
+        ("therapist id", security.select_therapist_id(ids["therapist_user"])),
+        ("therapist by user", therapist.select_profile(ids["therapist_user"])),
+        ("therapists by specialization", therapist.select_therapists(specialization="spec 3")),
+        ("pending appointments", appoitnment.select_pending(ids["therapist"])),
+        ("confirmed appointments", appoitnment.select_confirmed(ids["user"])),
+        ("booked slots", therapist.select_booked(ids["therapist"], now, now + timedelta(days=14))),
+        ("therapist stats by week", therapist_stats.stats_query(ids["therapist"], date(2026, 1, 1), date(2026, 4, 1), "week")),
+        ("topic", community.select_topic(ids["topic"])),
+        ("topics page", community.select_topics(loaders.topic_listing())),
+        ("topic comment previews", loaders.select_comment_previews(list(range(ids["topic"] - 9, ids["topic"] + 1)))),
+        ("topics by category", community.select_topics(loaders.topic_summary(), "category 3")),
+        ("topic comments", community.select_comments(ids["topic"], (datetime(2000, 1, 1), 0), 50)),
+        ("popular tags", community.select_popular_tags()),
+        ("topics by tag", community.select_tag_topics(ids["tag"])),
+        ("events page", community.select_events()),
+        ("event attendees", community.select_attendees(ids["event"], limit=50)),
+        ("trending", trending.trending_page(None, None, 10)),
+        ("trending by category", trending.trending_page("category 3", (50.0, 10**9), 10)),
+        # a selective term; words in most rows are rightly answered with a seq scan
+        ("forum search", search.search_page("weighted blanket", None, 10)),
+    ]
+
+
+def seq_scans(plan):
+    """Relation names of every Seq Scan node in an EXPLAIN (FORMAT JSON) plan tree."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", ()):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def explain(conn, stmt):
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    result = await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params)
+    return result.scalar()[0]["Plan"]
+
+
+async def large_tables(conn, min_rows):
+    result = await conn.execute(
+        text("SELECT relname FROM pg_class WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace "
+             "AND reltuples >= :min_rows"),
+        {"min_rows": min_rows},
+    )
+    return set(result.scalars())
+
+
+async def seed(conn, sizes, min_rows):
+    """Seed ``sizes`` rows into ``conn``'s open transaction; returns the tables that must not
+    be sequentially scanned and the ids ``queries`` takes."""
+    for statement in SEED.split(";\n"):
+        if statement.strip():
+            await conn.execute(text(statement), sizes)
+    large = await large_tables(conn, min_rows)
+    ids = {
+        "user": await conn.scalar(select(func.max(models.User.id))),
+        "therapist": await conn.scalar(select(func.max(models.Therapist.id))),
+        "therapist_user": await conn.scalar(select(func.max(models.Therapist.user_id))),
+        "topic": await conn.scalar(select(func.max(models.Comment.topic_id))),
+        "tag": await conn.scalar(select(func.max(models.Tag.id))),
+        "event": await conn.scalar(select(func.max(models.Event.id))),
+    }
+    return large, ids
+
+
+async def run(sizes, min_rows, verbose):
+    failures = []
+    async with async_engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            large, ids = await seed(conn, sizes, min_rows)
+            for name, stmt in queries(ids):
+                plan = await explain(conn, stmt)
+                scanned = sorted(set(seq_scans(plan)) & large)
+                if scanned:
+                    failures.append((name, scanned))
+                print(f"{'FAIL' if scanned else 'ok  '} {name}" + (f" (seq scan on {', '.join(scanned)})" if scanned else ""))
+                if verbose:
+                    print(json.dumps(plan, indent=2))
+        finally:
+            await trans.rollback()
+    await async_engine.dispose()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--appointments", type=int, default=100000)
+    parser.add_argument("--topics", type=int, default=20000)
+    parser.add_argument("--comments", type=int, default=100000)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--min-rows", type=int, default=10000, help="tables this big must not be seq scanned")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    require_local_database()
+    sizes = {key: getattr(args, key) for key in ("users", "appointments", "topics", "comments", "events")}
+    failures = asyncio.run(run(sizes, args.min_rows, args.verbose))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
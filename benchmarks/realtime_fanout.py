@@ -0,0 +1,154 @@
+"""Fan-out of LISTEN/NOTIFY events to thousands of SSE subscribers in one process.
+
+Opens ``--subscribers`` concurrent streams on ``/community/topics/{id}/events``
+through the app itself (lifespan, routing, middleware and all), then commits
+``--events`` notifications the same way the write routes do and records when each
+subscriber receives each one. Fails unless every subscriber got every event, in order.
+This is for timing; tests/test_realtime.py checks delivery and overflow on every test run.
+
+    python -m benchmarks.realtime_fanout --subscribers 5000 --events 20
+"""
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import sys
+import time
+
+from sqlalchemy import select
+
+from .common import require_local_database
+
+
+class Client:
+    """One SSE subscriber talking to the ASGI app directly, without sockets."""
+
+    def __init__(self, app, path):
+        self.app = app
+        self.path = path
+        self.status = None
+        self.ready = asyncio.Event()
+        self.received = []  # (arrival time, data)
+        self._buffer = b""
+        self._disconnect = asyncio.Event()
+        self._requested = False
+
+    async def run(self):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "server": ("bench", 80), "client": ("127.0.0.1", 0), "root_path": "",
+            "path": self.path, "raw_path": self.path.encode(), "query_string": b"",
+            "headers": [(b"host", b"bench"), (b"accept", b"text/event-stream")],
+        }
+        await self.app(scope, self._receive, self._send)
+
+    def close(self):
+        self._disconnect.set()
+
+    async def _receive(self):
+        if not self._requested:
+            self._requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self._disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def _send(self, message):
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+            return
+        self._buffer += message.get("body", b"")
+        *frames, self._buffer = self._buffer.split(b"\n\n")
+        now = time.perf_counter()
+        for frame in frames:
+            fields = dict(line.split(b": ", 1) for line in frame.split(b"\n") if b": " in line)
+            if frame.startswith(b"retry:"):
+                self.ready.set()
+            elif fields.get(b"event") == b"bench":
+                self.received.append((now, json.loads(fields[b"data"])))
+
+
+async def run(subscribers, events, interval):
+    from backend import models, realtime
+    from backend.database import AsyncSessionLocal
+    from backend.main import app
+
+    async with app.router.lifespan_context(app):
+        async with AsyncSessionLocal() as db:
+            topic_id = await db.scalar(select(models.ForumTopic.id).limit(1))
+        if topic_id is None:
+            sys.exit("No topics to subscribe to; run benchmarks.datagen first")
+        for _ in range(100):
+            if realtime.broker.listening:
+                break
+            await asyncio.sleep(0.05)
+        else:
+            sys.exit("The realtime listener did not connect")
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        clients = [Client(app, f"/community/topics/{topic_id}/events") for _ in range(subscribers)]
+        start = time.perf_counter()
+        tasks = [asyncio.create_task(client.run()) for client in clients]
+        await asyncio.gather(*(client.ready.wait() for client in clients))
+        connect_seconds = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        sent = []
+        for seq in range(events):
+            async with AsyncSessionLocal() as db:
+                await realtime.publish(db, f"topic:{topic_id}", "bench", {"seq": seq})
+                sent.append(time.perf_counter())
+                await db.commit()
+            await asyncio.sleep(interval)
+        deadline = time.perf_counter() + 10
+        while time.perf_counter() < deadline and any(len(c.received) < events for c in clients):
+            await asyncio.sleep(0.05)
+
+        for client in clients:
+            client.close()
+        await asyncio.gather(*tasks)
+        stats = realtime.broker.stats()
+
+    latencies = sorted(
+        (arrived - sent[data["seq"]]) * 1000 for client in clients for arrived, data in client.received
+    )
+    complete = all([data["seq"] for _, data in c.received] == list(range(events)) for c in clients)
+    # time for one event to reach the last subscriber
+    spread = [
+        (max(c.received[seq][0] for c in clients) - sent[seq]) * 1000 for seq in range(events)
+    ] if complete else []
+    return {
+        "subscribers": subscribers,
+        "events": events,
+        "complete": complete,
+        "statuses": sorted({c.status for c in clients}),
+        "connect_seconds": round(connect_seconds, 2),
+        "rss_per_subscriber_kib": round((rss_after - rss_before) / subscribers, 1),
+        "delivered": len(latencies),
+        "expected": subscribers * events,
+        "latency_ms": {
+            "p50": round(statistics.median(latencies), 2),
+            "p99": round(latencies[int(len(latencies) * 0.99) - 1], 2),
+            "max": round(latencies[-1], 2),
+        } if latencies else None,
+        "last_subscriber_ms": round(statistics.median(spread), 2) if spread else None,
+        "broker": stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between events")
+    args = parser.parse_args()
+
+    require_local_database()
+    report = asyncio.run(run(args.subscribers, args.events, args.interval))
+    print(json.dumps(report, indent=2))
+    if not report["complete"]:
+        sys.exit("Some subscribers missed events")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Read routing between the primary and the read replica.
+
+Needs a replica configured (``DATABASE_REPLICA_HOSTNAME`` etc.). Locally a copy of the
+database stands in for one; it never receives new writes, which makes routing
+visible. Create the copy while nothing is connected to the primary database:
+
+    createdb -T fastapi fastapi_replica
+    DATABASE_REPLICA_HOSTNAME=localhost DATABASE_REPLICA_NAME=fastapi_replica \\
+        python -m benchmarks.replica_routing
+
+Runs the app in-process with its lifespan, waits for the lag monitor to mark the
+replica healthy, then as a generated user posts a topic and checks that the write
+pins the client's reads to the primary (the topic is visible straight away), that
+reads without the cookie, or with an expired one, go to the replica, and that
+``--reads`` anonymous listing reads land there too. Exits non-zero on any failed check.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+
+import httpx
+from sqlalchemy import delete
+
+from backend import models, security
+from backend.database import AsyncSessionLocal, REPLICA_DATABASE_URL
+from backend.main import app
+from backend.replica import PIN_COOKIE, replica_monitor
+
+from .common import LOCAL_HOSTS, require_local_database
+
+
+async def wait_healthy(timeout):
+    deadline = time.monotonic() + timeout
+    while not replica_monitor.healthy:
+        if time.monotonic() > deadline:
+            sys.exit(f"Replica never became healthy: {replica_monitor.stats()}")
+        await asyncio.sleep(0.1)
+
+
+def routed():
+    return replica_monitor.replica_reads, replica_monitor.primary_reads
+
+
+async def run(args):
+    checks = {}
+    category = f"replica-check-{uuid.uuid4().hex[:8]}"
+    auth = {"Authorization": f"Bearer {security.create_access_token(data={'user_id': args.user})}"}
+    async with app.router.lifespan_context(app):
+        await wait_healthy(args.timeout)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.post("/community/topics", headers=auth,
+                                         json={"title": "Replica check", "content": "routing", "category": category})
+            response.raise_for_status()
+            topic_id = response.json()["id"]
+            checks["write sets the pin cookie"] = PIN_COOKIE in client.cookies
+
+            before = routed()
+            response = await client.get("/community/topics", params={"category": category})
+            checks["pinned read goes to the primary"] = routed()[1] == before[1] + 1
+            checks["pinned read sees the write"] = len(response.json()) == 1
+
+            client.cookies.set(PIN_COOKIE, str(time.time() - 1))
+            before = routed()
+            await client.get("/community/topics", params={"category": category})
+            checks["expired pin reads the replica"] = routed()[0] == before[0] + 1
+
+            client.cookies.clear()
+            before = routed()
+            start = time.perf_counter()
+            for _ in range(args.reads):
+                (await client.get("/community/topics/summary", params={"limit": 10})).raise_for_status()
+            elapsed = time.perf_counter() - start
+            checks["anonymous reads go to the replica"] = routed()[0] == before[0] + args.reads
+        monitor = replica_monitor.stats()
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.TopicRanking).where(models.TopicRanking.topic_id == topic_id))
+        await db.execute(delete(models.ForumTopic).where(models.ForumTopic.id == topic_id))
+        await db.commit()
+    return {
+        "replica": REPLICA_DATABASE_URL.render_as_string(hide_password=True),
+        "monitor": monitor,
+        "anonymous_read_ms": round(elapsed * 1000 / max(args.reads, 1), 2),
+        "checks": checks,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user", type=int, default=1, help="generated user id to post as")
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=10, help="seconds to wait for a healthy replica")
+    args = parser.parse_args()
+
+    require_local_database()
+    if replica_monitor is None:
+        sys.exit("No replica configured; set DATABASE_REPLICA_HOSTNAME (and _NAME/_PORT)")
+    if REPLICA_DATABASE_URL.host not in LOCAL_HOSTS:
+        sys.exit(f"Refusing to run against {REPLICA_DATABASE_URL.host!r}: benchmarks only run against a local Postgres")
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if not all(report["checks"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
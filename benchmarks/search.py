@@ -0,0 +1,73 @@
+"""Forum search cost with and without the ranking candidate cap.
+
+For each of ``--terms``, runs the first search page ``--rounds`` times two ways.
+``capped`` ranks only the newest ``search.SEARCH_CANDIDATES`` matches of each kind, as
+the route does. ``uncapped`` ranks every matching topic and comment. Reports the
+number of matching rows, the median time of each way, and how many of the capped
+page's hits are also on the uncapped page. Run ``benchmarks.datagen`` first; with
+its vocabulary, single words match a large share of the rows, and words missing from
+it match none.
+
+    python -m benchmarks.search --terms sensory "sensory routine school" "weighted blanket"
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from sqlalchemy import func, select
+
+from backend import models, search
+from backend.database import async_engine
+
+from .common import require_local_database
+
+
+async def timed(conn, stmt, rounds):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        rows = (await conn.execute(stmt)).all()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 3), rows
+
+
+async def matches(conn, term):
+    query = func.websearch_to_tsquery(search.SEARCH_CONFIG, term)
+    return {
+        "topics": await conn.scalar(select(func.count()).where(models.ForumTopic.search_vector.op("@@")(query))),
+        "comments": await conn.scalar(select(func.count()).where(models.Comment.search_vector.op("@@")(query))),
+    }
+
+
+async def run(args):
+    report = {}
+    async with async_engine.connect() as conn:
+        for term in args.terms:
+            capped_ms, capped = await timed(conn, search.search_page(term, None, args.limit), args.rounds)
+            uncapped_ms, uncapped = await timed(conn, search.search_page(term, None, args.limit, None), args.rounds)
+            everywhere = {(row.kind, row.id) for row in uncapped}
+            report[term] = {
+                "matches": await matches(conn, term),
+                "capped_ms": capped_ms,
+                "uncapped_ms": uncapped_ms,
+                "page_hits_in_common": sum((row.kind, row.id) in everywhere for row in capped),
+            }
+    await async_engine.dispose()
+    return {"candidates": search.SEARCH_CANDIDATES, "limit": args.limit, "terms": report}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--terms", nargs="+", default=["sensory", "sensory routine school", "weighted blanket"])
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    require_local_database()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Serialization cost of a large topic listing, per response path.
+
+Builds ``--topics`` ForumTopic ORM objects in memory, each with an author, two tags
+and ``--comments`` comments by other users, and times turning the list into a JSON
+body as ``List[ForumTopicResponse]``:
+
+- ``fastapi_json``: what a route returning ORM objects does by default, FastAPI's
+  response_model validation and ``jsonable`` dump, then ``JSONResponse``.
+- ``fastapi_orjson``: the same with ``ORJSONResponse``, the app's default class.
+- ``type_adapter``: ``serialization.render``, one cached TypeAdapter validating from
+  attributes and dumping straight to bytes, as the list endpoints now do.
+
+No database is needed. Each path runs ``--rounds`` times and the best round is kept.
+
+    python -m benchmarks.serialization --topics 10000 --comments 5
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from backend import models, schemas, serialization
+
+
+def build_topics(n_topics, n_comments):
+    users = [models.User(id=i, name=f"user {i}", email=f"user-{i}@example.com") for i in range(1, 501)]
+    tags = [models.Tag(id=i, name=f"tag-{i}", topic_count=0) for i in range(1, 51)]
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    topics = []
+    for t in range(n_topics):
+        author = users[t % len(users)]
+        topic = models.ForumTopic(
+            id=t + 1, title=f"Topic {t}", content="Looking for advice on sensory-friendly routines. " * 4,
+            category="general", user_id=author.id, user=author, likes=t % 17,
+            created_at=start + timedelta(minutes=t),
+        )
+        topic.tags = [tags[t % len(tags)], tags[(t * 7 + 3) % len(tags)]]
+        topic.comments = [
+            models.Comment(
+                id=t * n_comments + c + 1, content="Thank you, this helped our family a lot. " * 2,
+                user_id=users[(t + c + 1) % len(users)].id, user=users[(t + c + 1) % len(users)],
+                topic_id=topic.id, likes=c, created_at=topic.created_at + timedelta(seconds=c),
+            )
+            for c in range(n_comments)
+        ]
+        topics.append(topic)
+    return topics
+
+
+def fastapi_path(response_class):
+    field = create_model_field("Response", List[schemas.ForumTopicResponse], mode="serialization")
+
+    def run(topics):
+        content = asyncio.run(serialize_response(field=field, response_content=topics))
+        return response_class(content).body
+
+    return run
+
+
+def type_adapter_path(topics):
+    return serialization.render(List[schemas.ForumTopicResponse], topics)
+
+
+PATHS = {
+    "fastapi_json": fastapi_path(JSONResponse),
+    "fastapi_orjson": fastapi_path(ORJSONResponse),
+    "type_adapter": type_adapter_path,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--topics", type=int, default=10_000)
+    parser.add_argument("--comments", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    topics = build_topics(args.topics, args.comments)
+    bodies = {}
+    report = {"topics": args.topics, "comments_per_topic": args.comments, "paths": {}}
+    for name, run in PATHS.items():
+        run(topics[:10])  # compiles the adapter or field outside the timing
+        best = float("inf")
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            bodies[name] = run(topics)
+            best = min(best, time.perf_counter() - start)
+        report["paths"][name] = {"ms": round(best * 1000, 1), "bytes": len(bodies[name])}
+    baseline = report["paths"]["fastapi_json"]["ms"]
+    for stats in report["paths"].values():
+        stats["speedup"] = round(baseline / stats["ms"], 2)
+    # the paths differ in whitespace, not in content
+    decoded = [json.loads(body) for body in bodies.values()]
+    report["same_content"] = all(d == decoded[0] for d in decoded)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""A month of free slots for a heavily booked therapist.
+
+Creates a therapist with weekday 9-17 availability and ``--appointments`` hourly
+bookings (15% of them cancelled) spread over the year around ``--month``, then asks
+for that month's free slots ``--rounds`` times. It times each piece separately:
+
+- ``query``: the booked-intervals query, answered by the overlap constraint's gist index.
+- ``compute``: expanding the windows and walking them against the bookings.
+- ``endpoint``: ``GET /therapists/{id}/slots`` in process, end to end.
+
+It reports the median and worst timing of each, and the row and slot counts. It fails
+if any slot offered overlaps a live booking or falls outside the availability. The
+rows it creates are deleted at the end.
+
+    python -m benchmarks.slots --appointments 2000 --month 2026-03
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, time as dtime, timedelta
+
+import httpx
+from sqlalchemy import delete, insert, select
+
+from backend import models, slots
+from backend.database import AsyncSessionLocal, async_engine
+from backend.main import app
+from backend.routers.therapist import select_booked
+
+from .common import require_local_database
+
+HOURS = range(9, 17)
+
+
+def summary(timings):
+    return {"median_ms": round(statistics.median(timings) * 1000, 3), "max_ms": round(max(timings) * 1000, 3)}
+
+
+async def create_therapist(appointments, around, rng):
+    """A therapist booked on ``appointments`` distinct working hours within half a year of ``around``."""
+    days = [around + timedelta(days=n) for n in range(-182, 183) if (around + timedelta(days=n)).weekday() < 5]
+    hours = [datetime.combine(day, dtime(hour)) for day in days for hour in HOURS]
+    if appointments > len(hours):
+        sys.exit(f"At most {len(hours)} appointments fit in a year of working hours")
+    prefix = f"bench-slots-{uuid.uuid4().hex[:12]}"
+    async with AsyncSessionLocal() as db:
+        user = models.User(name="Slots", email=f"{prefix}@example.com", password="-", userType="therapist")
+        db.add(user)
+        await db.flush()
+        therapist = models.Therapist(name="Slots", specialization="ABA", contact="-", user_id=user.id,
+                                     experience=1, bio="-")
+        db.add(therapist)
+        await db.flush()
+        db.add_all(models.TherapistAvailability(therapist_id=therapist.id, weekday=weekday,
+                                                start_time=dtime(HOURS.start), end_time=dtime(HOURS.stop))
+                   for weekday in range(5))
+        await db.execute(insert(models.Appointment), [
+            {"user_id": user.id, "therapist_id": therapist.id, "scheduled_time": start,
+             "ends_at": start + slots.SLOT_LENGTH, "status": rng.choices(["confirmed", "cancelled"], [85, 15])[0]}
+            for start in rng.sample(hours, appointments)
+        ])
+        await db.commit()
+    return user.id, therapist.id
+
+
+async def drop_therapist(user_id, therapist_id):
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.Appointment).where(models.Appointment.therapist_id == therapist_id))
+        await db.execute(delete(models.TherapistAvailability).where(
+            models.TherapistAvailability.therapist_id == therapist_id))
+        await db.execute(delete(models.Therapist).where(models.Therapist.id == therapist_id))
+        await db.execute(delete(models.User).where(models.User.id == user_id))
+        await db.commit()
+
+
+def check(free, busy, windows):
+    for slot_start, slot_end in free:
+        if any(start < slot_end and slot_start < end for start, end in busy):
+            sys.exit(f"Slot {slot_start} overlaps a booking")
+        if not any(opens <= slot_start and slot_end <= closes for opens, closes in windows):
+            sys.exit(f"Slot {slot_start} is outside the availability")
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    start = datetime.strptime(args.month, "%Y-%m")
+    end = (start + timedelta(days=32)).replace(day=1)
+    user_id, therapist_id = await create_therapist(args.appointments, start, rng)
+    timings = {"query": [], "compute": [], "endpoint": []}
+    try:
+        async with AsyncSessionLocal() as db:
+            availability = (await db.scalars(select(models.TherapistAvailability).where(
+                models.TherapistAvailability.therapist_id == therapist_id))).all()
+            for _ in range(args.rounds):
+                began = time.perf_counter()
+                booked = (await db.execute(select_booked(therapist_id, start, end))).tuples().all()
+                timings["query"].append(time.perf_counter() - began)
+
+                began = time.perf_counter()
+                windows = slots.expand_windows(availability, start, end)
+                busy = slots.merge_intervals(booked)
+                free = slots.free_slots(windows, busy, slots.SLOT_LENGTH, start, end)
+                timings["compute"].append(time.perf_counter() - began)
+        check(free, busy, windows)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            params = {"from": start.isoformat(), "to": end.isoformat()}
+            for _ in range(args.rounds):
+                began = time.perf_counter()
+                response = await client.get(f"/therapists/{therapist_id}/slots", params=params)
+                timings["endpoint"].append(time.perf_counter() - began)
+                response.raise_for_status()
+        if len(response.json()) != len(free):
+            sys.exit("The endpoint and the direct computation offer different slots")
+    finally:
+        await drop_therapist(user_id, therapist_id)
+        await async_engine.dispose()
+
+    return {
+        "month": args.month,
+        "appointments": args.appointments,
+        "booked_in_month": len(booked),
+        "free_slots": len(free),
+        **{name: summary(values) for name, values in timings.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--appointments", type=int, default=1500, help="bookings over the surrounding year")
+    parser.add_argument("--month", default="2026-03", help="YYYY-MM")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    require_local_database()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Cold-start benchmark for the API.
+
+Each run starts a fresh interpreter, imports ``backend.main`` and serves the first
+request through the ASGI app (lifespan included), so the numbers reflect what a
+serverless host pays on a cold invocation. Needs the usual DATABASE_* settings in
+the environment or ``.env``; the first request does not touch the database.
+
+    python -m benchmarks.startup --runs 20
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import asyncio, json, time
+t0 = time.perf_counter()
+from backend.main import app
+t1 = time.perf_counter()
+import httpx
+
+async def first_request():
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/")
+            response.raise_for_status()
+            return time.perf_counter()
+
+t2 = asyncio.run(first_request())
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_response_ms": (t2 - t0) * 1000}))
+"""
+
+
+def run_once():
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "min": round(values[0], 1),
+        "median": round(statistics.median(values), 1),
+        "max": round(values[-1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    samples = [run_once() for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "import_ms": summarize([s["import_ms"] for s in samples]),
+        "first_response_ms": summarize([s["first_response_ms"] for s in samples]),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
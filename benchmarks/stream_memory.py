@@ -0,0 +1,158 @@
+"""Peak memory of a long comment thread, materialized as one JSON array vs streamed as NDJSON.
+
+Seeds one topic per size, then in a fresh interpreter per measurement either loads
+the whole thread the way a single unbounded page would (every row into the ORM,
+one ``dump_json`` of the list) or requests it from the app with
+``Accept: application/x-ndjson`` and discards the body as it arrives. Peak RSS is
+reported above the interpreter's baseline after imports, so the two sizes show
+whether memory grows with the thread or stays flat.
+
+    python -m benchmarks.stream_memory --sizes 50000 500000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import text
+
+from .common import require_local_database
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import asyncio, json, resource, sys, time
+from typing import List
+from sqlalchemy import select
+from backend import schemas
+from backend.database import AsyncSessionLocal
+from backend.main import app
+from backend.routers.community import select_comments
+from backend.serialization import type_adapter
+
+mode, topic_id = sys.argv[1], int(sys.argv[2])
+
+def peak_kib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+async def materialize():
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select_comments(topic_id))
+        comments = result.scalars().all()
+        adapter = type_adapter(List[schemas.CommentResponse])
+        return len(adapter.dump_json(adapter.validate_python(comments, from_attributes=True)))
+
+async def stream():
+    received = 0
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "server": ("bench", 80), "client": ("127.0.0.1", 0), "root_path": "",
+        "path": f"/community/topics/{topic_id}/comments", "raw_path": b"", "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"accept", b"application/x-ndjson")],
+    }
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            # the client never disconnects; Starlette listens for it while streaming
+            await asyncio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise SystemExit(f"status {message['status']}")
+        if message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return received
+
+async def main():
+    # a throwaway session first, so connection setup is part of the baseline
+    async with AsyncSessionLocal() as db:
+        await db.execute(select(1))
+    baseline = peak_kib()
+    start = time.perf_counter()
+    size = await (materialize() if mode == "materialize" else stream())
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"bytes": size, "seconds": round(elapsed, 2),
+                      "baseline_mib": round(baseline / 1024, 1),
+                      "peak_mib": round(peak_kib() / 1024, 1),
+                      "growth_mib": round((peak_kib() - baseline) / 1024, 1)}))
+
+asyncio.run(main())
+"""
+
+MODES = ("materialize", "stream")
+
+
+async def seed(sizes):
+    from backend.database import AsyncSessionLocal
+
+    topic_ids = {}
+    async with AsyncSessionLocal() as db:
+        user_id = await db.scalar(text("SELECT min(id) FROM users"))
+        if user_id is None:
+            sys.exit("No users to write comments as; run benchmarks.datagen first")
+        for size in sizes:
+            topic_id = await db.scalar(text(
+                "INSERT INTO forum_topics (title, content, user_id, category, likes) "
+                "VALUES ('stream_memory', 'benchmark thread', :user_id, 'benchmark', 0) RETURNING id"
+            ), {"user_id": user_id})
+            await db.execute(text(
+                "INSERT INTO comments (content, user_id, topic_id, created_at, likes) "
+                "SELECT 'comment ' || i || ' ' || repeat('x', 200), :user_id, :topic_id, "
+                "timestamptz '2025-01-01' + i * interval '1 second', 0 "
+                "FROM generate_series(1, :size) AS i"
+            ), {"user_id": user_id, "topic_id": topic_id, "size": size})
+            topic_ids[size] = topic_id
+        await db.commit()
+    return topic_ids
+
+
+async def cleanup(topic_ids):
+    from backend.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        ids = list(topic_ids.values())
+        await db.execute(text("DELETE FROM comments WHERE topic_id = ANY(:ids)"), {"ids": ids})
+        await db.execute(text("DELETE FROM forum_topics WHERE id = ANY(:ids)"), {"ids": ids})
+        await db.commit()
+
+
+def measure(mode, topic_id):
+    # no cache or metrics noise in the probe; neither changes how the body is built
+    env = {**os.environ, "METRICS_ENABLED": "false"}
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, mode, str(topic_id)], cwd=ROOT, env=env,
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50_000, 500_000])
+    parser.add_argument("--keep", action="store_true", help="leave the seeded topics in place")
+    args = parser.parse_args()
+
+    require_local_database()
+    topic_ids = asyncio.run(seed(args.sizes))
+    try:
+        report = {"comments": {}}
+        for size, topic_id in topic_ids.items():
+            report["comments"][size] = {mode: measure(mode, topic_id) for mode in MODES}
+    finally:
+        if not args.keep:
+            asyncio.run(cleanup(topic_ids))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Therapist dashboard stats: daily rollups vs aggregating raw appointments.
+
+Run after ``benchmarks.datagen``. For the therapist with the most appointments (or
+``--therapist``), computes the ``/therapists/me/stats`` numbers for the ``--days`` days
+up to their last appointment both ways. One way reads therapist_daily_stats, as the
+route does. The other aggregates appointments directly, numbering every booking in
+the therapist's history to find new and repeat clients. Reports the best of ``--rounds``
+timings for each way, and fails if the two disagree, so it doubles as a consistency
+check of the incrementally maintained rollups.
+
+    python -m benchmarks.therapist_stats --bucket week
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from datetime import timedelta
+
+from sqlalchemy import Date, cast, func, select
+
+from backend import models, therapist_stats
+from backend.database import AsyncSessionLocal, async_engine
+
+from .common import require_local_database
+
+
+def raw_query(therapist_id, start, end, bucket):
+    appointment = models.Appointment
+    numbered = (
+        select(
+            appointment,
+            func.row_number().over(partition_by=appointment.user_id, order_by=appointment.id).label("nth"),
+        )
+        .where(appointment.therapist_id == therapist_id)
+        .subquery()
+    )
+    day = cast(numbered.c.scheduled_time, Date)
+    period = day if bucket == "day" else cast(func.date_trunc(bucket, day), Date)
+    timed = (numbered.c.status == "confirmed") & numbered.c.created_at.isnot(None) & numbered.c.confirmed_at.isnot(None)
+
+    def count(condition):
+        return func.count().filter(condition)
+
+    return (
+        select(
+            period.label("start"),
+            func.count().label("booked"),
+            count(numbered.c.status == "pending").label("pending"),
+            count(numbered.c.status == "confirmed").label("confirmed"),
+            count(numbered.c.status == "cancelled").label("cancelled"),
+            count(timed).label("confirmations"),
+            func.coalesce(func.sum(func.extract("epoch", numbered.c.confirmed_at - numbered.c.created_at))
+                          .filter(timed), 0).label("confirmation_lead_seconds"),
+            count(numbered.c.nth == 1).label("new_clients"),
+            count(numbered.c.nth == 2).label("repeat_clients"),
+        )
+        .where(day >= start, day < end)
+        .group_by(period)
+        .order_by(period)
+    )
+
+
+def same(a, b):
+    return len(a) == len(b) and all(
+        x["start"] == y["start"]
+        and all(math.isclose(x[name], y[name], rel_tol=1e-9) for name in therapist_stats.COUNTERS)
+        for x, y in zip(a, b)
+    )
+
+
+async def timed(db, statement, rounds):
+    best, rows = float("inf"), None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        rows = (await db.execute(statement)).mappings().all()
+        best = min(best, time.perf_counter() - start)
+    return rows, round(best * 1000, 2)
+
+
+async def run(args):
+    async with AsyncSessionLocal() as db:
+        appointment = models.Appointment
+        therapist_id = args.therapist or await db.scalar(
+            select(appointment.therapist_id).group_by(appointment.therapist_id)
+            .order_by(func.count().desc()).limit(1)
+        )
+        if therapist_id is None:
+            sys.exit("No appointments found; run `python -m benchmarks.datagen` first")
+        history = await db.scalar(select(func.count()).where(appointment.therapist_id == therapist_id))
+        last = await db.scalar(select(func.max(appointment.scheduled_time)).where(appointment.therapist_id == therapist_id))
+        end = last.date() + timedelta(days=1)
+        start = end - timedelta(days=args.days)
+
+        rollup, rollup_ms = await timed(db, therapist_stats.stats_query(therapist_id, start, end, args.bucket), args.rounds)
+        raw, raw_ms = await timed(db, raw_query(therapist_id, start, end, args.bucket), args.rounds)
+    await async_engine.dispose()
+    return {
+        "therapist_id": therapist_id,
+        "appointments_in_history": history,
+        "range": [start.isoformat(), end.isoformat()],
+        "bucket": args.bucket,
+        "buckets": len(rollup),
+        "rollup_ms": rollup_ms,
+        "raw_ms": raw_ms,
+        "consistent": same(rollup, raw),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--therapist", type=int, help="defaults to the therapist with the most appointments")
+    parser.add_argument("--days", type=int, default=366)
+    parser.add_argument("--bucket", choices=["day", "week", "month"], default="week")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    require_local_database()
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if not report["consistent"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Per-request cost of access-token verification with the revocation check.
+
+Fills a revocation filter with ``--revoked`` session ids, mints ``--tokens`` access
+tokens for other sessions, and times per token:
+
+- ``decode``: ``security.verify_access_token`` alone, i.e. verification before revocation existed.
+- ``filter``: ``revocation_list.may_be_revoked`` alone.
+- ``decode_and_filter``: both, i.e. what ``get_current_user`` does before its principal lookup.
+- ``decode_and_table`` (with ``--db``): decode plus a primary-key lookup in
+  token_revocations, the per-request query the filter replaces.
+
+With ``--db`` it also counts SQL statements per authenticated request through the
+app (``GET /appointments/confirmed`` for ``--users`` generated users), once with the
+principal cache warm and once with it cleared before every request, which is the
+principal lookup the cache saves. Run ``benchmarks.datagen`` first for that part.
+
+Also measures the filter's false-positive rate on unrevoked sessions (each one costs a
+table lookup), and its size next to a Python set of the same ids. Without ``--db`` no
+database is needed. Each path runs ``--rounds`` times and the best round is kept.
+
+    python -m benchmarks.token_verify --revoked 100000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from backend import models, security
+from backend.principals import principal_cache
+from backend.config import settings
+from backend.revocation import BloomFilter, RevocationList
+
+from .common import require_local_database
+
+
+def best_per_op(fn, items, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return round(best / len(items) * 1e6, 2)
+
+
+async def table_path(tokens, rounds):
+    from backend.database import AsyncSessionLocal, async_engine
+
+    revocation = models.TokenRevocation
+    failure = HTTPException(status_code=401)
+    best = float("inf")
+    async with AsyncSessionLocal() as db:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for token in tokens:
+                data = security.verify_access_token(token, failure)
+                await db.scalar(select(revocation.session_id).where(
+                    revocation.session_id == data.session_id, revocation.expires_at > func.now()))
+            best = min(best, time.perf_counter() - start)
+    await async_engine.dispose()
+    return round(best / len(tokens) * 1e6, 2)
+
+
+async def statements_per_request(users, requests):
+    import httpx
+
+    from backend.database import async_engine
+    from backend.main import app
+    from backend.metrics import registry
+    from backend.revocation import revocation_list
+
+    from .datagen import is_therapist
+
+    route = ("GET", "/appointments/confirmed")
+    user_ids = [user_id for user_id in range(1, users + 1) if not is_therapist(user_id)]
+    headers = [{"Authorization": f"Bearer {security.create_access_token(data={'user_id': user_id})}"}
+               for user_id in user_ids]
+    report = {}
+    async with app.router.lifespan_context(app):
+        await revocation_list.sync()  # so revocation checks are answered by the filter
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for mode in ("cache_cleared", "cache_warm"):
+                principal_cache.clear()
+                for auth in headers:  # warm up, and fill the cache for the warm run
+                    await client.get("/appointments/confirmed", headers=auth)
+                before = registry.routes[route].statements
+                hits, misses = principal_cache.hits, principal_cache.misses
+                for n in range(requests):
+                    if mode == "cache_cleared":
+                        principal_cache.clear()
+                    response = await client.get("/appointments/confirmed", headers=headers[n % len(headers)])
+                    if response.status_code not in (200, 404):
+                        sys.exit(f"GET /appointments/confirmed answered {response.status_code}")
+                report[mode] = {
+                    "statements_per_request": round((registry.routes[route].statements - before) / requests, 2),
+                    "cache_hits": principal_cache.hits - hits,
+                    "cache_misses": principal_cache.misses - misses,
+                }
+    await async_engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--revoked", type=int, default=100_000)
+    parser.add_argument("--tokens", type=int, default=20_000)
+    parser.add_argument("--probes", type=int, default=200_000, help="unrevoked ids for the false-positive rate")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--db", action="store_true",
+                        help="also time a table lookup per request and count statements per request")
+    parser.add_argument("--users", type=int, default=100, help="generated users to authenticate as, with --db")
+    parser.add_argument("--requests", type=int, default=1000, help="authenticated requests per mode, with --db")
+    args = parser.parse_args()
+
+    revoked = [uuid.uuid4().hex for _ in range(args.revoked)]
+    # the list as a synced app process holds it; a long interval keeps it from going stale mid-run
+    revocation_list = RevocationList(interval=3600, rebuild_interval=3600,
+                                     error_rate=settings.revocation_false_positive_rate)
+    revocation_list.filter = BloomFilter(max(revocation_list.min_capacity, 2 * len(revoked)),
+                                         revocation_list.error_rate)
+    for session_id in revoked:
+        revocation_list.filter.add(session_id)
+    revocation_list.synced_at = time.monotonic()
+
+    tokens = [security.create_access_token(data={"user_id": n}) for n in range(1, args.tokens + 1)]
+    failure = HTTPException(status_code=401)
+    session_ids = [security.verify_access_token(token, failure).session_id for token in tokens]
+
+    def decode_and_filter(token):
+        data = security.verify_access_token(token, failure)
+        if revocation_list.may_be_revoked(data.session_id):
+            pass  # would be confirmed against the table
+
+    paths = {
+        "decode": best_per_op(lambda token: security.verify_access_token(token, failure), tokens, args.rounds),
+        "filter": best_per_op(revocation_list.may_be_revoked, session_ids, args.rounds),
+        "decode_and_filter": best_per_op(decode_and_filter, tokens, args.rounds),
+    }
+    if args.db:
+        require_local_database()
+        paths["decode_and_table"] = asyncio.run(table_path(tokens, args.rounds))
+        round_trips = asyncio.run(statements_per_request(args.users, args.requests))
+
+    assert all(revocation_list.may_be_revoked(session_id) for session_id in revoked), "false negative"
+    false_positives = sum(revocation_list.may_be_revoked(uuid.uuid4().hex) for _ in range(args.probes))
+    as_set = set(revoked)
+    set_bytes = sys.getsizeof(as_set) + sum(sys.getsizeof(session_id) for session_id in as_set)
+    print(json.dumps({
+        "revoked_sessions": args.revoked,
+        "tokens": args.tokens,
+        "us_per_request": paths,
+        "false_positive_rate": false_positives / args.probes,
+        "target_false_positive_rate": revocation_list.error_rate,
+        "filter_hashes": revocation_list.filter.hashes,
+        "filter_bytes": len(revocation_list.filter.bits),
+        "python_set_bytes": set_bytes,
+        **({"authenticated_requests": round_trips} if args.db else {}),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
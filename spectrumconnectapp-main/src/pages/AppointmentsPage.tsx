@@ -10,7 +10,7 @@ import { Avatar, AvatarFallback, AvatarImage } from "@/components/ui/avatar";
 import { Calendar as CalendarIcon, Clock, Video, UserCircle, Plus, Check, X } from "lucide-react";
 import { useToast } from "@/hooks/use-toast";
 import { useAuth } from "@/context/AuthContext";
-import { bookAppointment,getAppointments,confirmAppointments } from "@/services /appointmentService";
+import { bookAppointment,getAppointments,confirmAppointments,subscribeToAppointmentEvents } from "@/services /appointmentService";
 import { getAllTherapists } from "@/services /therapistservices";
 import { Therapist } from '../lib/types';
 import { Appointment,AppointmentRequest } from '../lib/types';
@@ -64,6 +64,22 @@ const AppointmentsPage = () => {
     fetchAppointments();
     fetchTherapists();
   }, []);
+
+  // Refresh the list when a booking arrives or one of ours is confirmed
+  useEffect(() => {
+    return subscribeToAppointmentEvents(async (type) => {
+      if (type === "appointment.created") {
+        toast({ title: "New Appointment Request", description: "A client has requested an appointment." });
+      } else if (type === "appointment.confirmed") {
+        toast({ title: "Appointment Confirmed", description: "Your therapist has confirmed an appointment." });
+      }
+      try {
+        setAppointments(await getAppointments(userType));
+      } catch (error) {
+        console.error("Failed to refresh appointments:", error);
+      }
+    });
+  }, [userType]);
   
   // Filter appointments based on active tab
   const filteredAppointments = appointments.filter(
@@ -1,7 +1,7 @@
 import axios, { AxiosInstance, AxiosRequestConfig, AxiosResponse, InternalAxiosRequestConfig } from 'axios';
 
 // Define the base API URL from environment variables
-const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
+export const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
 // Create and configure an Axios instance
 const apiClient: AxiosInstance = axios.create({
@@ -10,6 +10,8 @@ const apiClient: AxiosInstance = axios.create({
     'Content-Type': 'application/json',
   },
   timeout: 10000,
+  // carries the API's read-your-writes cookie, so a page reloaded right after a post shows it
+  withCredentials: true,
 });
 
 // Request interceptor
@@ -24,11 +26,48 @@ apiClient.interceptors.request.use(
   (error: any) => Promise.reject(error)
 );
 
+// Access tokens are short-lived: on a 401, trade the refresh token for a new pair
+// once and retry. Concurrent 401s share one refresh, since each refresh token works once.
+let refreshing: Promise<string | null> | null = null;
+
+const refreshAccessToken = (): Promise<string | null> => {
+  const refreshToken = localStorage.getItem('refreshToken');
+  if (!refreshToken) {
+    return Promise.resolve(null);
+  }
+  if (!refreshing) {
+    refreshing = axios
+      .post(`${API_URL}/token/refresh`, { refresh_token: refreshToken })
+      .then((response) => {
+        localStorage.setItem('accessToken', response.data.access_token);
+        localStorage.setItem('refreshToken', response.data.refresh_token);
+        return response.data.access_token as string;
+      })
+      .catch(() => {
+        localStorage.removeItem('refreshToken');
+        return null;
+      })
+      .finally(() => {
+        refreshing = null;
+      });
+  }
+  return refreshing;
+};
+
 // Response interceptor
 apiClient.interceptors.response.use(
   (response: AxiosResponse) => response,
-  (error: any) => {
+  async (error: any) => {
     if (error.response) {
+      const original = error.config as InternalAxiosRequestConfig & { _retried?: boolean };
+      if (error.response.status === 401 && original && !original._retried && !original.url?.includes('/token/refresh')) {
+        original._retried = true;
+        const token = await refreshAccessToken();
+        if (token) {
+          original.headers.Authorization = `Bearer ${token}`;
+          return apiClient(original);
+        }
+      }
       console.error('API Error:', error.response.status, error.response.data);
       if (error.response.status === 401) {
         localStorage.removeItem('accessToken'); 
@@ -1,5 +1,5 @@
 // src/services/appointmentService.ts
-import apiClient from './api';
+import apiClient, { API_URL } from './api';
 import { Appointment, AppointmentRequest } from '../lib/types';
 
 // Create new appointment
@@ -26,3 +26,62 @@ export const confirmAppointments = async (appointmentId: number) => {
   const response = await apiClient.put(`/appointments/${appointmentId}/confirm`);
   return response.data;
 };
+
+export type AppointmentEventType = 'appointment.created' | 'appointment.confirmed' | 'resync';
+
+// Live appointment updates over server-sent events. EventSource cannot send the
+// Authorization header, so each connection opens with a one-minute stream token in the
+// query string. That token is gone by the time the browser would reconnect on its own,
+// so on any error the stream is reopened here with a fresh one. Events may have been
+// missed while it was down, so reopening reports a 'resync'. Returns an unsubscribe function.
+export const subscribeToAppointmentEvents = (
+  onEvent: (type: AppointmentEventType, data?: { appointment_id: number }) => void,
+): (() => void) => {
+  let source: EventSource | null = null;
+  let retry: ReturnType<typeof setTimeout> | null = null;
+  let closed = false;
+  let delay = 1000;
+
+  const open = async (reopened: boolean) => {
+    let token: string;
+    try {
+      token = (await apiClient.post('/appointments/events/token')).data.token;
+    } catch {
+      reconnect();
+      return;
+    }
+    if (closed) return;
+    const stream = new EventSource(`${API_URL}/appointments/events?token=${encodeURIComponent(token)}`);
+    source = stream;
+    stream.onopen = () => {
+      delay = 1000;
+      if (reopened) onEvent('resync');
+    };
+    for (const type of ['appointment.created', 'appointment.confirmed'] as const) {
+      stream.addEventListener(type, (event) => onEvent(type, JSON.parse((event as MessageEvent).data)));
+    }
+    // 'resync': the stream fell behind and was dropped; reopening reports it
+    const drop = () => {
+      stream.close();
+      reconnect();
+    };
+    stream.addEventListener('resync', drop);
+    stream.onerror = drop;
+  };
+
+  const reconnect = () => {
+    if (closed || retry) return;
+    retry = setTimeout(() => {
+      retry = null;
+      open(true);
+    }, delay);
+    delay = Math.min(delay * 2, 30000);
+  };
+
+  open(false);
+  return () => {
+    closed = true;
+    if (retry) clearTimeout(retry);
+    source?.close();
+  };
+};
@@ -3,6 +3,8 @@ import apiClient from './api';
 interface TokenData {
   access_token: string;
   token_type: string;
+  refresh_token: string;
+  expires_in: number;
 }
 
 // Login function
@@ -14,6 +16,7 @@ export const login = async (email: string, password: string, userType: string):
       userType,
     });
     localStorage.setItem('accessToken', response.data.access_token);
+    localStorage.setItem('refreshToken', response.data.refresh_token);
     localStorage.setItem('tokenType', response.data.token_type);
     localStorage.setItem('userType', userType);
     return response.data;
@@ -41,7 +44,15 @@ export const signup = async (name: string, email: string, password: string, user
 
 // Logout function
 export const logout = () => {
+  // revoke the session server-side too, so copies of its tokens stop working
+  const token = localStorage.getItem('accessToken');
+  if (token) {
+    apiClient
+      .post('http://127.0.0.1:8000/logout', null, { headers: { Authorization: `Bearer ${token}` } })
+      .catch(() => undefined);
+  }
   localStorage.removeItem('accessToken');
+  localStorage.removeItem('refreshToken');
   localStorage.removeItem('tokenType');
   localStorage.removeItem('userType');
   localStorage.removeItem('user_profile'); // Also clear stored profile
@@ -43,10 +43,8 @@ export interface Event {
     id: number;
     email: string;
   };
-  attendees: {
-    id: number;
-    email: string;
-  }[];
+  capacity?: number | null;
+  attendee_count: number;
 }
 
 export const communityService = {
@@ -130,6 +128,7 @@ export const communityService = {
     date: string;
     time: string;
     location: string;
+    capacity?: number;
   }): Promise<Event> {
     const response = await axios.post(
       `${API_URL}/events`,
@@ -0,0 +1,56 @@
+"""Fixtures for the API tests.
+
+The tests run the app in process against the Postgres named by the usual DATABASE_*
+settings, with the schema at ``alembic -c backend/alembic.ini upgrade head``. Like the
+benchmarks, they write rows, so they only run against a local database. Each test
+removes what it created.
+
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import httpx
+import pytest
+
+from backend.config import settings
+from backend.database import SQLALCHEMY_DATABASE_URL, async_engine
+from backend.main import app
+from backend.metrics import registry
+from benchmarks.common import LOCAL_HOSTS
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def local_database():
+    host = SQLALCHEMY_DATABASE_URL.host or ""
+    if host not in LOCAL_HOSTS and not host.startswith("/"):
+        pytest.skip(f"tests only run against a local Postgres, not {host!r}")
+
+
+@pytest.fixture
+async def engine_per_test():
+    yield
+    # pooled connections belong to this test's event loop
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def client(engine_per_test):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def statements():
+    """SQL statements run so far by requests to a route, as counted by the metrics hooks."""
+    if not settings.metrics_enabled:
+        pytest.skip("statement counts come from the metrics hooks; set METRICS_ENABLED")
+
+    def count(method: str, route: str) -> int:
+        metrics = registry.routes.get((method, route))
+        return metrics.statements if metrics is not None else 0
+    return count
@@ -0,0 +1,95 @@
+"""Booking never leaves a therapist with two live appointments that overlap."""
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from backend import models, security
+from backend.database import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def booking(client):
+    """A therapist without published availability, and a patient, each with an access token."""
+    prefix = f"test-{uuid.uuid4().hex[:12]}"
+    async with AsyncSessionLocal() as db:
+        therapist_user = models.User(name="Therapist", email=f"{prefix}-t@example.com", password="-",
+                                     userType="therapist")
+        patient = models.User(name="Patient", email=f"{prefix}-p@example.com", password="-", userType="user")
+        db.add_all([therapist_user, patient])
+        await db.flush()
+        therapist = models.Therapist(name="Therapist", specialization="ABA", contact="-", user_id=therapist_user.id,
+                                     experience=1, bio="-")
+        db.add(therapist)
+        await db.commit()
+
+    async def book(scheduled_time: str):
+        return await client.post("/appointments/", headers=headers, json={
+            "therapist_id": therapist.id, "scheduled_time": scheduled_time})
+
+    async def confirm(appointment_id: int):
+        return await client.put(f"/appointments/{appointment_id}/confirm", headers=therapist_headers)
+
+    async def notifications(event_type: str, appointment_id: int):
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(func.count()).where(
+                models.OutboxMessage.event_type == event_type,
+                models.OutboxMessage.payload["appointment_id"].as_integer() == appointment_id))
+
+    async def live():
+        async with AsyncSessionLocal() as db:
+            return (await db.scalars(select(models.Appointment.scheduled_time).where(
+                models.Appointment.therapist_id == therapist.id, models.Appointment.status != "cancelled",
+            ).order_by(models.Appointment.scheduled_time))).all()
+
+    headers = {"Authorization": f"Bearer {security.create_access_token({'user_id': patient.id})}"}
+    therapist_headers = {"Authorization": f"Bearer {security.create_access_token({'user_id': therapist_user.id})}"}
+    yield SimpleNamespace(book=book, confirm=confirm, notifications=notifications, live=live)
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.OutboxMessage).where(
+            models.OutboxMessage.payload["therapist_id"].as_integer() == therapist.id))
+        await db.execute(delete(models.Appointment).where(models.Appointment.therapist_id == therapist.id))
+        await db.execute(delete(models.TherapistDailyStats).where(
+            models.TherapistDailyStats.therapist_id == therapist.id))
+        await db.execute(delete(models.TherapistClient).where(models.TherapistClient.therapist_id == therapist.id))
+        await db.execute(delete(models.Therapist).where(models.Therapist.id == therapist.id))
+        await db.execute(delete(models.User).where(models.User.id.in_([therapist_user.id, patient.id])))
+        await db.commit()
+
+
+async def test_overlapping_bookings_are_rejected(booking):
+    assert (await booking.book("2030-03-04T10:00:00")).status_code == 200
+    # starts inside the first appointment
+    assert (await booking.book("2030-03-04T10:30:00")).status_code == 409
+    # ends inside it
+    assert (await booking.book("2030-03-04T09:30:00")).status_code == 409
+    # touching is not overlapping
+    assert (await booking.book("2030-03-04T11:00:00")).status_code == 200
+    assert [str(when) for when in await booking.live()] == ["2030-03-04 10:00:00", "2030-03-04 11:00:00"]
+
+
+async def test_offsets_are_converted_to_utc(booking):
+    assert (await booking.book("2030-03-04T12:00:00+02:00")).status_code == 200
+    assert (await booking.book("2030-03-04T10:15:00Z")).status_code == 409
+    assert [str(when) for when in await booking.live()] == ["2030-03-04 10:00:00"]
+
+
+async def test_concurrent_overlapping_bookings_leave_one(booking):
+    starts = [f"2030-03-04T10:{minute:02d}:00" for minute in range(0, 60, 5)]
+    responses = await asyncio.gather(*(booking.book(start) for start in starts))
+    assert sorted(response.status_code for response in responses) == [200] + [409] * (len(starts) - 1)
+    assert len(await booking.live()) == 1
+
+
+async def test_confirming_twice_notifies_once(booking):
+    appointment_id = (await booking.book("2030-03-04T10:00:00")).json()["id"]
+    for _ in range(2):
+        response = await booking.confirm(appointment_id)
+        assert response.status_code == 200
+        assert response.json()["status"] == "confirmed"
+    assert await booking.notifications("appointment.confirmed", appointment_id) == 1
@@ -0,0 +1,91 @@
+"""Statements per request on the community read paths do not grow with thread length."""
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import delete, insert, select
+
+from backend import loaders, models, tags
+from backend.database import AsyncSessionLocal
+from backend.response_cache import response_cache
+
+pytestmark = pytest.mark.anyio
+
+TOPICS = 10
+# topics with their authors, comments with theirs, tags
+MAX_STATEMENTS = 3
+
+
+@pytest.fixture
+async def forum(engine_per_test):
+    """TOPICS tagged topics in a category of their own, with a helper adding comments to each."""
+    category = f"test-{uuid.uuid4().hex[:12]}"
+    async with AsyncSessionLocal() as db:
+        user = models.User(name="Tester", email=f"{category}@example.com", password="-", userType="user")
+        db.add(user)
+        await db.flush()
+        topics = [models.ForumTopic(title=f"Topic {n}", content="", category=category, user_id=user.id)
+                  for n in range(TOPICS)]
+        db.add_all(topics)
+        await db.flush()
+        for topic in topics:
+            await db.execute(tags.attach_tags(topic.id, [category]))
+        await db.commit()
+    topic_ids = [topic.id for topic in topics]
+
+    async def add_comments(per_topic: int):
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(models.Comment), [
+                {"content": f"Comment {n}", "user_id": user.id, "topic_id": topic_id}
+                for topic_id in topic_ids for n in range(per_topic)
+            ])
+            await db.commit()
+
+    yield SimpleNamespace(category=category, topic_ids=topic_ids, add_comments=add_comments)
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.Comment).where(models.Comment.topic_id.in_(topic_ids)))
+        await db.execute(delete(models.TopicTag).where(models.TopicTag.topic_id.in_(topic_ids)))
+        await db.execute(delete(models.Tag).where(models.Tag.name == category))
+        await db.execute(delete(models.ForumTopic).where(models.ForumTopic.id.in_(topic_ids)))
+        await db.execute(delete(models.User).where(models.User.id == user.id))
+        await db.commit()
+
+
+@pytest.mark.parametrize("route", ["/community/topics", "/community/topics/summary"])
+async def test_topic_page_statements_are_flat(client, forum, statements, route):
+    counts = []
+    for per_topic in (1, 50):
+        await forum.add_comments(per_topic)
+        before = statements("GET", route)
+        response = await client.get(route, params={"category": forum.category, "limit": TOPICS})
+        assert response.status_code == 200
+        assert len(response.json()) == TOPICS
+        counts.append(statements("GET", route) - before)
+    assert counts[0] == counts[1] <= MAX_STATEMENTS
+
+
+async def test_topic_detail_statements_are_flat(client, forum, statements):
+    topic_id = forum.topic_ids[0]
+    counts, total = [], 0
+    for per_topic in (1, 50):
+        await forum.add_comments(per_topic)
+        total += per_topic
+        await response_cache.invalidate(f"topic:{topic_id}")
+        before = statements("GET", "/community/topics/{topic_id}")
+        response = await client.get(f"/community/topics/{topic_id}")
+        assert response.status_code == 200
+        assert len(response.json()["comments"]) == total
+        counts.append(statements("GET", "/community/topics/{topic_id}") - before)
+    assert counts[0] == counts[1] <= MAX_STATEMENTS
+
+
+async def test_topic_page_embeds_only_the_first_comments(client, forum):
+    await forum.add_comments(20)
+    response = await client.get("/community/topics", params={"category": forum.category, "limit": TOPICS})
+    assert response.status_code == 200
+    for topic in response.json():
+        comments = topic["comments"]
+        assert [comment["content"] for comment in comments] == [
+            f"Comment {n}" for n in range(loaders.TOPIC_COMMENT_PREVIEW)]
+        assert all(comment["topic_id"] == topic["id"] for comment in comments)
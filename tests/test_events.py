@@ -0,0 +1,77 @@
+"""Concurrent joins never overbook an event or record an attendee twice."""
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from backend import models, security
+from backend.database import AsyncSessionLocal
+
+pytestmark = pytest.mark.anyio
+
+USERS = 40
+CAPACITY = 10
+
+
+@pytest.fixture
+async def event(engine_per_test):
+    """An event with room for CAPACITY, and USERS users with an access token each."""
+    prefix = f"test-{uuid.uuid4().hex[:12]}"
+    async with AsyncSessionLocal() as db:
+        users = [models.User(name="Tester", email=f"{prefix}-{n}@example.com", password="-", userType="user")
+                 for n in range(USERS)]
+        db.add_all(users)
+        await db.flush()
+        event = models.Event(title="Meetup", date="2030-03-04", time="10:00", location="Library",
+                             created_by=users[0].id, capacity=CAPACITY)
+        db.add(event)
+        await db.commit()
+    user_ids = [user.id for user in users]
+
+    yield SimpleNamespace(
+        id=event.id,
+        headers=[{"Authorization": f"Bearer {security.create_access_token({'user_id': user_id})}"}
+                 for user_id in user_ids],
+    )
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.EventAttendee).where(models.EventAttendee.event_id == event.id))
+        await db.execute(delete(models.Event).where(models.Event.id == event.id))
+        await db.execute(delete(models.User).where(models.User.id.in_(user_ids)))
+        await db.commit()
+
+
+async def attendance(event_id):
+    """(attendee_count, attendee rows, distinct attendees)"""
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(
+            select(models.Event.attendee_count).where(models.Event.id == event_id).scalar_subquery(),
+            select(func.count()).where(models.EventAttendee.event_id == event_id).scalar_subquery(),
+            select(func.count(models.EventAttendee.user_id.distinct()))
+            .where(models.EventAttendee.event_id == event_id).scalar_subquery(),
+        ))).one()
+
+
+async def test_concurrent_joins_fill_the_event_exactly(client, event):
+    # every user tries to join twice, all at once
+    responses = await asyncio.gather(*(
+        client.post(f"/community/events/{event.id}/join", headers=headers)
+        for headers in event.headers
+        for _ in range(2)
+    ))
+
+    statuses = [response.status_code for response in responses]
+    assert statuses.count(200) == CAPACITY
+    assert set(statuses) <= {200, 400, 409}
+    assert await attendance(event.id) == (CAPACITY, CAPACITY, CAPACITY)
+
+
+async def test_concurrent_joins_by_one_user_count_once(client, event):
+    responses = await asyncio.gather(*(
+        client.post(f"/community/events/{event.id}/join", headers=event.headers[0]) for _ in range(10)
+    ))
+
+    assert sorted(response.status_code for response in responses) == [200] + [400] * 9
+    assert await attendance(event.id) == (1, 1, 1)
@@ -0,0 +1,37 @@
+"""Pool stats and metrics are only served to allowed networks, or with the internal token."""
+import httpx
+import pytest
+
+from backend.config import settings
+from backend.main import app
+
+pytestmark = pytest.mark.anyio
+
+PATHS = ["/metrics", "/internal/pool"]
+
+
+def client_from(host):
+    transport = httpx.ASGITransport(app=app, client=(host, 40000))
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+@pytest.mark.parametrize("path", PATHS)
+async def test_local_clients_are_allowed(engine_per_test, path):
+    async with client_from("127.0.0.1") as client:
+        assert (await client.get(path)).status_code == 200
+
+
+@pytest.mark.parametrize("path", PATHS)
+async def test_remote_clients_are_refused(path):
+    async with client_from("203.0.113.7") as client:
+        assert (await client.get(path)).status_code == 403
+
+
+@pytest.mark.parametrize("path", PATHS)
+async def test_token_is_required_when_set(engine_per_test, monkeypatch, path):
+    monkeypatch.setattr(settings, "internal_token", "scrape-secret")
+    async with client_from("127.0.0.1") as client:
+        assert (await client.get(path)).status_code == 401
+        assert (await client.get(path, headers={"Authorization": "Bearer wrong"})).status_code == 401
+    async with client_from("203.0.113.7") as client:
+        assert (await client.get(path, headers={"Authorization": "Bearer scrape-secret"})).status_code == 200
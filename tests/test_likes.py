@@ -0,0 +1,140 @@
+"""Like counts match the topic_likes / comment_likes ledger under concurrent likes."""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import delete, func, insert, select, update
+
+from backend import models, security
+from backend.database import AsyncSessionLocal
+from backend.like_buffer import like_buffer
+
+pytestmark = pytest.mark.anyio
+
+USERS = 40
+
+
+@pytest.fixture
+async def thread(engine_per_test):
+    """A topic with one comment, and USERS users with an access token each."""
+    prefix = f"test-{uuid.uuid4().hex[:12]}"
+    async with AsyncSessionLocal() as db:
+        users = [models.User(name="Tester", email=f"{prefix}-{n}@example.com", password="-", userType="user")
+                 for n in range(USERS)]
+        db.add_all(users)
+        await db.flush()
+        topic = models.ForumTopic(title="Topic", content="", category=prefix, user_id=users[0].id, likes=0)
+        db.add(topic)
+        await db.flush()
+        comment = models.Comment(content="Comment", user_id=users[0].id, topic_id=topic.id, likes=0)
+        db.add(comment)
+        await db.commit()
+    user_ids = [user.id for user in users]
+
+    yield SimpleNamespace(
+        topic_id=topic.id,
+        comment_id=comment.id,
+        user_ids=user_ids,
+        headers=[{"Authorization": f"Bearer {security.create_access_token({'user_id': user_id})}"}
+                 for user_id in user_ids],
+    )
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.CommentLike).where(models.CommentLike.comment_id == comment.id))
+        await db.execute(delete(models.TopicLike).where(models.TopicLike.topic_id == topic.id))
+        await db.execute(delete(models.Comment).where(models.Comment.id == comment.id))
+        await db.execute(delete(models.ForumTopic).where(models.ForumTopic.id == topic.id))
+        await db.execute(delete(models.User).where(models.User.id.in_(user_ids)))
+        await db.commit()
+
+
+async def counts(topic_id, comment_id):
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(
+            select(models.ForumTopic.likes).where(models.ForumTopic.id == topic_id).scalar_subquery(),
+            select(func.count()).where(models.TopicLike.topic_id == topic_id).scalar_subquery(),
+            select(models.Comment.likes).where(models.Comment.id == comment_id).scalar_subquery(),
+            select(func.count()).where(models.CommentLike.comment_id == comment_id).scalar_subquery(),
+        ))).one()
+
+
+async def test_concurrent_likes_match_the_ledger(client, thread):
+    done = asyncio.Event()
+
+    async def flusher():
+        while not done.is_set():
+            await like_buffer.flush()
+            await asyncio.sleep(0.005)
+
+    # every user likes the topic and the comment twice, all at once, while flushes run
+    requests = [
+        client.post(path, headers=headers)
+        for headers in thread.headers
+        for path in (f"/community/topics/{thread.topic_id}/like", f"/community/comments/{thread.comment_id}/like")
+        for _ in range(2)
+    ]
+    flushing = asyncio.create_task(flusher())
+    try:
+        responses = await asyncio.gather(*requests)
+    finally:
+        done.set()
+        await flushing
+    await like_buffer.flush()
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200] * (2 * USERS) + [400] * (2 * USERS)
+    assert await counts(thread.topic_id, thread.comment_id) == (USERS, USERS, USERS, USERS)
+
+
+async def test_reconcile_restores_lost_increments(thread):
+    # likes committed to the ledger whose buffered increments died with their process
+    liked_at = datetime.now(timezone.utc) - 2 * like_buffer.grace
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(models.TopicLike), [
+            {"user_id": user_id, "topic_id": thread.topic_id, "created_at": liked_at} for user_id in thread.user_ids])
+        await db.execute(insert(models.CommentLike), [
+            {"user_id": user_id, "comment_id": thread.comment_id, "created_at": liked_at}
+            for user_id in thread.user_ids[:5]])
+        await db.commit()
+    assert await counts(thread.topic_id, thread.comment_id) == (0, USERS, 0, 5)
+
+    assert await like_buffer.reconcile() >= 2
+    assert await counts(thread.topic_id, thread.comment_id) == (USERS, USERS, 5, 5)
+
+
+async def test_reconcile_skips_recent_likes(thread):
+    # a like this recent may still be buffered by some process; its count is left alone
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(models.TopicLike).values(user_id=thread.user_ids[0], topic_id=thread.topic_id))
+        await db.commit()
+
+    await like_buffer.reconcile()
+    assert await counts(thread.topic_id, thread.comment_id) == (0, 1, 0, 0)
+
+    await like_buffer.reconcile(grace=timedelta(0))
+    assert await counts(thread.topic_id, thread.comment_id) == (1, 1, 0, 0)
+
+
+async def test_reconcile_keeps_likes_from_before_the_ledger(thread):
+    # counts carried over from before the ledger existed have no rows in it
+    liked_at = datetime.now(timezone.utc) - 2 * like_buffer.grace
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(models.ForumTopic).where(models.ForumTopic.id == thread.topic_id).values(likes=7))
+        await db.execute(update(models.Comment).where(models.Comment.id == thread.comment_id).values(likes=3))
+        await db.execute(insert(models.CommentLike).values(
+            user_id=thread.user_ids[0], comment_id=thread.comment_id, created_at=liked_at))
+        await db.commit()
+
+    await like_buffer.reconcile(grace=timedelta(0))
+    assert await counts(thread.topic_id, thread.comment_id) == (7, 0, 3, 1)
+
+
+async def test_comment_likes_refresh_the_cached_topic(client, thread):
+    path = f"/community/topics/{thread.topic_id}"
+    assert (await client.get(path)).json()["comments"][0]["likes"] == 0
+    response = await client.post(f"/community/comments/{thread.comment_id}/like", headers=thread.headers[0])
+    assert response.status_code == 200
+    await like_buffer.flush()
+    assert (await client.get(path)).json()["comments"][0]["likes"] == 1
@@ -0,0 +1,95 @@
+"""The outbox worker delivers outside the claiming transaction, and never waits on a sink forever."""
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import delete, select
+
+from backend import models
+from backend.database import AsyncSessionLocal
+from backend.outbox import Delivery, OutboxWorker
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def message(engine_per_test):
+    """One message due since long before anything else in the outbox, so a batch of one claims it."""
+    async with AsyncSessionLocal() as db:
+        message = models.OutboxMessage(event_type="test", payload={"marker": uuid.uuid4().hex},
+                                       available_at=datetime(2000, 1, 1, tzinfo=timezone.utc))
+        db.add(message)
+        await db.commit()
+
+    yield message.id
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.OutboxMessage).where(models.OutboxMessage.id == message.id))
+        await db.commit()
+
+
+def worker(delivery):
+    return OutboxWorker(delivery, interval=1, batch_size=1, max_attempts=3, timeout=0.2)
+
+
+async def load(message_id):
+    async with AsyncSessionLocal() as db:
+        return await db.get(models.OutboxMessage, message_id)
+
+
+class Hanging(Delivery):
+    async def deliver(self, message_id, event_type, payload):
+        await asyncio.Event().wait()
+
+
+class Inspecting(Delivery):
+    """Records whether the message row is still locked, and its lease, while it is delivered."""
+
+    async def deliver(self, message_id, event_type, payload):
+        async with AsyncSessionLocal() as db:
+            self.available_at = await db.scalar(
+                select(models.OutboxMessage.available_at)
+                .where(models.OutboxMessage.id == message_id)
+                .with_for_update(nowait=True)
+            )
+            await db.rollback()
+
+
+async def test_a_hanging_delivery_times_out_and_is_retried(message):
+    assert await worker(Hanging()).drain_batch() == 1
+
+    stored = await load(message)
+    assert stored.attempts == 1
+    assert stored.delivered_at is None
+    assert "TimeoutError" in stored.last_error
+    assert stored.available_at > datetime.now(timezone.utc)
+
+
+async def test_messages_are_delivered_unlocked_under_a_lease(message):
+    delivery = Inspecting()
+    began = datetime.now(timezone.utc)
+    assert await worker(delivery).drain_batch() == 1
+
+    # NOWAIT would have raised if the claiming transaction still held the row
+    assert delivery.available_at > began
+    stored = await load(message)
+    assert (stored.attempts, stored.available_at, stored.last_error) == (1, None, None)
+    assert stored.delivered_at is not None
+
+
+async def test_a_message_that_keeps_killing_its_worker_is_parked(message):
+    crashing = worker(Hanging())
+    for attempt in range(1, crashing.max_attempts + 1):
+        # claimed, then the worker dies mid-delivery and its lease runs out
+        assert [claimed[0] for claimed in await crashing.claim()] == [message]
+        assert (await load(message)).attempts == attempt
+        async with AsyncSessionLocal() as db:
+            stored = await db.get(models.OutboxMessage, message)
+            stored.available_at = datetime(2000, 1, 1, tzinfo=timezone.utc)
+            await db.commit()
+
+    assert await crashing.claim() == []
+    stored = await load(message)
+    assert (stored.attempts, stored.available_at, stored.delivered_at) == (crashing.max_attempts, None, None)
+    assert "did not finish" in stored.last_error
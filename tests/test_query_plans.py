@@ -0,0 +1,40 @@
+"""No router query sequentially scans a large table, on a smaller seed than
+``python -m benchmarks.query_plans`` uses. The seed is rolled back at the end."""
+from collections import defaultdict
+
+import pytest
+
+from backend.database import async_engine
+from benchmarks.query_plans import explain, queries, seed, seq_scans
+
+pytestmark = pytest.mark.anyio
+
+SIZES = {"users": 5000, "appointments": 20000, "topics": 5000, "comments": 20000, "events": 500}
+MIN_ROWS = 2000
+
+NAMES = [name for name, _ in queries(defaultdict(int))]
+
+
+@pytest.fixture(scope="module")
+def anyio_backend():
+    # one event loop for the whole module, so every test reads the same seeded transaction
+    return "asyncio"
+
+
+@pytest.fixture(scope="module")
+async def seeded(anyio_backend):
+    async with async_engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            large, ids = await seed(conn, SIZES, MIN_ROWS)
+            yield conn, large, dict(queries(ids))
+        finally:
+            await trans.rollback()
+    await async_engine.dispose()
+
+
+@pytest.mark.parametrize("name", NAMES)
+async def test_no_seq_scan_on_large_tables(seeded, name):
+    conn, large, statements = seeded
+    plan = await explain(conn, statements[name])
+    assert sorted(set(seq_scans(plan)) & large) == []
@@ -0,0 +1,78 @@
+"""The broker fans every event out to thousands of subscribers, complete and in order, and
+resyncs subscribers that fall behind. benchmarks/realtime_fanout.py times the same path."""
+import asyncio
+import json
+import uuid
+
+import pytest
+
+from backend import realtime
+from backend.config import settings
+from backend.database import SQLALCHEMY_DATABASE_URL
+
+pytestmark = pytest.mark.anyio
+
+SUBSCRIBERS = 3000
+EVENTS = 20
+
+
+def broker(queue_size):
+    return realtime.Broker(SQLALCHEMY_DATABASE_URL.render_as_string(hide_password=False), queue_size=queue_size,
+                           heartbeat=3600)
+
+
+def payload(channel, n):
+    return json.dumps({"channel": channel, "event": "comment.created", "data": {"n": n}})
+
+
+async def received(subscription, count):
+    frames = [await asyncio.wait_for(subscription.get(), 10) for _ in range(count)]
+    return [json.loads(frame.split(b"data: ")[1]) for frame in frames]
+
+
+async def test_every_subscriber_gets_every_event_in_order(engine_per_test):
+    if not settings.realtime_enabled:
+        pytest.skip("set REALTIME_ENABLED to test LISTEN/NOTIFY delivery")
+    channel = f"topic:test-{uuid.uuid4().hex[:12]}"
+    fanout = broker(queue_size=EVENTS)
+    subscriptions = [fanout.subscribe([channel]) for _ in range(SUBSCRIBERS)]
+    fanout.start()
+    try:
+        for _ in range(100):
+            if fanout.listening:
+                break
+            await asyncio.sleep(0.05)
+        assert fanout.listening
+
+        for n in range(EVENTS):
+            await realtime.notify(channel, "comment.created", {"n": n})
+
+        expected = [{"n": n} for n in range(EVENTS)]
+        for subscription in subscriptions:
+            assert await received(subscription, EVENTS) == expected
+        assert (fanout.delivered, fanout.dropped) == (SUBSCRIBERS * EVENTS, 0)
+    finally:
+        await fanout.stop()
+
+
+async def test_subscribers_that_fall_behind_are_resynced():
+    channel = "topic:1"
+    fanout = broker(queue_size=5)
+    keeping_up = [fanout.subscribe([channel]) for _ in range(SUBSCRIBERS // 2)]
+    behind = [fanout.subscribe([channel]) for _ in range(SUBSCRIBERS // 2)]
+
+    for n in range(10):
+        fanout.dispatch(payload(channel, n))
+        for subscription in keeping_up:
+            assert await received(subscription, 1) == [{"n": n}]
+
+    for subscription in behind:
+        # the frames it never read are dropped, the close marker is all that is left
+        assert await subscription.get() is None
+    assert fanout.dropped == len(behind)
+    assert fanout.delivered == len(keeping_up) * 10 + len(behind) * 5
+
+    # the dropped subscribers no longer receive anything; the others still do
+    fanout.dispatch(payload(channel, 10))
+    assert await received(keeping_up[0], 1) == [{"n": 10}]
+    assert fanout.dropped == len(behind)
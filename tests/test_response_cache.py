@@ -0,0 +1,107 @@
+"""A response rendered across an invalidation of its tags is served but not cached, entries
+expire, and invalidations reach the caches of other processes."""
+import asyncio
+
+import pytest
+from starlette.requests import Request
+from starlette.responses import Response
+
+from backend import realtime
+from backend.config import settings
+from backend.database import SQLALCHEMY_DATABASE_URL
+from backend.response_cache import CACHE_CHANNEL, MemoryBackend, ResponseCache
+
+pytestmark = pytest.mark.anyio
+
+
+def request(path="/topics/1"):
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []})
+
+
+def other_tag(cache, tag):
+    """A tag that does not share a version counter with ``tag``."""
+    slots = cache.backend.VERSION_SLOTS
+    return next(f"other:{n}" for n in range(slots) if hash(f"other:{n}") % slots != hash(tag) % slots)
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(MemoryBackend(16, max_age=60))
+
+
+async def test_store_after_invalidation_is_not_cached(cache):
+    first = request()
+    assert await cache.lookup(first, ["topic:1"]) is None
+    await cache.invalidate("topic:1")  # a write commits while the handler renders
+    response = await cache.store(first, Response(), dict, ["topic:1"], {"likes": 0})
+    assert response.body == b'{"likes":0}'
+    assert cache.stats()["stale_skips"] == 1
+
+    second = request()
+    assert await cache.lookup(second, ["topic:1"]) is None
+    await cache.store(second, Response(), dict, ["topic:1"], {"likes": 1})
+    assert (await cache.lookup(request(), ["topic:1"])).body == b'{"likes":1}'
+
+
+async def test_other_tags_do_not_block_the_store(cache):
+    first = request()
+    assert await cache.lookup(first, ["topic:1"]) is None
+    await cache.invalidate(other_tag(cache, "topic:1"))
+    await cache.store(first, Response(), dict, ["topic:1"], {"likes": 0})
+    assert (await cache.lookup(request(), ["topic:1"])).body == b'{"likes":0}'
+    assert cache.stats()["stale_skips"] == 0
+
+
+async def cached(cache, tag, path="/topics/1"):
+    """Cache a response to ``path`` under ``tag``; returns a check for whether it is still cached."""
+    miss = request(path)
+    assert await cache.lookup(miss, [tag]) is None
+    await cache.store(miss, Response(), dict, [tag], {"likes": 0})
+    return lambda: cache.lookup(request(path), [tag])
+
+
+async def test_entries_expire():
+    cache = ResponseCache(MemoryBackend(16, max_age=0.05))
+    lookup = await cached(cache, "topic:1")
+    assert await lookup() is not None
+    await asyncio.sleep(0.1)
+    assert await lookup() is None
+
+
+async def test_invalidations_from_other_processes_apply(cache):
+    lookup = await cached(cache, "topic:1")
+    await cache.apply("invalidate", {"origin": cache.origin, "tags": ["topic:1"]})
+    assert await lookup() is not None  # its own, already applied
+    await cache.apply("invalidate", {"origin": "another process", "tags": ["topic:1"]})
+    assert await lookup() is None
+
+    lookup = await cached(cache, "topic:2", "/topics/2")
+    await cache.apply("resync", None)
+    assert await lookup() is None
+
+
+async def test_invalidations_are_broadcast(engine_per_test):
+    if not settings.realtime_enabled:
+        pytest.skip("invalidations travel over the realtime channel; set REALTIME_ENABLED")
+    # two processes' caches, each fed by its own listener
+    writer, reader = (ResponseCache(MemoryBackend(16, max_age=60), broadcast=True) for _ in range(2))
+    broker = realtime.Broker(SQLALCHEMY_DATABASE_URL.render_as_string(hide_password=False), queue_size=10,
+                             heartbeat=60)
+    broker.watch(CACHE_CHANNEL, reader.apply)
+    broker.start()
+    try:
+        for _ in range(100):
+            if broker.listening:
+                break
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.05)  # the resync sent on LISTEN clears the reader first
+        lookup = await cached(reader, "topic:1")
+        assert await lookup() is not None
+        await writer.invalidate("topic:1")
+        for _ in range(100):
+            if await lookup() is None:
+                break
+            await asyncio.sleep(0.05)
+        assert await lookup() is None
+    finally:
+        await broker.stop()
@@ -0,0 +1,61 @@
+"""Event streams take a short-lived query token, and streaming responses stay out of the latency histogram."""
+import uuid
+
+import pytest
+from sqlalchemy import delete
+
+from backend import models, security
+from backend.config import settings
+from backend.database import AsyncSessionLocal
+from backend.metrics import registry
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def headers(engine_per_test):
+    """Authorization headers of a fresh user."""
+    async with AsyncSessionLocal() as db:
+        user = models.User(name="Tester", email=f"test-{uuid.uuid4().hex[:12]}@example.com", password="-",
+                           userType="user")
+        db.add(user)
+        await db.commit()
+
+    yield {"Authorization": f"Bearer {security.create_access_token({'user_id': user.id})}"}
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.User).where(models.User.id == user.id))
+        await db.commit()
+
+
+async def test_appointment_events_accept_a_stream_token(client, headers, monkeypatch):
+    # past authentication the route answers 503, instead of holding a stream open
+    monkeypatch.setattr(settings, "realtime_enabled", False)
+    response = await client.post("/appointments/events/token", headers=headers)
+    assert response.status_code == 200
+    token = response.json()["token"]
+    access_token = headers["Authorization"].removeprefix("Bearer ")
+
+    assert (await client.get("/appointments/events", params={"token": token})).status_code == 503
+    assert (await client.get("/appointments/events", headers=headers)).status_code == 503
+    assert (await client.get("/appointments/events")).status_code == 401
+    assert (await client.get("/appointments/events", params={"token": access_token})).status_code == 401
+    # and it opens nothing else
+    assert (await client.get("/appointments/confirmed",
+                             headers={"Authorization": f"Bearer {token}"})).status_code == 401
+
+
+async def test_streaming_responses_are_counted_without_latency(client):
+    route = "/community/topics/{topic_id}/comments"
+
+    def observed():
+        metrics = registry.routes.get(("GET", route))
+        return (metrics.count, sum(metrics.statuses.values())) if metrics is not None else (0, 0)
+
+    timed, counted = observed()
+    response = await client.get("/community/topics/0/comments", headers={"Accept": "application/x-ndjson"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert observed() == (timed, counted + 1)
+
+    await client.get("/community/topics/0/comments")
+    assert observed() == (timed + 1, counted + 2)